@@ -1,28 +1,44 @@
 from django.contrib import admin
 
 from core import models
+from core.admin_utils import AutocompleteFilter, LargeTableAdminMixin, RangeFilter
 
 
 class BaseModelAdmin(admin.ModelAdmin):
     list_display = ["id", "created_at", "modified_at", "active"]
     list_filter = ["active"]
+    # Evita o COUNT(*) da tabela inteira a cada página
+    show_full_result_count = False
 
 
 class NameBaseModelAdmin(BaseModelAdmin):
     list_display = ["id", "name", "created_at", "modified_at", "active"]
-    list_filter = ["name", "active"]
+    # Busca por prefixo (índice em UPPER(name)) no lugar do filtro por nome,
+    # que fazia SELECT DISTINCT name na tabela inteira
+    list_filter = ["active"]
+    search_fields = ["^name"]
 
 
 @admin.register(models.Customer)
-class FuncionarioAdmin(NameBaseModelAdmin):
+class FuncionarioAdmin(LargeTableAdminMixin, NameBaseModelAdmin):
     list_display = ["id", "name", "gender"]
-    list_filter = ["name", "gender"]
+    list_filter = ["gender", ("income", RangeFilter), "active"]
 
     # Exibir label ao invés do valor
     def get_gender_display(self, obj):
         return obj.get_gender_display()
 
 
+@admin.register(models.BatchJob)
+class BatchJobAdmin(BaseModelAdmin):
+    list_display = [
+        "id", "name", "status", "last_pk", "max_pk", "rows_updated",
+        "modified_at", "finished_at",
+    ]
+    list_filter = ["status"]
+    readonly_fields = ["last_pk", "max_pk", "rows_updated", "finished_at"]
+
+
 @admin.register(models.Branch)
 class BranchAdmin(NameBaseModelAdmin):
     pass
@@ -33,6 +49,17 @@ class CityAdmin(NameBaseModelAdmin):
     pass
 
 
+@admin.register(models.CommissionStatement)
+class CommissionStatementAdmin(LargeTableAdminMixin, BaseModelAdmin):
+    list_display = ["id", "period", "employee", "items", "total_sales", "commission"]
+    list_filter = [
+        ("period", RangeFilter),
+        ("employee", AutocompleteFilter),
+    ]
+    list_select_related = ["employee"]
+    ordering = ["-period", "-commission"]
+
+
 @admin.register(models.Department)
 class DepartmentAdmin(NameBaseModelAdmin):
     pass
@@ -46,7 +73,8 @@ class DistrictAdmin(NameBaseModelAdmin):
 @admin.register(models.Employee)
 class EmployeeAdmin(NameBaseModelAdmin):
     list_display = ["id", "name", "department"]
-    list_filter = ["name", "department"]
+    list_filter = ["department", "active"]
+    list_select_related = ["department"]
 
 
 @admin.register(models.MaritalStatus)
@@ -55,7 +83,7 @@ class MaritalStatusAdmin(NameBaseModelAdmin):
 
 
 @admin.register(models.Product)
-class ProductAdmin(NameBaseModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, NameBaseModelAdmin):
     list_display = [
         "id",
         "name",
@@ -64,7 +92,15 @@ class ProductAdmin(NameBaseModelAdmin):
         "product_group",
         "supplier",
     ]
-    list_filter = ["name", "cost_price", "sale_price", "product_group", "supplier"]
+    list_filter = [
+        ("cost_price", RangeFilter),
+        ("sale_price", RangeFilter),
+        "product_group",
+        ("supplier", AutocompleteFilter),
+        "active",
+    ]
+    list_select_related = ["product_group", "supplier"]
+    autocomplete_fields = ["supplier"]
 
 
 @admin.register(models.ProductGroup)
@@ -73,17 +109,30 @@ class ProductGroupAdmin(NameBaseModelAdmin):
 
 
 @admin.register(models.Sale)
-class SaleAdmin(BaseModelAdmin):
+class SaleAdmin(LargeTableAdminMixin, BaseModelAdmin):
     list_display = ["id", "customer", "employee", "date"]
-    list_filter = ["customer", "employee", "date"]
+    list_filter = [
+        ("customer", AutocompleteFilter),
+        ("employee", AutocompleteFilter),
+        ("date", RangeFilter),
+    ]
+    list_select_related = ["customer", "employee"]
+    # Anos/meses/dias descobertos pelo índice idx_sale_date (ver admin_utils)
     date_hierarchy = "date"
     ordering = ["-date"]
+    search_fields = ["=id"]
+    autocomplete_fields = ["branch", "customer", "employee"]
 
 
 @admin.register(models.SaleItem)
-class SaleItemAdmin(BaseModelAdmin):
+class SaleItemAdmin(LargeTableAdminMixin, BaseModelAdmin):
     list_display = ["id", "sale", "product", "quantity", "sale_price"]
-    list_filter = ["sale", "product"]
+    list_filter = [
+        ("sale", AutocompleteFilter),
+        ("product", AutocompleteFilter),
+    ]
+    list_select_related = ["sale", "product"]
+    autocomplete_fields = ["sale", "product"]
 
 
 @admin.register(models.State)
@@ -0,0 +1,242 @@
+"""
+Peças do admin para tabelas grandes (milhões de linhas).
+
+- AutocompleteFilter: filtro de FK com o autocomplete (select2) do admin,
+  em vez de listar todos os registros relacionados na barra lateral;
+- RangeFilter: filtro "de/até" que usa o índice da coluna, em vez do
+  SELECT DISTINCT de todos os valores;
+- EstimatedCountPaginator: usa a estimativa do planejador do PostgreSQL
+  quando a contagem passa de alguns milhares de linhas;
+- ProbedDateHierarchyChangeList: date_hierarchy que descobre anos/meses/dias
+  com MIN/MAX e EXISTS pelo índice, sem SELECT DISTINCT date_trunc(...).
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import get_last_value_from_parameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import Max, Min, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Abaixo disto, COUNT(*) de verdade é barato o bastante
+ESTIMATED_COUNT_THRESHOLD = 10_000
+
+
+def _hidden_params(changelist, exclude: list[str]) -> list[tuple[str, str]]:
+    """Parâmetros atuais da changelist, exceto os do próprio filtro."""
+    return [
+        (key, value)
+        for key, value in changelist.params.items()
+        if key not in exclude and key != PAGE_VAR
+    ]
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Filtro de ForeignKey com campo de autocomplete.
+
+    O model relacionado precisa de um ModelAdmin com search_fields.
+    """
+
+    template = "admin/core/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        self.lookup_val = get_last_value_from_parameters(params, self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # O ModelChoiceField liga as choices do widget ao queryset; só o valor
+        # selecionado é buscado no banco, as demais opções vêm por AJAX
+        self.widget = forms.ModelChoiceField(
+            queryset=field.related_model._default_manager.all(),
+            widget=AutocompleteSelect(
+                field,
+                model_admin.admin_site,
+                attrs={"onchange": "this.form.submit()", "style": "width: 100%"},
+            ),
+        ).widget
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            "widget": self.widget.render(self.lookup_kwarg, self.lookup_val),
+            "hidden": _hidden_params(changelist, [self.lookup_kwarg]),
+            "reset_query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "selected": self.lookup_val is not None,
+        }
+
+
+def _aware(value: str) -> datetime | str:
+    """Data/hora digitada no filtro, no fuso do projeto se vier sem fuso."""
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        # Inválido: a changelist responde com ?e=1
+        return value
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        return timezone.make_aware(parsed)
+    return parsed
+
+
+class RangeFilter(admin.FieldListFilter):
+    """Filtro por intervalo (campo >= de, campo <= até)."""
+
+    template = "admin/core/range_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg_gte = f"{field_path}__gte"
+        self.lookup_kwarg_lte = f"{field_path}__lte"
+        self.value_gte = get_last_value_from_parameters(params, self.lookup_kwarg_gte)
+        self.value_lte = get_last_value_from_parameters(params, self.lookup_kwarg_lte)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # O formulário envia os dois campos: o limite deixado em branco não
+        # filtra (campo__lte="" não converte para Decimal/data e daria ?e=1)
+        for lookup in self.expected_parameters():
+            if not get_last_value_from_parameters(self.used_parameters, lookup):
+                self.used_parameters.pop(lookup, None)
+
+        if isinstance(field, models.DateTimeField):
+            self.input_type = "datetime-local"
+            # datetime-local não tem fuso: vale o horário do projeto
+            for lookup, values in self.used_parameters.items():
+                self.used_parameters[lookup] = [_aware(value) for value in values]
+        elif isinstance(field, models.DateField):
+            self.input_type = "date"
+        else:
+            self.input_type = "number"
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg_gte, self.lookup_kwarg_lte]
+
+    def choices(self, changelist):
+        yield {
+            "input_type": self.input_type,
+            "gte_name": self.lookup_kwarg_gte,
+            "gte_value": self.value_gte or "",
+            "lte_name": self.lookup_kwarg_lte,
+            "lte_value": self.value_lte or "",
+            "hidden": _hidden_params(changelist, self.expected_parameters()),
+            "reset_query_string": changelist.get_query_string(
+                remove=self.expected_parameters()
+            ),
+        }
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator que evita COUNT(*) em resultados grandes.
+
+    Pede ao PostgreSQL a estimativa de linhas (EXPLAIN); se ela passar de
+    ESTIMATED_COUNT_THRESHOLD, usa a estimativa, senão conta de verdade.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return super().count
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate < ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+def _truncate(value: datetime, kind: str) -> datetime:
+    if kind == "year":
+        return value.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if kind == "month":
+        return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_period(value: datetime, kind: str) -> datetime:
+    if kind == "year":
+        return value.replace(year=value.year + 1)
+    if kind == "month":
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    return value + timedelta(days=1)
+
+
+class ProbedDatesQuerySet(QuerySet):
+    """QuerySet cujo datetimes() consulta o índice em vez de varrer a tabela.
+
+    Em vez de SELECT DISTINCT date_trunc(kind, campo), busca MIN/MAX (duas
+    descidas no índice) e testa cada período candidato com um EXISTS.
+    """
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None, **kwargs):
+        if kind not in ("year", "month", "day"):
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] is None:
+            return []
+
+        first, last = bounds["first"], bounds["last"]
+        if settings.USE_TZ:
+            tzinfo = tzinfo or timezone.get_current_timezone()
+            first, last = timezone.localtime(first, tzinfo), timezone.localtime(last, tzinfo)
+
+        periods = []
+        start = _truncate(first, kind)
+        while start <= last:
+            end = _next_period(start, kind)
+            lookup = {f"{field_name}__gte": start, f"{field_name}__lt": end}
+            if self.filter(**lookup).exists():
+                periods.append(start)
+            start = end
+
+        return periods if order == "ASC" else periods[::-1]
+
+
+class ProbedDateHierarchyChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.date_hierarchy:
+            queryset = queryset._chain()
+            queryset.__class__ = ProbedDatesQuerySet
+        return queryset
+
+
+class LargeTableAdminMixin:
+    """Configuração padrão do admin para tabelas com milhões de linhas."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ProbedDateHierarchyChangeList
+
+    @property
+    def media(self):
+        media = super().media
+        # JS/CSS do select2 para os AutocompleteFilter da barra lateral
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, tuple) and list_filter[1] is AutocompleteFilter:
+                field = self.model._meta.get_field(list_filter[0])
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
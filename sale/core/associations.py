@@ -0,0 +1,228 @@
+"""
+Matriz de co-compra de produtos ("quem comprou X também comprou Y").
+
+Cada venda é uma cesta. O job percorre sale_item em faixas de ids de venda
+(keyset em sale.id) e, para cada faixa, o banco devolve já agrupados:
+
+- em quantas vendas cada produto aparece;
+- em quantas vendas cada par de produtos (a < b) aparece junto.
+
+As contagens são somadas em memória (matriz esparsa: só pares que
+ocorreram) e, no fim, viram arrays NumPy para calcular as métricas de cada
+regra X -> Y, N sendo o total de vendas:
+
+    support    = vendas(X e Y) / N
+    confidence = vendas(X e Y) / vendas(X)
+    lift       = confidence / (vendas(Y) / N)
+
+As regras abaixo dos limites mínimos são descartadas e os K melhores
+vizinhos de cada produto (maior lift, depois maior confiança) são gravados
+em product_association, lidos pela action `related` do ProductViewSet.
+"""
+
+import logging
+from collections import Counter
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from core.models import ProductAssociation, Sale
+
+logger = logging.getLogger(__name__)
+
+# Vendas por faixa
+CHUNK_SIZE = 50_000
+# Vizinhos gravados por produto
+TOP_K = 10
+MIN_SUPPORT = 0.0001
+MIN_CONFIDENCE = 0.05
+MIN_LIFT = 1.0
+
+# Produtos distintos por venda na faixa (id_sale > %s AND id_sale <= %s)
+_PRODUCT_COUNTS_SQL = """
+    SELECT si.id_product, COUNT(DISTINCT si.id_sale)
+    FROM sale_item si
+    JOIN sale s ON s.id = si.id_sale
+    WHERE si.id_sale > %s AND si.id_sale <= %s AND s.active AND si.active
+    GROUP BY si.id_product
+"""
+
+# Pares (a < b) comprados juntos na faixa; DISTINCT ignora o mesmo produto
+# lançado em duas linhas da mesma venda
+_PAIR_COUNTS_SQL = """
+    SELECT a.id_product, b.id_product, COUNT(DISTINCT a.id_sale)
+    FROM sale_item a
+    JOIN sale_item b ON b.id_sale = a.id_sale AND b.id_product > a.id_product
+    JOIN sale s ON s.id = a.id_sale
+    WHERE a.id_sale > %s AND a.id_sale <= %s
+      AND s.active AND a.active AND b.active
+    GROUP BY a.id_product, b.id_product
+"""
+
+_BASKET_COUNT_SQL = """
+    SELECT COUNT(DISTINCT si.id_sale)
+    FROM sale_item si
+    JOIN sale s ON s.id = si.id_sale
+    WHERE si.id_sale > %s AND si.id_sale <= %s AND s.active AND si.active
+"""
+
+
+def count_co_purchases(chunk_size: int = CHUNK_SIZE) -> tuple[int, Counter, Counter]:
+    """Conta cestas, produtos e pares de produtos, faixa a faixa de vendas.
+
+    Args:
+        chunk_size: Quantidade de vendas por faixa.
+
+    Returns:
+        tuple[int, Counter, Counter]: (total de vendas com itens,
+            vendas por produto, vendas por par (a, b) com a < b).
+    """
+    baskets = 0
+    products: Counter = Counter()
+    pairs: Counter = Counter()
+    sale_ids = Sale.objects.using(DEFAULT_DB_ALIAS).filter(active=True).order_by("id")
+
+    last_id = 0
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        while True:
+            remaining = sale_ids.filter(id__gt=last_id).values_list("id", flat=True)
+            # Fim da faixa: id da chunk_size-ésima venda seguinte (ou a última)
+            end = next(iter(remaining[chunk_size - 1 : chunk_size]), None)
+            if end is None:
+                end = remaining.last()
+                if end is None:
+                    break
+
+            cursor.execute(_BASKET_COUNT_SQL, [last_id, end])
+            baskets += cursor.fetchone()[0]
+            cursor.execute(_PRODUCT_COUNTS_SQL, [last_id, end])
+            products.update(dict(cursor.fetchall()))
+            cursor.execute(_PAIR_COUNTS_SQL, [last_id, end])
+            pairs.update({(a, b): count for a, b, count in cursor.fetchall()})
+
+            logger.info(
+                "Co-compra: vendas até id %s, %s pares distintos.", end, len(pairs)
+            )
+            last_id = end
+
+    return baskets, products, pairs
+
+
+def top_associations(
+    baskets: int,
+    products: Counter,
+    pairs: Counter,
+    top_k: int = TOP_K,
+    min_support: float = MIN_SUPPORT,
+    min_confidence: float = MIN_CONFIDENCE,
+    min_lift: float = MIN_LIFT,
+) -> dict[str, np.ndarray]:
+    """Calcula support/confidence/lift das regras X -> Y e fica com o top-K de cada X.
+
+    Returns:
+        dict[str, np.ndarray]: Arrays alinhados 'product', 'related_product',
+            'rank' (0 = melhor), 'co_count', 'support', 'confidence' e 'lift'.
+    """
+    if not pairs or not baskets:
+        empty = np.empty(0)
+        return dict.fromkeys(
+            ["product", "related_product", "rank", "co_count", "support", "confidence", "lift"],
+            empty,
+        )
+
+    first = np.fromiter((a for a, _ in pairs), dtype=np.int64, count=len(pairs))
+    second = np.fromiter((b for _, b in pairs), dtype=np.int64, count=len(pairs))
+    together = np.fromiter(pairs.values(), dtype=np.float64, count=len(pairs))
+
+    # Cada par (a, b) gera as duas regras: a -> b e b -> a
+    antecedent = np.concatenate([first, second])
+    consequent = np.concatenate([second, first])
+    co_count = np.concatenate([together, together])
+
+    product_ids = np.fromiter(products.keys(), dtype=np.int64, count=len(products))
+    product_counts = np.fromiter(products.values(), dtype=np.float64, count=len(products))
+    order = np.argsort(product_ids)
+    product_ids, product_counts = product_ids[order], product_counts[order]
+    antecedent_count = product_counts[np.searchsorted(product_ids, antecedent)]
+    consequent_count = product_counts[np.searchsorted(product_ids, consequent)]
+
+    support = co_count / baskets
+    confidence = co_count / antecedent_count
+    lift = confidence / (consequent_count / baskets)
+
+    keep = (support >= min_support) & (confidence >= min_confidence) & (lift >= min_lift)
+    antecedent, consequent, co_count = antecedent[keep], consequent[keep], co_count[keep]
+    support, confidence, lift = support[keep], confidence[keep], lift[keep]
+
+    # Ordena por produto e, dentro dele, do maior lift para o menor
+    order = np.lexsort((-confidence, -lift, antecedent))
+    antecedent, consequent, co_count = antecedent[order], consequent[order], co_count[order]
+    support, confidence, lift = support[order], confidence[order], lift[order]
+
+    # Posição de cada regra dentro do seu produto
+    starts = np.flatnonzero(np.r_[True, antecedent[1:] != antecedent[:-1]])
+    group_sizes = np.diff(np.r_[starts, antecedent.size])
+    rank = np.arange(antecedent.size) - np.repeat(starts, group_sizes)
+
+    top = rank < top_k
+    return {
+        "product": antecedent[top],
+        "related_product": consequent[top],
+        "rank": rank[top],
+        "co_count": co_count[top].astype(np.int64),
+        "support": support[top],
+        "confidence": confidence[top],
+        "lift": lift[top],
+    }
+
+
+def build_product_associations(
+    chunk_size: int = CHUNK_SIZE,
+    top_k: int = TOP_K,
+    min_support: float = MIN_SUPPORT,
+    min_confidence: float = MIN_CONFIDENCE,
+    min_lift: float = MIN_LIFT,
+) -> int:
+    """Reconstrói product_association a partir de todas as vendas.
+
+    Returns:
+        int: Quantidade de associações gravadas.
+
+    Note:
+        A tabela é trocada numa única transação (DELETE + COPY): quem lê
+        enxerga a versão antiga até o COMMIT, nunca uma tabela pela metade.
+    """
+    baskets, products, pairs = count_co_purchases(chunk_size)
+    rules = top_associations(
+        baskets, products, pairs, top_k, min_support, min_confidence, min_lift
+    )
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    now = timezone.now()
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+        ProductAssociation.objects.using(DEFAULT_DB_ALIAS).all().delete()
+        with cursor.cursor.copy(
+            """
+            COPY product_association
+                (id_product, id_related_product, rank, co_count, support,
+                 confidence, lift, created_at, modified_at, active)
+            FROM STDIN
+            """
+        ) as copy:
+            for row in zip(
+                rules["product"].tolist(),
+                rules["related_product"].tolist(),
+                rules["rank"].tolist(),
+                rules["co_count"].tolist(),
+                rules["support"].tolist(),
+                rules["confidence"].tolist(),
+                rules["lift"].tolist(),
+            ):
+                copy.write_row((*row, now, now, True))
+
+    logger.info(
+        "Co-compra: %s vendas, %s produtos, %s associações gravadas.",
+        baskets, len(products), rules["product"].size,
+    )
+    return rules["product"].size
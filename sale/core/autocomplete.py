@@ -0,0 +1,242 @@
+"""
+Índice em memória para autocomplete de nomes de produtos.
+
+Os terminais de PDV consultam o produto a cada tecla digitada. Para não ir
+ao banco em cada tecla, cada worker mantém um array ordenado com os nomes
+normalizados (sem acento, minúsculos) dos produtos ativos e responde
+prefixos com bisect, em O(log n + k).
+
+O índice é construído na primeira consulta e depois atualizado de forma
+incremental a partir de `modified_at`. Se o número de produtos passar de
+PRODUCT_AUTOCOMPLETE_MAX_ENTRIES, o índice não é montado e as consultas
+caem na busca textual do banco (core.search).
+
+Com o barramento de invalidação (core.invalidation), a atualização é
+antecipada para a próxima consulta após qualquer alteração em produtos, e
+os ids avisados são relidos mesmo que o modified_at deles tenha chegado
+atrasado; exclusões forçam a reconstrução.
+
+Sem o barramento, só modified_at é lido: exclusões físicas (DELETE) e
+UPDATEs que não mexem em modified_at não aparecem, e o produto continua
+no índice até a próxima reconstrução completa (FULL_REBUILD_INTERVAL).
+"""
+
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+
+from core import search
+from core.invalidation import invalidation_bus
+from core.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Limite de produtos no índice (memória limitada por worker)
+MAX_ENTRIES = getattr(settings, "PRODUCT_AUTOCOMPLETE_MAX_ENTRIES", 500_000)
+
+# Intervalo mínimo (segundos) entre duas atualizações incrementais
+REFRESH_INTERVAL = getattr(settings, "PRODUCT_AUTOCOMPLETE_REFRESH_INTERVAL", 30)
+
+# Intervalo (segundos) entre reconstruções completas do índice
+FULL_REBUILD_INTERVAL = 3600
+
+# Janela de segurança: relê alterações feitas pouco antes da última marca,
+# pois modified_at é gravado antes do COMMIT e pode chegar "atrasado"
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# Acima desta quantidade de alterações, reconstruir é mais barato que inserir
+REBUILD_THRESHOLD = 5_000
+
+
+def normalize(text: str) -> str:
+    """Remove acentos e normaliza maiúsculas/minúsculas.
+
+    Args:
+        text: Texto original (ex: 'Café Pilão').
+
+    Returns:
+        str: Texto normalizado (ex: 'cafe pilao').
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class ProductNameIndex:
+    """Array ordenado de (nome normalizado, id) dos produtos ativos."""
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        refresh_interval: float = REFRESH_INTERVAL,
+        bus=invalidation_bus,
+    ) -> None:
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self.bus = bus
+        # ids avisados pelo barramento e ainda não relidos
+        self._stale_ids: set[int] = set()
+        self._stale_lock = threading.Lock()
+        self._subscribed = False
+        # (chaves ordenadas, nomes por id) trocados juntos numa única atribuição
+        self._snapshot: tuple[list[tuple[str, int]], dict[int, str]] = ([], {})
+        self._watermark: datetime | None = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._overflow = False
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
+
+    def lookup(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Retorna produtos cujo nome começa com o prefixo.
+
+        Args:
+            prefix: Texto digitado (acentos e maiúsculas são ignorados).
+            limit: Quantidade máxima de resultados.
+
+        Returns:
+            list[dict]: Lista de {'id': ..., 'name': ...} em ordem alfabética.
+        """
+        self._maybe_refresh()
+
+        if self._overflow:
+            queryset = search.search(Product.objects.filter(active=True), prefix)
+            return list(queryset.values("id", "name")[:limit])
+
+        key = normalize(prefix)
+        keys, names = self._snapshot
+        result = []
+        position = bisect_left(keys, (key, 0))
+        while position < len(keys) and len(result) < limit:
+            name_key, product_id = keys[position]
+            if not name_key.startswith(key):
+                break
+            result.append({"id": product_id, "name": names[product_id]})
+            position += 1
+        return result
+
+    def rebuild(self) -> None:
+        """Reconstrói o índice inteiro a partir do banco."""
+        with self._lock:
+            self._rebuild()
+
+    def invalidate(self) -> None:
+        """Força uma reconstrução completa na próxima consulta."""
+        self._ready = False
+
+    def _maybe_refresh(self) -> None:
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._subscribe()
+                    self._rebuild()
+            return
+
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+
+        # Apenas um thread atualiza; os demais seguem com o índice atual
+        if self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+
+    def _subscribe(self) -> None:
+        if self._subscribed:
+            return
+        self.bus.subscribe(Product._meta.db_table, self._on_change)
+        self._subscribed = True
+
+    def _on_change(self, ids: set[int] | None) -> None:
+        # Roda no thread do barramento: só anota, quem relê é a próxima consulta
+        if ids is None:
+            self.invalidate()
+            return
+        with self._stale_lock:
+            self._stale_ids.update(ids)
+        self._refreshed_at = 0.0
+
+    def _take_stale_ids(self) -> set[int]:
+        with self._stale_lock:
+            ids, self._stale_ids = self._stale_ids, set()
+        return ids
+
+    def _rebuild(self) -> None:
+        self._take_stale_ids()
+        queryset = Product.objects.filter(active=True)
+        watermark = Product.objects.order_by("-modified_at").values_list(
+            "modified_at", flat=True
+        ).first()
+
+        rows = list(queryset.values_list("id", "name")[: self.max_entries + 1])
+        if len(rows) > self.max_entries:
+            logger.warning(
+                "Autocomplete de produtos desativado: mais de %s produtos ativos.",
+                self.max_entries,
+            )
+            self._snapshot = ([], {})
+            self._overflow = True
+        else:
+            keys = sorted((normalize(name), pk) for pk, name in rows)
+            self._snapshot = (keys, dict(rows))
+            self._overflow = False
+
+        self._watermark = watermark
+        self._refreshed_at = self._rebuilt_at = time.monotonic()
+        self._ready = True
+
+    def _refresh(self) -> None:
+        self._refreshed_at = time.monotonic()
+        # Exclusões físicas não aparecem em modified_at: reconstrói de tempos em tempos
+        expired = self._refreshed_at - self._rebuilt_at > FULL_REBUILD_INTERVAL
+        if self._watermark is None or expired:
+            self._rebuild()
+            return
+
+        # Sem índice (produtos demais): só tenta de novo na reconstrução completa
+        if self._overflow:
+            return
+
+        stale_ids = self._take_stale_ids()
+        changes = list(
+            Product.objects.filter(
+                Q(modified_at__gte=self._watermark - REFRESH_OVERLAP)
+                | Q(pk__in=stale_ids)
+            ).values_list("id", "name", "active", "modified_at")[: REBUILD_THRESHOLD + 1]
+        )
+        if len(changes) > REBUILD_THRESHOLD:
+            self._rebuild()
+            return
+
+        # Copia antes de alterar: leitores concorrentes continuam na versão antiga
+        keys = list(self._snapshot[0])
+        names = dict(self._snapshot[1])
+        for pk, name, active, modified_at in changes:
+            old_name = names.pop(pk, None)
+            if old_name is not None:
+                old_key = (normalize(old_name), pk)
+                position = bisect_left(keys, old_key)
+                if position < len(keys) and keys[position] == old_key:
+                    del keys[position]
+            if active:
+                insort(keys, (normalize(name), pk))
+                names[pk] = name
+            self._watermark = max(self._watermark, modified_at)
+
+        if len(keys) > self.max_entries:
+            self._rebuild()
+            return
+
+        self._snapshot = (keys, names)
+
+
+product_name_index = ProductNameIndex()
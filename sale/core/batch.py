@@ -0,0 +1,334 @@
+"""
+Atualizações em massa executadas em lotes por faixa de chave primária.
+
+Um UPDATE único em milhões de linhas segura o lock de todas elas até o
+COMMIT e bloqueia as vendas nos PDVs. Aqui o mesmo UPDATE é repetido por
+faixas de id (id > início AND id <= fim), cada faixa na sua transação. As
+faixas são montadas por keyset: o fim de cada uma é o id da N-ésima linha
+seguinte que o job precisa alterar, então lotes têm sempre ~N linhas, mesmo
+quando elas estão espalhadas pela tabela:
+
+- o progresso (último id processado) é gravado em BatchJob na MESMA
+  transação do lote: um job interrompido recomeça de onde parou, sem
+  aplicar o mesmo aumento duas vezes na mesma linha;
+- antes de cada lote o job espera as réplicas ficarem a menos de
+  REPLICA_MAX_LAG segundos do primário;
+- um lote que espera lock mais que BATCH_LOCK_TIMEOUT é desfeito, o
+  tamanho do lote cai pela metade e ele é tentado de novo mais tarde;
+- o resultado final é o do UPDATE único: o job percorre os ids até o maior
+  id existente quando começou (linhas criadas depois também ficariam de
+  fora do UPDATE único).
+
+Os jobs disponíveis ficam em JOBS. Para rodar pela linha de comando, veja
+o comando `batch_update`.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from core.db_router import REPLICA_ALIASES, REPLICA_MAX_LAG, replica_lag
+from core.models import (
+    BatchJob,
+    Customer,
+    Employee,
+    Product,
+    ProductGroup,
+    ProductPriceHistory,
+    Sale,
+    SaleItem,
+)
+
+logger = logging.getLogger(__name__)
+
+# Linhas (faixa de ids) por lote
+CHUNK_SIZE = getattr(settings, "BATCH_UPDATE_CHUNK_SIZE", 5_000)
+# Menor lote ao qual o job encolhe quando esbarra em locks
+MIN_CHUNK_SIZE = 100
+# Pausa (segundos) entre dois lotes, para o autovacuum e a replicação respirarem
+SLEEP = getattr(settings, "BATCH_UPDATE_SLEEP", 0.05)
+# Tempo máximo que um lote espera por lock antes de desistir (SET LOCAL lock_timeout)
+LOCK_TIMEOUT = getattr(settings, "BATCH_LOCK_TIMEOUT", "2s")
+# Tentativas seguidas de um mesmo lote bloqueado antes de marcar o job como falho
+MAX_LOCK_RETRIES = 10
+
+# SQLSTATE do PostgreSQL para lock_timeout estourado (lock_not_available)
+_LOCK_NOT_AVAILABLE = "55P03"
+
+
+# Todo job grava modified_at: QuerySet.update() não passa pelo auto_now, e
+# quem atualiza de forma incremental (ex: core.autocomplete) lê essa coluna
+def _increase_all_salaries(percentage) -> tuple[QuerySet, dict]:
+    multiplier = 1 + Decimal(percentage) / 100
+    return Employee.objects.all(), {"salary": F("salary") * multiplier, "modified_at": Now()}
+
+
+def _apply_discount_to_products(discount_percentage, group_id) -> tuple[QuerySet, dict]:
+    multiplier = 1 - Decimal(discount_percentage) / 100
+    queryset = Product.objects.filter(product_group=group_id)
+    return queryset, {"sale_price": F("sale_price") * multiplier, "modified_at": Now()}
+
+
+def _update_product_group_commission(group_id, new_commission) -> tuple[QuerySet, dict]:
+    queryset = ProductGroup.objects.filter(id=group_id)
+    return queryset, {
+        "commission_percentage": Decimal(new_commission),
+        "modified_at": Now(),
+    }
+
+
+def _deactivate_all_products() -> tuple[QuerySet, dict]:
+    return Product.objects.all(), {"active": False, "modified_at": Now()}
+
+
+def _deactivate_customers_by_gender(gender) -> tuple[QuerySet, dict]:
+    return Customer.objects.filter(gender=gender), {"active": False, "modified_at": Now()}
+
+
+def _backfill_sale_item_prices(fallback="none") -> tuple[QuerySet, dict]:
+    # Preço vigente na data da venda (product_price_history, migration 0006)
+    sale_date = Sale.objects.filter(pk=OuterRef(OuterRef("sale"))).values("date")[:1]
+    history = ProductPriceHistory.objects.filter(product=OuterRef("product"))
+    price = Subquery(
+        history.filter(valid_from__lte=Subquery(sale_date))
+        .order_by("-valid_from")
+        .values("sale_price")[:1]
+    )
+    queryset = SaleItem.objects.filter(sale_price__isnull=True)
+
+    if fallback == "earliest":
+        # Venda anterior ao primeiro preço registrado: usa o preço mais antigo
+        earliest = Subquery(history.order_by("valid_from").values("sale_price")[:1])
+        price = Coalesce(price, earliest)
+        queryset = queryset.filter(Exists(history))
+    else:
+        queryset = queryset.filter(Exists(history.filter(valid_from__lte=Subquery(sale_date))))
+
+    return queryset, {"sale_price": price, "modified_at": Now()}
+
+
+# Nome do job -> função que recebe os params e devolve (queryset, valores do UPDATE)
+JOBS: dict[str, Callable[..., tuple[QuerySet, dict]]] = {
+    "increase_all_salaries": _increase_all_salaries,
+    "apply_discount_to_products": _apply_discount_to_products,
+    "update_product_group_commission": _update_product_group_commission,
+    "deactivate_all_products": _deactivate_all_products,
+    "deactivate_customers_by_gender": _deactivate_customers_by_gender,
+    "backfill_sale_item_prices": _backfill_sale_item_prices,
+}
+
+
+def start(name: str, **params) -> BatchJob:
+    """Cria um job, ou retoma o job igual que não terminou.
+
+    Args:
+        name: Nome do job (chave de JOBS).
+        **params: Parâmetros do job (ex: percentage=Decimal('10')).
+
+    Returns:
+        BatchJob: O job criado, ou o job pendente com o mesmo nome e params.
+
+    Note:
+        Chamar de novo depois de uma interrupção retoma o job antigo em vez
+        de criar outro, que aplicaria o aumento de novo nas linhas já feitas.
+    """
+    if name not in JOBS:
+        raise ValueError(f"Job desconhecido: {name}")
+
+    # Tudo vira str, venha do código (Decimal, int) ou da linha de comando:
+    # assim o mesmo job sempre grava o mesmo JSON e é encontrado para retomar
+    params = {key: str(value) for key, value in params.items()}
+    pending = (
+        BatchJob.objects.using(DEFAULT_DB_ALIAS)
+        .filter(name=name, params=params)
+        .exclude(status=BatchJob.Status.DONE)
+        .order_by("id")
+        .first()
+    )
+    if pending is not None:
+        return _reopen(pending)
+
+    queryset, _ = JOBS[name](**params)
+    bounds = queryset.using(DEFAULT_DB_ALIAS).aggregate(first=Min("pk"), last=Max("pk"))
+    if bounds["first"] is None:
+        return BatchJob.objects.using(DEFAULT_DB_ALIAS).create(
+            name=name,
+            params=params,
+            status=BatchJob.Status.DONE,
+            finished_at=timezone.now(),
+        )
+    return BatchJob.objects.using(DEFAULT_DB_ALIAS).create(
+        name=name,
+        params=params,
+        last_pk=bounds["first"] - 1,
+        max_pk=bounds["last"],
+    )
+
+
+def resume(job_id: int) -> BatchJob:
+    """Busca um job interrompido (RUNNING ou FAILED) para continuar com run().
+
+    Args:
+        job_id: O ID do BatchJob.
+
+    Returns:
+        BatchJob: O job, pronto para run().
+    """
+    return _reopen(BatchJob.objects.using(DEFAULT_DB_ALIAS).get(pk=job_id))
+
+
+def run(
+    job: BatchJob,
+    chunk_size: int = CHUNK_SIZE,
+    sleep: float = SLEEP,
+    on_progress: Callable[[BatchJob], None] | None = None,
+) -> BatchJob:
+    """Executa (ou continua) um job, lote a lote, até o fim.
+
+    Args:
+        job: Job criado por start().
+        chunk_size: Tamanho da faixa de ids de cada lote.
+        sleep: Pausa em segundos entre dois lotes.
+        on_progress: Chamado após cada lote com o job atualizado.
+
+    Returns:
+        BatchJob: O job com status DONE (ou FAILED, se um erro interrompeu).
+            Equivale a, por lote:
+                BEGIN;
+                SELECT ... FROM batch_job WHERE id = %s FOR UPDATE;
+                UPDATE employee SET salary = salary * 1.10
+                WHERE id > %s AND id <= %s;
+                UPDATE batch_job SET last_pk = %s, rows_updated = rows_updated + %s ...;
+                COMMIT;
+
+    Note:
+        Dois processos rodando o mesmo job não se atrapalham: o lock na
+        linha do BatchJob serializa os lotes e cada um segue do last_pk que
+        encontrar gravado.
+    """
+    queryset, values = JOBS[job.name](**job.params)
+    queryset = queryset.using(DEFAULT_DB_ALIAS)
+    lock_retries = 0
+
+    while job.status == BatchJob.Status.RUNNING and job.last_pk < job.max_pk:
+        _wait_for_replicas()
+        end = _chunk_end(queryset, job, chunk_size)
+
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                _set_lock_timeout()
+                current = BatchJob.objects.using(DEFAULT_DB_ALIAS).select_for_update().get(
+                    pk=job.pk
+                )
+                if current.last_pk != job.last_pk or current.status != job.status:
+                    # Outro processo andou com o job enquanto esperávamos o lock
+                    job = current
+                    continue
+
+                rows = queryset.filter(pk__gt=job.last_pk, pk__lte=end).update(**values)
+                job.last_pk = end
+                job.rows_updated += rows
+                job.save(update_fields=["last_pk", "rows_updated", "modified_at"])
+        except OperationalError as error:
+            if getattr(error.__cause__, "sqlstate", None) != _LOCK_NOT_AVAILABLE:
+                return _fail(job, error)
+
+            lock_retries += 1
+            if lock_retries > MAX_LOCK_RETRIES:
+                return _fail(job, error)
+            chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+            logger.info(
+                "Job %s: lote %s-%s esperou lock; nova tentativa com lotes de %s.",
+                job.pk, job.last_pk, end, chunk_size,
+            )
+            time.sleep(sleep * 2**lock_retries)
+            continue
+
+        lock_retries = 0
+        logger.info(
+            "Job %s (%s): %.1f%% - %s linhas atualizadas.",
+            job.pk, job.name, job.progress * 100, job.rows_updated,
+        )
+        if on_progress is not None:
+            on_progress(job)
+        if sleep:
+            time.sleep(sleep)
+
+    if job.status == BatchJob.Status.RUNNING:
+        job.status = BatchJob.Status.DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at", "modified_at"])
+    return job
+
+
+def run_batch_update(name: str, **params) -> int:
+    """Atalho usado pelos selectors: cria (ou retoma) o job e roda até o fim.
+
+    Args:
+        name: Nome do job (chave de JOBS).
+        **params: Parâmetros do job.
+
+    Returns:
+        int: O número total de linhas atualizadas pelo job.
+    """
+    job = run(start(name, **params))
+    if job.status == BatchJob.Status.FAILED:
+        raise OperationalError(f"Job {job.pk} ({name}) falhou: {job.error}")
+    return job.rows_updated
+
+
+def _chunk_end(queryset: QuerySet, job: BatchJob, chunk_size: int) -> int:
+    """Último id do próximo lote: o chunk_size-ésimo id seguinte do queryset.
+
+    Equivale a: SELECT id FROM employee WHERE id > %s AND id <= %s
+                ORDER BY id OFFSET chunk_size - 1 LIMIT 1
+    """
+    boundary = (
+        queryset.filter(pk__gt=job.last_pk, pk__lte=job.max_pk)
+        .order_by("pk")
+        .values_list("pk", flat=True)[chunk_size - 1 : chunk_size]
+    )
+    return next(iter(boundary), job.max_pk)
+
+
+def _wait_for_replicas() -> None:
+    """Segura o próximo lote enquanto alguma réplica estiver atrasada."""
+    for alias in REPLICA_ALIASES:
+        while True:
+            lag = replica_lag(alias)
+            # Réplica fora do ar já não recebe leituras; não vale esperar por ela
+            if lag is None or lag <= REPLICA_MAX_LAG:
+                break
+            logger.info("Réplica %s atrasada %.1fs; aguardando.", alias, lag)
+            time.sleep(min(lag, 5.0))
+
+
+def _set_lock_timeout() -> None:
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", [LOCK_TIMEOUT])
+
+
+def _reopen(job: BatchJob) -> BatchJob:
+    if job.status == BatchJob.Status.FAILED:
+        job.status = BatchJob.Status.RUNNING
+        job.error = ""
+        job.save(update_fields=["status", "error", "modified_at"])
+    return job
+
+
+def _fail(job: BatchJob, error: Exception) -> BatchJob:
+    logger.exception("Job %s (%s) falhou.", job.pk, job.name)
+    job.status = BatchJob.Status.FAILED
+    job.error = str(error)
+    job.save(update_fields=["status", "error", "modified_at"])
+    return job
@@ -0,0 +1,53 @@
+"""
+Consumo das tabelas de mudanças preenchidas por triggers.
+
+CommissionChange e BranchDaySketchChange recebem uma linha por comando que
+mexe em sale/sale_item; o recálculo incremental lê as linhas, refaz o que
+elas apontam e as apaga. Ler o MAX(id) e depois apagar `id <= MAX` perde
+mudanças: o id sai da sequence antes do COMMIT, então uma linha com id menor
+pode ficar visível depois da leitura e seria apagada sem ser processada.
+
+`claim_changes` apaga e devolve as linhas num único DELETE ... RETURNING,
+dentro da transação do recálculo: só some o que foi efetivamente lido, e se
+o recálculo falhar o rollback devolve as linhas para a próxima rodada.
+Rodadas concorrentes esperam o COMMIT da primeira e não veem as mesmas linhas.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Model
+
+
+@contextmanager
+def claim_changes(model: type[Model], *fields: str) -> Iterator[list[tuple]]:
+    """Apaga as mudanças pendentes e devolve os valores distintos dos campos.
+
+    Args:
+        model: Tabela de mudanças (ex: CommissionChange).
+        *fields: Campos devolvidos (ex: "branch", "sale_hour").
+
+    Yields:
+        list[tuple]: Combinações distintas dos campos nas linhas apagadas.
+            O bloco roda na mesma transação do DELETE, no primário.
+
+    Example:
+        with claim_changes(CommissionChange, "sale_hour") as rows:
+            compute_commissions(sorted({month_start(hour) for hour, in rows}))
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH claimed AS (
+                    DELETE FROM {quote(model._meta.db_table)} RETURNING {columns}
+                )
+                SELECT DISTINCT {columns} FROM claimed
+                """
+            )
+            rows = cursor.fetchall()
+        yield rows
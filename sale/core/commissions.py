@@ -0,0 +1,154 @@
+"""
+Cálculo de comissões dos funcionários por mês.
+
+A comissão de um item é quantidade × preço do item × commission_percentage
+do grupo do produto / 100. Para cada mês, UMA consulta agrupada por
+funcionário (sale_item × sale × product × product_group) calcula todas as
+comissões no banco; o resultado (uma linha por funcionário) é gravado em
+CommissionStatement com um único INSERT ... ON CONFLICT DO UPDATE.
+
+Recálculo incremental: os triggers da migration 0008 registram em
+CommissionChange a hora de toda venda ou item criado, alterado ou removido.
+recompute_pending() converte essas horas nos meses afetados e refaz apenas
+esses meses (ver core.change_log).
+
+Note:
+    O percentual de comissão é lido do grupo no momento do cálculo. Mudar
+    commission_percentage não marca meses para recálculo; rode
+    compute_commissions() para os meses que devem usar o novo percentual.
+"""
+
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.utils import timezone
+
+from core.change_log import claim_changes
+from core.models import CommissionChange, CommissionStatement, SaleItem
+
+logger = logging.getLogger(__name__)
+
+_MONEY = DecimalField(max_digits=18, decimal_places=2)
+
+
+def month_start(value: date | datetime) -> date:
+    """Primeiro dia do mês de uma data (datetimes no fuso do projeto)."""
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if settings.USE_TZ else value
+        value = value.date()
+    return value.replace(day=1)
+
+
+def _month_bounds(period: date) -> tuple[datetime, datetime]:
+    start = datetime(period.year, period.month, 1)
+    if period.month == 12:
+        end = datetime(period.year + 1, 1, 1)
+    else:
+        end = datetime(period.year, period.month + 1, 1)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def get_commission_rows(period: date):
+    """Comissão de cada funcionário no mês, calculada numa única consulta.
+
+    Args:
+        period: Qualquer dia do mês desejado.
+
+    Returns:
+        QuerySet: Uma linha por funcionário com employee, items, total_sales
+            e commission.
+            Equivale a: SELECT s.id_employee, COUNT(si.id),
+                               SUM(si.quantity * si.sale_price),
+                               SUM(si.quantity * si.sale_price
+                                   * pg.commission_percentage / 100)
+                        FROM sale_item si
+                        JOIN sale s ON s.id = si.id_sale
+                        JOIN product p ON p.id = si.id_product
+                        JOIN product_group pg ON pg.id = p.id_product_group
+                        WHERE s.date >= %s AND s.date < %s
+                          AND s.active AND si.active
+                        GROUP BY s.id_employee
+    """
+    start, end = _month_bounds(month_start(period))
+    revenue = F("quantity") * F("sale_price")
+    return (
+        SaleItem.objects.using(DEFAULT_DB_ALIAS)
+        .filter(
+            sale__date__gte=start,
+            sale__date__lt=end,
+            sale__active=True,
+            active=True,
+        )
+        .values(employee=F("sale__employee"))
+        .annotate(
+            items=Count("id"),
+            total_sales=Sum(revenue, output_field=_MONEY),
+            commission=Sum(
+                revenue * F("product__product_group__commission_percentage") / 100,
+                output_field=_MONEY,
+            ),
+        )
+        .order_by()
+    )
+
+
+def compute_commissions(periods: Iterable[date]) -> int:
+    """Calcula e grava as comissões dos meses informados.
+
+    Args:
+        periods: Meses a calcular (qualquer dia de cada mês).
+
+    Returns:
+        int: Quantidade de linhas de CommissionStatement gravadas.
+
+    Note:
+        Cada mês é recalculado por inteiro numa transação: o extrato fica
+        sempre consistente com as vendas do mês, inclusive removendo
+        funcionários que deixaram de ter vendas nele.
+    """
+    written = 0
+    for period in sorted({month_start(period) for period in periods}):
+        rows = list(get_commission_rows(period))
+        statements = [
+            CommissionStatement(
+                employee_id=row["employee"],
+                period=period,
+                items=row["items"],
+                total_sales=row["total_sales"] or 0,
+                commission=(row["commission"] or 0),
+            )
+            for row in rows
+        ]
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            CommissionStatement.objects.using(DEFAULT_DB_ALIAS).filter(
+                period=period,
+            ).exclude(employee__in=[row["employee"] for row in rows]).delete()
+            CommissionStatement.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+                statements,
+                update_conflicts=True,
+                unique_fields=["period", "employee"],
+                update_fields=["items", "total_sales", "commission", "modified_at"],
+            )
+        logger.info("Comissões de %s: %s funcionários.", period, len(statements))
+        written += len(statements)
+    return written
+
+
+def recompute_pending() -> list[date]:
+    """Recalcula só os meses com vendas alteradas desde o último cálculo.
+
+    Returns:
+        list[date]: Os meses recalculados.
+    """
+    # As mudanças são consumidas na transação do cálculo: as que chegarem
+    # durante ele ficam para a próxima rodada
+    with claim_changes(CommissionChange, "sale_hour") as rows:
+        periods = sorted({month_start(hour) for hour, in rows})
+        compute_commissions(periods)
+    return periods
@@ -0,0 +1,673 @@
+"""
+Cubo de vendas em memória, por colunas (NumPy), para fatiar sale_item.
+
+Cortes ad-hoc de sale_item por grupo de produto, filial, vendedor, gênero do
+cliente e mês ficavam lentos no Postgres mesmo com índices. Com
+SALES_CUBE_ENABLED, cada worker mantém o fato de vendas em arrays NumPy, uma
+linha por item:
+
+- dimensões codificadas por dicionário (o código é a posição do id em
+  `values`), no menor tipo inteiro que comporta o dicionário;
+- medidas inteiras: valor em centavos e quantidade em milésimos;
+- dia da venda como número de dias desde 2000-01-01;
+- o id do item (ordenado), para localizar linhas alteradas.
+
+Cada coluna usa o menor dtype que comporta os dados e é alargada quando
+chega um valor maior; numa base típica dá perto de 20 bytes por item.
+
+Carga: COPY ... TO STDOUT (FORMAT binary) em faixas de ids. Todas as colunas
+têm largura fixa e nenhuma é nula, então cada faixa vira um array
+estruturado com np.frombuffer, sem laço Python por linha.
+
+Atualização incremental, a cada SALES_CUBE_REFRESH_INTERVAL segundos, pelo
+modified_at de sale_item e de sale (com uma janela de segurança, como no
+autocomplete): itens novos são acrescentados, alterados são sobrescritos e
+vendas/itens inativados deixam de contar. Exclusões físicas e mudanças nas
+dimensões (produto trocado de grupo, gênero do cliente) só entram na
+reconstrução completa, a cada SALES_CUBE_FULL_REBUILD_INTERVAL segundos.
+
+Consultas (`query`): filtros viram máscaras booleanas e o agrupamento é um
+np.bincount sobre a combinação dos códigos. Sem o cubo ligado, a mesma
+consulta roda no banco (`query_database`), com o mesmo formato de resposta.
+
+Com ANALYTICS_SNAPSHOT_DIR (core.snapshots), os workers não leem o banco:
+mapeiam as colunas gravadas pelo comando refresh_analytics_snapshot e trocam
+para a versão nova quando o link `current` muda.
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core import snapshots
+from core.models import SaleItem
+from core.periods import filter_days
+
+logger = logging.getLogger(__name__)
+
+# Desligado, as consultas do cubo vão ao banco
+ENABLED = getattr(settings, "SALES_CUBE_ENABLED", False)
+
+# Intervalo mínimo (segundos) entre duas atualizações incrementais
+REFRESH_INTERVAL = getattr(settings, "SALES_CUBE_REFRESH_INTERVAL", 60)
+
+# Intervalo (segundos) entre reconstruções completas
+FULL_REBUILD_INTERVAL = getattr(settings, "SALES_CUBE_FULL_REBUILD_INTERVAL", 6 * 3600)
+
+# Faixa de ids trazida por COPY
+CHUNK_SIZE = 1_000_000
+
+# Janela de segurança: modified_at é gravado antes do COMMIT
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# Acima desta quantidade de combinações, o agrupamento usa np.unique
+MAX_DENSE_GROUPS = 1 << 22
+
+EPOCH = date(2000, 1, 1)
+CENTS = Decimal("0.01")
+
+# Dimensões disponíveis em group_by; as quatro primeiras também filtram
+DIMENSIONS = ["product_group", "branch", "employee", "gender", "month"]
+ENCODED = ["product_group", "branch", "employee", "gender"]
+
+# Colunas do COPY binário, na ordem do SELECT: (nome, tipo no Postgres)
+COPY_COLUMNS = [
+    ("id", ">i8"),
+    ("revenue", ">i8"),
+    ("quantity", ">i8"),
+    ("day", ">i4"),
+    ("product_group", ">i8"),
+    ("branch", ">i8"),
+    ("employee", ">i8"),
+    ("gender", ">i2"),
+    ("live", "?"),
+    ("changed_at", ">i8"),
+]
+
+# Cada linha: nº de campos (int16) e, por campo, tamanho (int32) + valor
+COPY_DTYPE = np.dtype(
+    [("fields", ">i2")]
+    + [
+        field
+        for name, dtype in COPY_COLUMNS
+        for field in ((f"{name}_length", ">i4"), (name, dtype))
+    ]
+)
+COPY_HEADER_SIZE = 19
+COPY_TRAILER_SIZE = 2
+
+# Colunas guardadas no cubo (changed_at só alimenta a marca d'água)
+STORED = ["id", "revenue", "quantity", "day", *ENCODED, "live"]
+
+COPY_SQL = """
+    COPY (
+        SELECT si.id::int8,
+               round(si.quantity * COALESCE(si.sale_price, 0) * 100)::int8,
+               round(si.quantity * 1000)::int8,
+               ((s.date AT TIME ZONE %(tz)s)::date - DATE '2000-01-01')::int4,
+               p.id_product_group::int8,
+               s.id_branch::int8,
+               s.id_employee::int8,
+               ascii(c.gender)::int2,
+               si.active AND s.active,
+               (extract(epoch FROM GREATEST(si.modified_at, s.modified_at)) * 1000000)::int8
+        FROM sale_item si
+        JOIN sale s ON s.id = si.id_sale
+        JOIN product p ON p.id = si.id_product
+        JOIN customer c ON c.id = s.id_customer
+        WHERE {where}
+        ORDER BY si.id
+    ) TO STDOUT (FORMAT binary)
+"""
+
+# Itens novos ou alterados (neles ou na venda) desde a marca d'água
+CHANGED_WHERE = """
+    si.id IN (
+        SELECT id FROM sale_item WHERE id > %(max_id)s
+        UNION
+        SELECT id FROM sale_item WHERE modified_at >= %(since)s
+        UNION
+        SELECT sc.id
+        FROM sale_item sc
+        JOIN sale ss ON ss.id = sc.id_sale
+        WHERE ss.modified_at >= %(since)s
+    )
+"""
+
+
+def _fit(dtype: np.dtype, values: np.ndarray) -> np.dtype:
+    """Menor dtype que comporta `dtype` e todos os `values`."""
+    if values.size == 0 or values.dtype == np.bool_:
+        return dtype
+    return np.result_type(
+        dtype,
+        np.min_scalar_type(values.min()),
+        np.min_scalar_type(values.max()),
+    )
+
+
+class _Dictionary:
+    """Ids distintos de uma dimensão; o código de um id é a posição dele."""
+
+    def __init__(self) -> None:
+        self.values = np.empty(0, dtype=np.int64)
+        self._sorted = self.values
+        self._order = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "_Dictionary":
+        """Dicionário com os ids já codificados (posição = código)."""
+        dictionary = cls()
+        dictionary.values = values
+        dictionary._order = np.argsort(values, kind="stable")
+        dictionary._sorted = values[dictionary._order]
+        return dictionary
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    def lookup(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Códigos dos ids e máscara dos que estão no dicionário."""
+        position = np.searchsorted(self._sorted, ids)
+        position = np.minimum(position, max(self._sorted.size - 1, 0))
+        found = self._sorted.size > 0 and self._sorted[position] == ids
+        found = np.broadcast_to(found, ids.shape)
+        codes = self._order[position] if self._order.size else np.zeros_like(ids)
+        return codes, found
+
+    def encode(self, ids: np.ndarray) -> np.ndarray:
+        """Códigos dos ids, acrescentando ao dicionário os que faltam."""
+        _, found = self.lookup(ids)
+        if not found.all():
+            # Só acrescenta: os códigos já gravados continuam válidos
+            self.values = np.concatenate([self.values, np.unique(ids[~found])])
+            self._order = np.argsort(self.values, kind="stable")
+            self._sorted = self.values[self._order]
+        return self.lookup(ids)[0]
+
+
+class SalesCube:
+    """Colunas do fato de vendas em memória e consultas agrupadas sobre elas."""
+
+    def __init__(
+        self,
+        refresh_interval: float = REFRESH_INTERVAL,
+        full_rebuild_interval: float = FULL_REBUILD_INTERVAL,
+        chunk_size: int = CHUNK_SIZE,
+        snapshot_dir: str | None = snapshots.SNAPSHOT_DIR,
+    ) -> None:
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self.chunk_size = chunk_size
+        self.snapshot_dir = snapshot_dir
+        # (linhas válidas, colunas com folga no fim, valores dos dicionários),
+        # trocados juntos numa única atribuição
+        self._snapshot: tuple[int, dict[str, np.ndarray], dict[str, np.ndarray]] = (0, {}, {})
+        self._dictionaries: dict[str, _Dictionary] = {}
+        self._watermark: int | None = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._ready = False
+        # Versão mapeada de snapshot_dir e última conferência do link `current`
+        self._version: str | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._snapshot[0]
+
+    def stats(self) -> dict[str, Any]:
+        """Linhas, bytes ocupados (sem a folga) e bytes por linha."""
+        size, columns, dictionaries = self._snapshot
+        nbytes = sum(columns[name].itemsize * size for name in columns)
+        nbytes += sum(values.nbytes for values in dictionaries.values())
+        return {
+            "rows": size,
+            "bytes": nbytes,
+            "bytes_per_row": round(nbytes / size, 2) if size else None,
+            "dtypes": {name: str(column.dtype) for name, column in columns.items()},
+            "snapshot": self._version,
+        }
+
+    def rebuild(self) -> None:
+        """Recarrega o cubo inteiro a partir do banco."""
+        with self._lock:
+            self._rebuild()
+
+    def refresh(self) -> None:
+        """Aplica as alterações desde a marca d'água (ou reconstrói, se vencido)."""
+        with self._lock:
+            if self._ready:
+                self._refresh()
+            else:
+                self._rebuild()
+
+    def invalidate(self) -> None:
+        """Força uma reconstrução completa (ou releitura do snapshot) na próxima consulta."""
+        self._ready = False
+        self._version = None
+        self._checked_at = 0.0
+
+    def export(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        """Colunas, dicionários e metadados do cubo, no formato de core.snapshots."""
+        with self._lock:
+            size, columns, dictionaries = self._snapshot
+            arrays = {f"column.{name}": column[:size] for name, column in columns.items()}
+            arrays.update({f"values.{name}": values for name, values in dictionaries.items()})
+            meta = {
+                "rows": size,
+                "watermark": self._watermark,
+                # Relógio de parede: o monotônico não vale entre processos
+                "rebuilt_at": time.time() - (time.monotonic() - self._rebuilt_at),
+            }
+        return arrays, meta
+
+    def load(self, arrays: dict[str, np.ndarray], meta: dict[str, Any], writable: bool = False) -> None:
+        """Passa a usar arrays exportados por `export`.
+
+        Args:
+            arrays: Arrays por nome, como em `export` (podem ser mapeados).
+            meta: Metadados de `export`.
+            writable: Copia os arrays para a memória do processo, para que
+                `refresh` possa alterá-los; sem isso, são usados como vieram.
+        """
+        with self._lock:
+            self._load(arrays, meta, writable)
+
+    def query(
+        self,
+        group_by: list[str],
+        start: date | None = None,
+        end: date | None = None,
+        filters: dict[str, list] | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Faturamento, quantidade e itens por combinação das dimensões.
+
+        Args:
+            group_by: Dimensões de DIMENSIONS (vazio = total geral).
+            start: Primeiro dia (inclusive).
+            end: Último dia (inclusive).
+            filters: Valores aceitos por dimensão, ex: {'branch': [1, 2],
+                'gender': ['F']}.
+            limit: Quantidade máxima de grupos, do maior faturamento ao menor.
+
+        Returns:
+            list[dict[str, Any]]: Um dict por grupo com as dimensões pedidas
+                (ids, letra do gênero ou primeiro dia do mês), 'revenue'
+                (Decimal), 'quantity' (Decimal) e 'items'.
+        """
+        self._maybe_refresh()
+        size, columns, dictionaries = self._snapshot
+        columns = {name: column[:size] for name, column in columns.items()}
+
+        # Linhas fora dos filtros não são copiadas: vão para um grupo descartado
+        mask = None if columns["live"].all() else columns["live"].copy()
+
+        def restrict(condition: np.ndarray) -> None:
+            nonlocal mask
+            if mask is None:
+                mask = condition
+            else:
+                mask &= condition
+
+        if start is not None:
+            restrict(columns["day"] >= (start - EPOCH).days)
+        if end is not None:
+            restrict(columns["day"] <= (end - EPOCH).days)
+        for name, accepted in (filters or {}).items():
+            if name == "gender":
+                accepted = [ord(value) for value in accepted]
+            # Tabela código -> aceito: um acesso por linha em vez de np.isin
+            allowed = np.isin(dictionaries[name], accepted)
+            restrict(allowed[columns[name]])
+
+        # Chave do grupo: códigos das dimensões combinados em base mista
+        key = None
+        shape, months = [], None
+        for name in group_by:
+            if name == "month":
+                months, lookup = self._month_lookup(columns["day"], mask)
+                codes = lookup[columns["day"]]
+                cardinality = max(months.size, 1)
+            else:
+                codes = columns[name]
+                cardinality = max(dictionaries[name].size, 1)
+            if key is None:
+                key = codes.astype(np.intp)
+            else:
+                key *= cardinality
+                key += codes
+            shape.append(cardinality)
+
+        if key is None:
+            key = np.zeros(size, dtype=np.intp)
+        total_groups = int(np.prod(shape, dtype=np.int64)) if shape else 1
+        if mask is not None:
+            key[~mask] = total_groups
+        if total_groups <= MAX_DENSE_GROUPS:
+            groups = None
+            index = key
+            length = total_groups + 1
+        else:
+            groups, index = np.unique(key, return_inverse=True)
+            length = groups.size
+
+        # float64 é exato para somas de centavos até 2^53
+        revenue = np.bincount(index, weights=columns["revenue"], minlength=length)
+        quantity = np.bincount(index, weights=columns["quantity"], minlength=length)
+        items = np.bincount(index, minlength=length)
+
+        group_keys = np.arange(length) if groups is None else groups
+        present = np.flatnonzero((items > 0) & (group_keys < total_groups))
+        present = present[np.argsort(-revenue[present], kind="stable")][:limit]
+        group_keys = group_keys[present]
+        group_codes = np.unravel_index(group_keys, shape) if shape else []
+
+        result = []
+        for position, group in enumerate(present.tolist()):
+            row: dict[str, Any] = {}
+            for name, dimension_codes in zip(group_by, group_codes):
+                code = int(dimension_codes[position])
+                if name == "month":
+                    row[name] = months[code].astype("datetime64[D]").item()
+                elif name == "gender":
+                    row[name] = chr(int(dictionaries[name][code]))
+                else:
+                    row[name] = int(dictionaries[name][code])
+            row["revenue"] = Decimal(round(revenue[group])).scaleb(-2)
+            row["quantity"] = Decimal(round(quantity[group])).scaleb(-3)
+            row["items"] = int(items[group])
+            result.append(row)
+        return result
+
+    @staticmethod
+    def _month_lookup(days: np.ndarray, mask: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """Meses das linhas selecionadas e a tabela dia -> código do mês.
+
+        A tabela cobre os dias de 0 até o maior dia: indexá-la pelos dias é
+        bem mais barato que converter cada dia em datetime64.
+        """
+        selected = days if mask is None else days[mask]
+        if selected.size == 0:
+            return np.empty(0, dtype="datetime64[M]"), np.zeros(int(days.max(initial=0)) + 1, dtype=np.intp)
+        calendar = np.datetime64(EPOCH) + np.arange(int(days.max()) + 1).astype("timedelta64[D]")
+        month = calendar.astype("datetime64[M]")
+        first = month[int(selected.min())]
+        # Dias fora da seleção podem dar códigos negativos: caem no grupo descartado
+        lookup = (month - first).astype(np.intp)
+        return np.arange(first, month[int(selected.max())] + 1), lookup
+
+    def _maybe_refresh(self) -> None:
+        if self.snapshot_dir:
+            if self._follow_snapshot():
+                return
+            if not self._ready:
+                logger.warning(
+                    "Nenhum snapshot em %s; o cubo de vendas será carregado do banco.",
+                    self.snapshot_dir,
+                )
+
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._rebuild()
+            return
+
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+
+        # Apenas um thread atualiza; os demais seguem com o cubo atual
+        if self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+
+    def _follow_snapshot(self) -> bool:
+        """Mapeia a versão atual do snapshot, se mudou; False se não há nenhuma."""
+        if time.monotonic() - self._checked_at < snapshots.CHECK_INTERVAL:
+            return self._version is not None
+        # Sem nada carregado, espera quem está mapeando; depois, não bloqueia
+        if not self._lock.acquire(blocking=not self._ready):
+            return self._version is not None
+        try:
+            self._checked_at = time.monotonic()
+            version = snapshots.current_version(self.snapshot_dir)
+            if version is not None and version != self._version:
+                try:
+                    opened = snapshots.open_snapshot(self.snapshot_dir, version)
+                except FileNotFoundError:
+                    # Versão apagada entre a leitura do link e a abertura
+                    return self._version is not None
+                version, arrays, meta = opened
+                self._load(arrays, meta, writable=False)
+                self._version = version
+                logger.info("Cubo de vendas mapeado do snapshot %s: %s itens.", version, meta["rows"])
+            return self._version is not None
+        finally:
+            self._lock.release()
+
+    def _load(self, arrays: dict[str, np.ndarray], meta: dict[str, Any], writable: bool) -> None:
+        # np.asarray mantém o mapeamento (somente leitura); np.array copia
+        prepare = np.array if writable else np.asarray
+        columns = {name: prepare(arrays[f"column.{name}"]) for name in STORED}
+        self._dictionaries = {
+            name: _Dictionary.from_values(prepare(arrays[f"values.{name}"])) for name in ENCODED
+        }
+        self._snapshot = (
+            meta["rows"],
+            columns,
+            {name: dictionary.values for name, dictionary in self._dictionaries.items()},
+        )
+        self._watermark = meta["watermark"]
+        self._refreshed_at = time.monotonic()
+        self._rebuilt_at = self._refreshed_at - max(time.time() - meta["rebuilt_at"], 0.0)
+        self._ready = True
+
+    def _rebuild(self) -> None:
+        started = time.monotonic()
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM sale_item")
+            min_id, max_id = cursor.fetchone()
+
+        dictionaries = {name: _Dictionary() for name in ENCODED}
+        chunks = []
+        watermark = None
+        for low in range(min_id - 1, max_id, self.chunk_size):
+            rows = self._fetch(
+                "si.id > %(low)s AND si.id <= %(high)s",
+                {"low": low, "high": low + self.chunk_size},
+            )
+            if rows.size == 0:
+                continue
+            chunk = {name: rows[name] for name in STORED}
+            for name in ENCODED:
+                chunk[name] = dictionaries[name].encode(chunk[name])
+            chunks.append(chunk)
+            watermark = max(watermark or 0, int(rows["changed_at"].max()))
+
+        columns = {}
+        for name in STORED:
+            values = [chunk[name] for chunk in chunks]
+            data = np.concatenate(values) if values else np.empty(0, dtype=np.int64)
+            dtype = _fit(np.dtype(np.bool_ if name == "live" else np.uint8), data)
+            if name in ENCODED:
+                dtype = _fit(dtype, np.array([max(len(dictionaries[name]) - 1, 0)]))
+            columns[name] = data.astype(dtype)
+
+        self._dictionaries = dictionaries
+        size = columns["id"].size
+        self._snapshot = (size, columns, {n: d.values for n, d in dictionaries.items()})
+        self._watermark = watermark
+        self._refreshed_at = self._rebuilt_at = time.monotonic()
+        self._ready = True
+        logger.info(
+            "Cubo de vendas carregado: %s itens, %s bytes/item, %.1fs.",
+            size, self.stats()["bytes_per_row"], time.monotonic() - started,
+        )
+
+    def _refresh(self) -> None:
+        self._refreshed_at = time.monotonic()
+        # Exclusões físicas e mudanças de dimensão só entram na reconstrução
+        expired = self._refreshed_at - self._rebuilt_at > self.full_rebuild_interval
+        if self._watermark is None or expired:
+            self._rebuild()
+            return
+
+        size, columns, _ = self._snapshot
+        max_id = int(columns["id"][size - 1]) if size else 0
+        since = datetime.fromtimestamp(self._watermark / 1_000_000, tz=dt_timezone.utc)
+        rows = self._fetch(CHANGED_WHERE, {"max_id": max_id, "since": since - REFRESH_OVERLAP})
+        if rows.size == 0:
+            return
+
+        changes = {name: rows[name] for name in STORED}
+        for name in ENCODED:
+            changes[name] = self._dictionaries[name].encode(changes[name])
+        dictionaries = {name: d.values for name, d in self._dictionaries.items()}
+        # Dicionários só crescem: publicá-los antes das linhas é seguro
+        self._snapshot = (size, columns, dictionaries)
+
+        position = np.searchsorted(columns["id"][:size], changes["id"])
+        existing = position < size
+        existing[existing] = columns["id"][position[existing]] == changes["id"][existing]
+
+        # Sobrescreve no lugar (leitores podem ver uma linha pela metade por
+        # um instante); alargar o dtype cria um array novo
+        columns = dict(columns)
+        for name in STORED:
+            values = changes[name]
+            if columns[name].dtype != _fit(columns[name].dtype, values):
+                columns[name] = columns[name].astype(_fit(columns[name].dtype, values))
+            columns[name][position[existing]] = values[existing]
+
+        new = ~existing
+        if new.any():
+            size, columns = self._insert(size, columns, position[new], {
+                name: changes[name][new] for name in STORED
+            })
+
+        self._snapshot = (size, columns, dictionaries)
+        self._watermark = max(self._watermark, int(rows["changed_at"].max()))
+
+    @staticmethod
+    def _insert(
+        size: int,
+        columns: dict[str, np.ndarray],
+        position: np.ndarray,
+        values: dict[str, np.ndarray],
+    ) -> tuple[int, dict[str, np.ndarray]]:
+        count = position.size
+        capacity = columns["id"].size
+        if (position == size).all() and size + count <= capacity:
+            # Caso comum: ids novos no fim, cabem na folga
+            for name in STORED:
+                columns[name][size:size + count] = values[name]
+            return size + count, columns
+
+        # Ids no meio (COMMIT atrasado) ou sem folga: copia com o dobro de espaço
+        new_capacity = max(2 * (size + count), 1024)
+        result = {}
+        for name in STORED:
+            merged = np.insert(columns[name][:size], position, values[name])
+            column = np.zeros(new_capacity, dtype=merged.dtype)
+            column[:merged.size] = merged
+            result[name] = column
+        return size + count, result
+
+    def _fetch(self, where: str, params: dict[str, Any] | None = None) -> np.ndarray:
+        sql = COPY_SQL.format(where=where)
+        params = {"tz": timezone.get_current_timezone_name(), **(params or {})}
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            with cursor.cursor.copy(sql, params) as copy:
+                data = b"".join(bytes(block) for block in copy)
+
+        body = memoryview(data)[COPY_HEADER_SIZE:len(data) - COPY_TRAILER_SIZE]
+        if len(body) % COPY_DTYPE.itemsize:
+            raise ValueError("Formato inesperado no COPY binário do cubo de vendas.")
+        return np.frombuffer(body, dtype=COPY_DTYPE)
+
+
+sales_cube = SalesCube()
+
+
+def query_database(
+    group_by: list[str],
+    start: date | None = None,
+    end: date | None = None,
+    filters: dict[str, list] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Mesma consulta de `SalesCube.query`, agrupada pelo Postgres."""
+    paths = {
+        "product_group": "product__product_group",
+        "branch": "sale__branch",
+        "employee": "sale__employee",
+        "gender": "sale__customer__gender",
+    }
+    queryset = filter_days(
+        SaleItem.objects.filter(active=True, sale__active=True), "sale__date", start, end
+    )
+    for name, accepted in (filters or {}).items():
+        queryset = queryset.filter(**{f"{paths[name]}__in": accepted})
+
+    measures = {
+        "revenue": Sum(
+            ExpressionWrapper(
+                F("quantity") * F("sale_price"),
+                output_field=DecimalField(max_digits=18, decimal_places=2),
+            )
+        ),
+        # "quantity" é campo de SaleItem: o nome só troca no fim
+        "total_quantity": Sum("quantity"),
+        "items": Count("id"),
+    }
+    if group_by:
+        fields = {
+            name: TruncMonth("sale__date") if name == "month" else F(paths[name])
+            for name in group_by
+        }
+        rows = (
+            queryset.annotate(**fields)
+            .values(*group_by)
+            .annotate(**measures)
+            .order_by("-revenue")
+        )
+        rows = rows[:limit] if limit else rows
+    else:
+        rows = [queryset.aggregate(**measures)]
+        rows = [row for row in rows if row["items"]]
+
+    result = []
+    for row in rows:
+        row["revenue"] = (row["revenue"] or Decimal(0)).quantize(CENTS)
+        row["quantity"] = row.pop("total_quantity") or Decimal(0)
+        if "month" in row:
+            row["month"] = timezone.localtime(row["month"]).date()
+        result.append(row)
+    return result
+
+
+def query(
+    group_by: list[str],
+    start: date | None = None,
+    end: date | None = None,
+    filters: dict[str, list] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Consulta o cubo em memória (SALES_CUBE_ENABLED) ou, sem ele, o banco."""
+    if ENABLED:
+        return sales_cube.query(group_by, start, end, filters, limit)
+    return query_database(group_by, start, end, filters, limit)
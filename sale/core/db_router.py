@@ -0,0 +1,218 @@
+"""
+Roteamento de leituras para réplicas do PostgreSQL.
+
+Por padrão tudo vai para o primário ("default"). Leituras só vão para uma
+réplica dentro de `use_replica()` (context manager ou decorator) ou em
+selectors decorados com `replica_selector`. Em ambos os casos:
+
+- réplicas atrasadas mais que REPLICA_MAX_LAG segundos (ou fora do ar)
+  são ignoradas; sem réplica saudável, a leitura cai no primário;
+- depois de uma escrita na mesma requisição, ou por REPLICA_STICKY_SECONDS
+  após um POST/PUT/PATCH/DELETE do mesmo cliente (cookie), as leituras
+  ficam presas ao primário (read-your-writes).
+
+As réplicas são configuradas em settings.py (aliases "replica_1", ...).
+"""
+
+import functools
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import QuerySet
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIASES = getattr(settings, "REPLICA_DATABASES", [])
+REPLICA_MAX_LAG = getattr(settings, "REPLICA_MAX_LAG", 5.0)
+REPLICA_STICKY_SECONDS = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+# Por quanto tempo (segundos) reaproveitar a medição de atraso de cada réplica
+REPLICA_LAG_CHECK_INTERVAL = 2.0
+STICKY_COOKIE = "sale_primary_pin"
+
+# Alias usado nas leituras do contexto atual (None = primário)
+_read_alias: ContextVar[str | None] = ContextVar("read_alias", default=None)
+# True depois de uma escrita, ou se o cliente escreveu há pouco
+_pinned: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+# True dentro de uma requisição (ReplicaStickinessMiddleware): só aí uma
+# escrita prende as leituras seguintes ao primário
+_in_request: ContextVar[bool] = ContextVar("in_request", default=False)
+
+_round_robin = itertools.cycle(REPLICA_ALIASES or [DEFAULT_DB_ALIAS])
+_lag_cache: dict[str, tuple[float, float | None]] = {}
+
+# Atraso de replicação em segundos; 0 no primário ou com réplica em dia
+_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replica_lag(alias: str) -> float | None:
+    """Mede o atraso de replicação de uma réplica (com cache curto).
+
+    Args:
+        alias: Alias da réplica em settings.DATABASES.
+
+    Returns:
+        float | None: Atraso em segundos, ou None se a réplica não respondeu.
+            Bancos que não são PostgreSQL (ex: SQLite nos testes) contam como 0.
+    """
+    now = time.monotonic()
+    checked_at, lag = _lag_cache.get(alias, (0.0, None))
+    if now - checked_at < REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+
+    connection = connections[alias]
+    try:
+        if connection.vendor != "postgresql":
+            lag = 0.0
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(_LAG_SQL)
+                value = cursor.fetchone()[0]
+            lag = float(value) if value is not None else None
+    except DatabaseError:
+        logger.warning("Réplica %s indisponível; usando o primário.", alias)
+        lag = None
+
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def choose_replica() -> str:
+    """Escolhe uma réplica saudável (round-robin) ou o primário.
+
+    Returns:
+        str: Alias do banco que deve receber a leitura.
+    """
+    if _pinned.get() or not REPLICA_ALIASES:
+        return DEFAULT_DB_ALIAS
+
+    for _ in range(len(REPLICA_ALIASES)):
+        alias = next(_round_robin)
+        lag = replica_lag(alias)
+        if lag is not None and lag <= REPLICA_MAX_LAG:
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_replica():
+    """Envia as leituras do bloco para uma réplica.
+
+    Yields:
+        str: Alias escolhido ("default" se nenhuma réplica serve).
+
+    Example:
+        with use_replica():
+            total = get_total_employee_salary()
+    """
+    alias = choose_replica()
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Força as leituras do bloco para o primário."""
+    token = _read_alias.set(None)
+    try:
+        yield DEFAULT_DB_ALIAS
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def pin_to_primary():
+    """Prende ao primário todas as leituras do bloco, inclusive as de selectors
+    decorados com `replica_selector`."""
+    token = _pinned.set(True)
+    try:
+        yield DEFAULT_DB_ALIAS
+    finally:
+        _pinned.reset(token)
+
+
+def is_pinned() -> bool:
+    """True se as leituras do contexto atual estão presas ao primário."""
+    return _pinned.get()
+
+
+def replica_selector(func):
+    """Decorator para selectors somente leitura.
+
+    QuerySets são lazy e podem ser avaliados fora do `with`; por isso o
+    QuerySet retornado já sai amarrado à réplica com .using(alias).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_replica() as alias:
+            result = func(*args, **kwargs)
+            if isinstance(result, QuerySet):
+                result = result.using(alias)
+            return result
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Router do Django: escritas no primário, leituras conforme o contexto."""
+
+    def db_for_read(self, model, **hints):
+        if _pinned.get():
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Tudo que for lido depois de escrever na requisição precisa enxergar
+        # a escrita. Fora dela (comandos, jobs, threads do processo) não há
+        # quem desfaça o pin, e uma escrita prenderia ao primário todas as
+        # leituras seguintes do thread: lá, quem quer ler do primário usa
+        # pin_to_primary()
+        if _in_request.get():
+            _pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """Prende as leituras ao primário logo depois de uma escrita do cliente."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_token = _in_request.set(True)
+        token = _pinned.set(STICKY_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+            _in_request.reset(request_token)
+
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,231 @@
+"""
+Cache em memória das dimensões pequenas (zonas, estados, cidades, bairros,
+estados civis, departamentos, grupos de produtos e filiais).
+
+Validar um POST de venda ou de funcionário fazia um SELECT por FK só para
+conferir que o id existe. Cada worker guarda essas tabelas inteiras em dicts
+{id: {campo: valor}} e os serializers validam as FKs por eles (ver
+core.serializers.CachedPrimaryKeyRelatedField).
+
+Frescor: a tabela table_version tem um contador por tabela, somado pelos
+triggers da migration 0014 a cada comando que a altera. No máximo uma vez por
+DIMENSION_CACHE_CHECK_INTERVAL segundos o cache lê esses contadores (uma
+consulta para todas as tabelas) e recarrega só as tabelas que mudaram.
+
+Com o barramento de invalidação (core.invalidation) conectado, as linhas
+alteradas chegam por NOTIFY e só elas são relidas; a conferência de versões
+passa a ser uma rede de segurança, a cada DIMENSION_CACHE_BUS_CHECK_INTERVAL.
+"""
+
+import logging
+import threading
+import time
+from functools import partial
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Model
+
+from core.invalidation import invalidation_bus
+from core.models import (
+    Branch,
+    City,
+    Department,
+    District,
+    MaritalStatus,
+    ProductGroup,
+    State,
+    TableVersion,
+    Zone,
+)
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (segundos) entre duas conferências de versão
+CHECK_INTERVAL = getattr(settings, "DIMENSION_CACHE_CHECK_INTERVAL", 1.0)
+
+# O mesmo intervalo enquanto o barramento de invalidação está conectado
+BUS_CHECK_INTERVAL = getattr(settings, "DIMENSION_CACHE_BUS_CHECK_INTERVAL", 60.0)
+
+# Acima disso a tabela não é "pequena": fica fora do cache e as FKs vão ao banco
+MAX_ROWS = getattr(settings, "DIMENSION_CACHE_MAX_ROWS", 50_000)
+
+DIMENSIONS: list[type[Model]] = [
+    Branch,
+    City,
+    Department,
+    District,
+    MaritalStatus,
+    ProductGroup,
+    State,
+    Zone,
+]
+
+
+class DimensionCache:
+    """Tabelas de dimensão inteiras em memória, por id, com controle de versão."""
+
+    def __init__(
+        self,
+        models: list[type[Model]] = DIMENSIONS,
+        check_interval: float = CHECK_INTERVAL,
+        bus_check_interval: float = BUS_CHECK_INTERVAL,
+        max_rows: int = MAX_ROWS,
+        bus=invalidation_bus,
+    ) -> None:
+        self.check_interval = check_interval
+        self.bus_check_interval = bus_check_interval
+        self.max_rows = max_rows
+        self.bus = bus
+        self._models = {model._meta.db_table: model for model in models}
+        # db_table -> (versão, {id: linha}); None = grande demais para o cache
+        self._tables: dict[str, tuple[int, dict[int, dict[str, Any]] | None]] = {}
+        # Alterações avisadas pelo barramento e ainda não relidas (None = tudo)
+        self._changed: dict[str, set[int] | None] = {}
+        self._changed_lock = threading.Lock()
+        self._subscribed = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def handles(self, model: type[Model]) -> bool:
+        return model._meta.db_table in self._models
+
+    def rows(self, model: type[Model]) -> dict[int, dict[str, Any]] | None:
+        """Todas as linhas da tabela, por id, ou None se ela não está no cache.
+
+        O dict devolvido não deve ser alterado: é compartilhado entre threads
+        e trocado inteiro (nunca alterado) quando a tabela muda.
+        """
+        table = model._meta.db_table
+        if table not in self._models:
+            return None
+        self._maybe_refresh()
+        return self._tables.get(table, (0, None))[1]
+
+    def get(self, model: type[Model], pk: int) -> dict[str, Any] | None:
+        """Linha com o id informado (campos pelo attname, ex: 'city_id')."""
+        rows = self.rows(model)
+        return rows.get(pk) if rows is not None else None
+
+    def instance(self, model: type[Model], pk: int) -> Model | None:
+        """Instância do model montada a partir do cache, sem ir ao banco."""
+        row = self.get(model, pk)
+        if row is None:
+            return None
+        instance = model(**row)
+        instance._state.adding = False
+        instance._state.db = DEFAULT_DB_ALIAS
+        return instance
+
+    def invalidate(self) -> None:
+        """Força a conferência das versões na próxima leitura."""
+        self._checked_at = 0.0
+
+    def _maybe_refresh(self) -> None:
+        if not self._tables:
+            with self._lock:
+                if not self._tables:
+                    self._subscribe()
+                    self._refresh()
+            return
+
+        interval = self.bus_check_interval if self.bus.healthy else self.check_interval
+        expired = time.monotonic() - self._checked_at >= interval
+        if not expired and not self._changed:
+            return
+
+        # Apenas um thread atualiza; os demais seguem com as tabelas atuais
+        if self._lock.acquire(blocking=False):
+            try:
+                if expired:
+                    self._refresh()
+                else:
+                    self._reload_changed()
+            finally:
+                self._lock.release()
+
+    def _subscribe(self) -> None:
+        if self._subscribed:
+            return
+        for table in self._models:
+            self.bus.subscribe(table, partial(self._on_change, table))
+        self._subscribed = True
+
+    def _on_change(self, table: str, ids: set[int] | None) -> None:
+        # Roda no thread do barramento: só anota, quem relê é a próxima leitura
+        with self._changed_lock:
+            if ids is None or (table in self._changed and self._changed[table] is None):
+                self._changed[table] = None
+            else:
+                self._changed.setdefault(table, set()).update(ids)
+
+    def _take_changed(self) -> dict[str, set[int] | None]:
+        with self._changed_lock:
+            changed, self._changed = self._changed, {}
+        return changed
+
+    def _reload_changed(self) -> None:
+        changed = self._take_changed()
+        versions = self._versions()
+        for table, ids in changed.items():
+            model = self._models[table]
+            cached = self._tables.get(table)
+            if ids is None or cached is None or cached[1] is None:
+                self._tables[table] = (versions.get(table, 0), self._load(model))
+                continue
+            # Relê só as linhas avisadas; as que sumiram saem do cache
+            rows = dict(cached[1])
+            for pk in ids:
+                rows.pop(pk, None)
+            rows.update(self._load_rows(model, ids))
+            self._tables[table] = (versions.get(table, 0), rows)
+
+    def _versions(self) -> dict[str, int]:
+        # Sempre no primário: numa réplica atrasada a versão voltaria no tempo
+        return dict(
+            TableVersion.objects.using(DEFAULT_DB_ALIAS)
+            .filter(table_name__in=self._models)
+            .values_list("table_name", "version")
+        )
+
+    def _refresh(self) -> None:
+        self._checked_at = time.monotonic()
+        # A conferência completa cobre também o que o barramento avisou
+        self._take_changed()
+        versions = self._versions()
+        for table, model in self._models.items():
+            version = versions.get(table, 0)
+            cached = self._tables.get(table)
+            if cached is not None and cached[0] == version:
+                continue
+            # A versão é lida antes das linhas: uma alteração no meio do
+            # caminho só faz a tabela ser recarregada de novo na próxima vez
+            self._tables[table] = (version, self._load(model))
+
+    @staticmethod
+    def _queryset(model: type[Model]):
+        fields = [
+            field.attname
+            for field in model._meta.concrete_fields
+            if not field.generated
+        ]
+        return model._base_manager.using(DEFAULT_DB_ALIAS).order_by().values(*fields)
+
+    def _load_rows(self, model: type[Model], ids: set[int]) -> dict[int, dict[str, Any]]:
+        pk = model._meta.pk.attname
+        return {row[pk]: row for row in self._queryset(model).filter(pk__in=ids)}
+
+    def _load(self, model: type[Model]) -> dict[int, dict[str, Any]] | None:
+        rows = list(self._queryset(model)[: self.max_rows + 1])
+        if len(rows) > self.max_rows:
+            logger.warning(
+                "Tabela %s fora do cache de dimensões: mais de %s linhas.",
+                model._meta.db_table,
+                self.max_rows,
+            )
+            return None
+        return {row[model._meta.pk.attname]: row for row in rows}
+
+
+dimension_cache = DimensionCache()
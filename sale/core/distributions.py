@@ -0,0 +1,349 @@
+"""
+Percentis e histogramas (distribuição) de salário, renda e valor das vendas.
+
+Modo exato: tudo calculado no banco, numa passada pelos dados,
+com percentile_cont (mediana, p90, p99) e width_bucket (histograma de faixas
+de mesma largura entre o mínimo e o máximo). Serve bem para as dimensões
+(employee, customer).
+
+Modo aproximado, para a tabela de fatos: o valor de cada venda
+(SUM(quantity * sale_price) dos itens) é resumido por dia em
+basket_value_sketch, um histograma em faixas logarítmicas (DDSketch):
+
+    faixa i = ceil(log_gamma(valor)),  gamma = (1 + a) / (1 - a)
+
+Estimar um quantil pelo centro da faixa erra no máximo `a`
+(RELATIVE_ACCURACY) para mais ou para menos, e sketches de dias diferentes
+se somam faixa a faixa. Uma consulta de distribuição lê então uma linha por
+dia do período, em vez de todos os itens de venda.
+"""
+
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Avg, Count, Max, Min, QuerySet
+from django.utils import timezone
+
+from core.functions import PercentileCont, WidthBucket
+from core.models import BasketValueSketch, Sale
+from core.periods import day_bounds
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = [0.5, 0.9, 0.99]
+BUCKETS = 10
+# Erro relativo máximo dos quantis aproximados (1%)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Dias lidos por consulta ao atualizar os sketches
+REFRESH_DAYS = 31
+
+
+def _result(count, minimum, maximum, average, percentiles, totals, buckets, approximate):
+    """Monta o dicionário devolvido pelas funções de distribuição.
+
+    `totals` mapeia o número da faixa (1..buckets) para a quantidade de
+    valores nela; faixas vazias entram no histograma com total 0.
+    """
+    if not count:
+        return {
+            "count": 0, "min": None, "max": None, "avg": None,
+            **{f"p{round(fraction * 100)}": None for fraction in PERCENTILES},
+            "histogram": [],
+            "approximate": approximate,
+        }
+
+    width = (float(maximum) - float(minimum)) / buckets
+    return {
+        "count": count,
+        "min": minimum,
+        "max": maximum,
+        "avg": average,
+        **{
+            f"p{round(fraction * 100)}": value
+            for fraction, value in zip(PERCENTILES, percentiles)
+        },
+        "histogram": [
+            {
+                "bucket": bucket,
+                "lower": float(minimum) + (bucket - 1) * width,
+                "upper": float(minimum) + bucket * width,
+                "total": totals.get(bucket, 0),
+            }
+            for bucket in range(1, buckets + 1)
+        ],
+        "approximate": approximate,
+    }
+
+
+def exact_distribution(queryset: QuerySet, field: str, buckets: int = BUCKETS) -> dict[str, Any]:
+    """Distribuição exata de um campo numérico de um QuerySet.
+
+    Args:
+        queryset: Linhas a considerar (os filtros já aplicados).
+        field: Campo numérico.
+        buckets: Quantidade de faixas do histograma.
+
+    Returns:
+        dict[str, Any]: count, min, max, avg, p50, p90, p99 e histogram.
+            Equivale a: SELECT COUNT(salary), MIN(salary), MAX(salary), AVG(salary),
+                               percentile_cont(ARRAY[0.5, 0.9, 0.99])
+                                   WITHIN GROUP (ORDER BY salary)
+                        FROM employee WHERE active;
+                        SELECT LEAST(width_bucket(salary, %s, %s, 10), 10) AS bucket, COUNT(*)
+                        FROM employee WHERE active
+                        GROUP BY bucket
+    """
+    stats = queryset.aggregate(
+        count=Count(field),
+        minimum=Min(field),
+        maximum=Max(field),
+        average=Avg(field),
+        percentiles=PercentileCont(field, PERCENTILES),
+    )
+
+    totals = {}
+    if stats["count"] and stats["maximum"] > stats["minimum"]:
+        rows = (
+            queryset.filter(**{f"{field}__isnull": False})
+            .annotate(bucket=WidthBucket(field, stats["minimum"], stats["maximum"], buckets))
+            .values("bucket")
+            .annotate(total=Count("pk"))
+            .order_by("bucket")
+        )
+        totals = {row["bucket"]: row["total"] for row in rows}
+    elif stats["count"]:
+        totals = {1: stats["count"]}
+
+    return _result(
+        stats["count"], stats["minimum"], stats["maximum"], stats["average"],
+        stats["percentiles"], totals, buckets, approximate=False,
+    )
+
+
+def exact_basket_distribution(
+    start: date | None = None,
+    end: date | None = None,
+    buckets: int = BUCKETS,
+) -> dict[str, Any]:
+    """Distribuição exata do valor das vendas, lendo todos os itens do período.
+
+    Note:
+        Uma única consulta: a CTE com o valor de cada venda é materializada
+        uma vez e lida pelas estatísticas e pelo histograma.
+    """
+    conditions = ["s.active", "si.active"]
+    start_at, end_at = day_bounds(start, end)
+    params: dict[str, Any] = {"fractions": PERCENTILES, "buckets": buckets}
+    if start_at:
+        conditions.append("s.date >= %(start)s")
+        params["start"] = start_at
+    if end_at:
+        conditions.append("s.date < %(end)s")
+        params["end"] = end_at
+
+    with connections[router.db_for_read(Sale)].cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH basket AS MATERIALIZED (
+                SELECT SUM(si.quantity * si.sale_price) AS value
+                FROM sale s
+                JOIN sale_item si ON si.id_sale = s.id
+                WHERE {" AND ".join(conditions)}
+                GROUP BY s.id
+                HAVING SUM(si.quantity * si.sale_price) IS NOT NULL
+            ), stats AS (
+                SELECT COUNT(*) AS count, MIN(value) AS minimum, MAX(value) AS maximum,
+                       AVG(value) AS average,
+                       percentile_cont(%(fractions)s::float8[])
+                           WITHIN GROUP (ORDER BY value) AS percentiles
+                FROM basket
+            )
+            SELECT st.count, st.minimum, st.maximum, st.average, st.percentiles,
+                   (
+                       SELECT json_object_agg(h.bucket, h.total)
+                       FROM (
+                           SELECT CASE
+                                      WHEN st.maximum > st.minimum THEN LEAST(
+                                          width_bucket(b.value, st.minimum, st.maximum, %(buckets)s),
+                                          %(buckets)s
+                                      )
+                                      ELSE 1
+                                  END AS bucket,
+                                  COUNT(*) AS total
+                           FROM basket b
+                           GROUP BY 1
+                       ) h
+                   )
+            FROM stats st
+            """,
+            params,
+        )
+        count, minimum, maximum, average, percentiles, totals = cursor.fetchone()
+
+    totals = {int(bucket): total for bucket, total in (totals or {}).items()}
+    return _result(
+        count, minimum, maximum, average, percentiles, totals, buckets, approximate=False,
+    )
+
+
+def refresh_basket_sketches(start: date | None = None, end: date | None = None) -> int:
+    """Recalcula os sketches diários do valor das vendas entre start e end.
+
+    Args:
+        start: Primeiro dia. Padrão: último dia já calculado (que podia
+            estar incompleto) ou, sem nenhum sketch, o dia da primeira venda.
+        end: Último dia. Padrão: hoje.
+
+    Returns:
+        int: Quantidade de dias gravados.
+
+    Note:
+        Vendas alteradas em dias antigos só entram nos sketches ao refazer
+        esses dias (--start no comando refresh_basket_sketches).
+    """
+    today = timezone.localdate()
+    if start is None:
+        last = BasketValueSketch.objects.using(DEFAULT_DB_ALIAS).order_by("-day").first()
+        if last:
+            start = last.day
+        else:
+            first_sale = Sale.objects.using(DEFAULT_DB_ALIAS).order_by("date").first()
+            if first_sale is None:
+                return 0
+            start = timezone.localtime(first_sale.date).date()
+    end = end or today
+
+    written = 0
+    while start <= end:
+        chunk_end = min(start + timedelta(days=REFRESH_DAYS - 1), end)
+        sketches = _compute_sketches(start, chunk_end)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            BasketValueSketch.objects.using(DEFAULT_DB_ALIAS).filter(
+                day__gte=start, day__lte=chunk_end,
+            ).delete()
+            BasketValueSketch.objects.using(DEFAULT_DB_ALIAS).bulk_create(sketches)
+        logger.info("Sketches de %s a %s: %s dias com vendas.", start, chunk_end, len(sketches))
+        written += len(sketches)
+        start = chunk_end + timedelta(days=1)
+    return written
+
+
+def _compute_sketches(start: date, end: date) -> list[BasketValueSketch]:
+    start_at, end_at = day_bounds(start, end)
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT b.day,
+                   CASE WHEN b.value > 0 THEN ceil(ln(b.value) / ln(%(gamma)s))::integer END AS bin,
+                   COUNT(*), SUM(b.value), MIN(b.value), MAX(b.value)
+            FROM (
+                SELECT (s.date AT TIME ZONE %(tz)s)::date AS day,
+                       SUM(si.quantity * si.sale_price) AS value
+                FROM sale s
+                JOIN sale_item si ON si.id_sale = s.id
+                WHERE s.active AND si.active AND s.date >= %(start)s AND s.date < %(end)s
+                GROUP BY s.id
+            ) b
+            WHERE b.value IS NOT NULL
+            GROUP BY b.day, bin
+            """,
+            {
+                "gamma": GAMMA,
+                "tz": timezone.get_current_timezone_name(),
+                "start": start_at,
+                "end": end_at,
+            },
+        )
+        rows = cursor.fetchall()
+
+    days: dict[date, dict[str, Any]] = {}
+    for day, bin_, count, total, minimum, maximum in rows:
+        sketch = days.setdefault(
+            day,
+            {"count": 0, "total": Decimal(0), "minimum": minimum, "maximum": maximum,
+             "zero_count": 0, "bins": {}},
+        )
+        sketch["count"] += count
+        sketch["total"] += total
+        sketch["minimum"] = min(sketch["minimum"], minimum)
+        sketch["maximum"] = max(sketch["maximum"], maximum)
+        if bin_ is None:
+            sketch["zero_count"] += count
+        else:
+            sketch["bins"][bin_] = count
+
+    sketches = []
+    for day, sketch in days.items():
+        bins = sketch.pop("bins")
+        offset = min(bins, default=0)
+        counts = [0] * (max(bins, default=-1) - offset + 1)
+        for bin_, count in bins.items():
+            counts[bin_ - offset] = count
+        sketches.append(BasketValueSketch(day=day, offset=offset, bins=counts, **sketch))
+    return sketches
+
+
+def approximate_basket_distribution(
+    start: date | None = None,
+    end: date | None = None,
+    buckets: int = BUCKETS,
+) -> dict[str, Any]:
+    """Distribuição aproximada do valor das vendas, somando os sketches diários.
+
+    Note:
+        Quantis com erro relativo de até RELATIVE_ACCURACY; o histograma
+        distribui cada faixa logarítmica pelo seu valor central. Dias ainda
+        não calculados por refresh_basket_sketches ficam de fora.
+    """
+    sketches = BasketValueSketch.objects.all()
+    if start:
+        sketches = sketches.filter(day__gte=start)
+    if end:
+        sketches = sketches.filter(day__lte=end)
+    rows = list(
+        sketches.values_list(
+            "count", "total", "minimum", "maximum", "zero_count", "offset", "bins",
+        )
+    )
+
+    count = sum(row[0] for row in rows)
+    if not count:
+        return _result(0, None, None, None, [], {}, buckets, approximate=True)
+
+    minimum = min(row[2] for row in rows if row[2] is not None)
+    maximum = max(row[3] for row in rows if row[3] is not None)
+    average = sum(row[1] for row in rows) / count
+
+    # Soma os sketches faixa a faixa; a posição 0 guarda as cestas de valor zero
+    filled = [row for row in rows if row[6]]
+    low = min((row[5] for row in filled), default=0)
+    high = max((row[5] + len(row[6]) - 1 for row in filled), default=-1)
+    weights = np.zeros(high - low + 2, dtype=np.int64)
+    for _, _, _, _, zero_count, offset, bins in rows:
+        weights[0] += zero_count
+        if bins:
+            weights[offset - low + 1 : offset - low + 1 + len(bins)] += bins
+    # Valor central de cada faixa: 2 * gamma^i / (gamma + 1)
+    values = np.r_[0.0, 2 * GAMMA ** np.arange(low, high + 1, dtype=np.float64) / (GAMMA + 1)]
+    values = np.clip(values, float(minimum), float(maximum))
+
+    cumulative = np.cumsum(weights)
+    ranks = np.asarray(PERCENTILES) * (count - 1)
+    percentiles = values[np.searchsorted(cumulative, ranks, side="right")].tolist()
+
+    if maximum > minimum:
+        position = (values - float(minimum)) / (float(maximum) - float(minimum)) * buckets
+        bucket = np.clip(np.floor(position).astype(np.int64) + 1, 1, buckets)
+        histogram = np.bincount(bucket, weights=weights, minlength=buckets + 1)
+        totals = {index: int(total) for index, total in enumerate(histogram) if index}
+    else:
+        totals = {1: count}
+
+    return _result(
+        count, minimum, maximum, average, percentiles, totals, buckets, approximate=True,
+    )
@@ -0,0 +1,172 @@
+"""
+Filtros declarativos dos viewsets do app core.
+
+Cada FilterSet expõe apenas uma lista fechada (whitelist) de parâmetros,
+espelhando os lookups já usados em selectors.py. Todo filtro aqui tem um
+índice correspondente em models.py, para que a consulta custe O(resultado)
+e não O(tabela).
+"""
+
+import django_filters
+from django_filters.constants import EMPTY_VALUES
+
+from core import models
+from core.periods import filter_days
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Aceita listas separadas por vírgula: ?department=1,2,3"""
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Aceita listas separadas por vírgula: ?abbreviation=SP,RJ"""
+
+
+class DayFilter(django_filters.DateFilter):
+    """Dia inteiro de um DateTimeField, como intervalo [00:00, 00:00 do dia seguinte).
+
+    O lookup `date` do Django vira (date AT TIME ZONE ...)::date, que não usa
+    o índice da coluna; o intervalo usa.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if self.distinct:
+            qs = qs.distinct()
+        return filter_days(qs, self.field_name, value, value)
+
+
+class NameFilterSet(django_filters.FilterSet):
+    # istartswith usa o índice UPPER(name) text_pattern_ops
+    name = django_filters.CharFilter(lookup_expr="istartswith")
+    active = django_filters.BooleanFilter()
+
+
+class ProductFilter(NameFilterSet):
+    # get_products_in_price_range / get_products_above_price / ..._below_price
+    min_price = django_filters.NumberFilter(field_name="sale_price", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="sale_price", lookup_expr="lte")
+    min_cost = django_filters.NumberFilter(field_name="cost_price", lookup_expr="gte")
+    max_cost = django_filters.NumberFilter(field_name="cost_price", lookup_expr="lte")
+    product_group = NumberInFilter(field_name="product_group", lookup_expr="in")
+    supplier = NumberInFilter(field_name="supplier", lookup_expr="in")
+
+    class Meta:
+        model = models.Product
+        fields = []
+
+
+class CustomerFilter(NameFilterSet):
+    # get_customers_by_city_name; istartswith usa o índice UPPER(city_name)
+    # text_pattern_ops de district_geo
+    city = django_filters.CharFilter(
+        field_name="geo__city_name",
+        lookup_expr="istartswith",
+    )
+    # get_customers_by_state_abbreviation
+    state = django_filters.CharFilter(
+        field_name="geo__state_abbreviation",
+        lookup_expr="exact",
+    )
+    # get_customers_with_income_between
+    min_income = django_filters.NumberFilter(field_name="income", lookup_expr="gte")
+    max_income = django_filters.NumberFilter(field_name="income", lookup_expr="lte")
+    gender = django_filters.ChoiceFilter(choices=models.Customer.Gender.choices)
+    district = NumberInFilter(field_name="district", lookup_expr="in")
+    marital_status = NumberInFilter(field_name="marital_status", lookup_expr="in")
+    # Segmento RFM gravado pelo comando refresh_rfm (tabela customer_rfm)
+    segment = django_filters.MultipleChoiceFilter(
+        field_name="rfm__segment",
+        choices=models.CustomerRFM.Segment.choices,
+    )
+
+    class Meta:
+        model = models.Customer
+        fields = []
+
+
+class EmployeeFilter(NameFilterSet):
+    # get_employees_from_departments
+    department = NumberInFilter(field_name="department", lookup_expr="in")
+    # get_high_salary_employees / get_employees_salary_below
+    min_salary = django_filters.NumberFilter(field_name="salary", lookup_expr="gte")
+    max_salary = django_filters.NumberFilter(field_name="salary", lookup_expr="lte")
+    # get_employees_hired_in_year / get_employees_hired_before_year
+    admission_date = django_filters.DateFromToRangeFilter()
+    admission_year = django_filters.NumberFilter(
+        field_name="admission_date",
+        lookup_expr="year",
+    )
+    # get_employees_born_after
+    birth_date = django_filters.DateFromToRangeFilter()
+    gender = django_filters.CharFilter()
+    district = NumberInFilter(field_name="district", lookup_expr="in")
+
+    class Meta:
+        model = models.Employee
+        fields = []
+
+
+class SaleFilter(django_filters.FilterSet):
+    # get_sales_on_date / get_sales_in_year
+    date = django_filters.IsoDateTimeFromToRangeFilter()
+    day = DayFilter(field_name="date")
+    year = django_filters.NumberFilter(field_name="date", lookup_expr="year")
+    branch = NumberInFilter(field_name="branch", lookup_expr="in")
+    customer = django_filters.NumberFilter()
+    employee = django_filters.NumberFilter()
+    active = django_filters.BooleanFilter()
+
+    class Meta:
+        model = models.Sale
+        fields = []
+
+
+class SaleItemFilter(django_filters.FilterSet):
+    sale = django_filters.NumberFilter()
+    product = django_filters.NumberFilter()
+    # get_sale_items_without_price / get_sale_items_with_price
+    without_price = django_filters.BooleanFilter(
+        field_name="sale_price",
+        lookup_expr="isnull",
+    )
+    active = django_filters.BooleanFilter()
+
+    class Meta:
+        model = models.SaleItem
+        fields = []
+
+
+class StateFilter(NameFilterSet):
+    # get_state_by_abbreviation / get_states_by_abbreviations
+    abbreviation = CharInFilter(lookup_expr="in")
+
+    class Meta:
+        model = models.State
+        fields = []
+
+
+class CityFilter(NameFilterSet):
+    state = NumberInFilter(field_name="state", lookup_expr="in")
+
+    class Meta:
+        model = models.City
+        fields = []
+
+
+class DistrictFilter(NameFilterSet):
+    city = NumberInFilter(field_name="city", lookup_expr="in")
+    zone = NumberInFilter(field_name="zone", lookup_expr="in")
+
+    class Meta:
+        model = models.District
+        fields = []
+
+
+class BranchFilter(NameFilterSet):
+    district = NumberInFilter(field_name="district", lookup_expr="in")
+
+    class Meta:
+        model = models.Branch
+        fields = []
@@ -0,0 +1,146 @@
+"""
+Leitura em lote de valores monetários como inteiros em escala fixa.
+
+Os campos de dinheiro (Product.cost_price, sale_price, SaleItem.sale_price,
+Employee.salary, Customer.income) chegam do banco como Decimal, e código que
+percorre milhares de linhas em Python passa a maior parte do tempo criando e
+somando Decimals. Aqui o caminho é outro, opcional, para leituras em massa:
+
+- o próprio Postgres multiplica cada valor por 10^escala e converte para
+  bigint (centavos para dinheiro, milésimos para SaleItem.quantity);
+- as colunas vêm por COPY ... TO STDOUT (FORMAT binary), todas int8, e viram
+  arrays NumPy int64 com np.frombuffer, sem objeto Python por valor;
+- a aritmética é feita em inteiros, exata (`multiply`, `rescale`,
+  arredondando metade para longe do zero, como o numeric do Postgres);
+- só na saída (API, gravação) os valores voltam a Decimal (`to_decimals`)
+  ou são divididos no próprio SQL.
+
+Exemplo, faturamento por item em centavos:
+
+    arrays = fetch_arrays(
+        SaleItem.objects.filter(active=True),
+        id=F("id"),
+        quantity=scaled(F("quantity"), QUANTITY_SCALE),
+        price=scaled(F("sale_price"), MONEY_SCALE),
+    )
+    revenue = multiply(arrays["quantity"], QUANTITY_SCALE,
+                       arrays["price"], MONEY_SCALE, MONEY_SCALE)
+
+Nulos viram 0, como no `or Decimal(0)` dos selectors. int64 comporta até
+~9,2 * 10^18 unidades: 92 trilhões em escala 5 (centavos × milésimos).
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import BigIntegerField, DecimalField, Expression, QuerySet, Value
+from django.db.models.functions import Cast, Coalesce
+
+# Centavos: todos os campos de dinheiro têm decimal_places=2
+MONEY_SCALE = 2
+# Milésimos: SaleItem.quantity tem decimal_places=3
+QUANTITY_SCALE = 3
+
+COPY_HEADER_SIZE = 19
+COPY_TRAILER_SIZE = 2
+
+_NUMERIC = DecimalField()
+
+
+def scaled(expression: Expression, scale: int) -> Expression:
+    """Expressão multiplicada por 10^scale, para virar inteiro em `fetch_arrays`.
+
+    Args:
+        expression: Campo (F), agregação (Sum, Max...) ou expressão numérica.
+        scale: Casas decimais mantidas (MONEY_SCALE, QUANTITY_SCALE...).
+
+    Example:
+        scaled(Sum(F("quantity") * F("sale_price")), MONEY_SCALE)
+    """
+    return Coalesce(expression, Value(0), output_field=_NUMERIC) * Value(
+        10**scale, output_field=_NUMERIC
+    )
+
+
+def fetch_arrays(queryset: QuerySet, **columns: Expression) -> dict[str, np.ndarray]:
+    """Lê colunas inteiras da consulta direto para arrays int64.
+
+    Args:
+        queryset: Consulta de origem (filtros, values() para agrupar, ordem).
+        **columns: Nome do array -> expressão; valores não inteiros são
+            arredondados (use `scaled` para manter casas decimais).
+
+    Returns:
+        dict[str, np.ndarray]: Arrays int64 alinhados, um por coluna.
+            Equivale a: COPY (SELECT round(<coluna>)::int8, ... FROM ...)
+                        TO STDOUT (FORMAT binary)
+    """
+    names = list(columns)
+    # Aliases próprios: os nomes pedidos podem coincidir com campos do model
+    aliases = {f"_fixed_{index}": name for index, name in enumerate(names)}
+    annotations = {
+        alias: Cast(Coalesce(columns[name], Value(0), output_field=_NUMERIC), BigIntegerField())
+        for alias, name in aliases.items()
+    }
+    try:
+        sql, params = queryset.annotate(**annotations).values_list(*aliases).query.sql_with_params()
+    except EmptyResultSet:
+        # Filtros que nunca casam (ex: id__in=[]) nem chegam ao banco
+        return {name: np.empty(0, dtype=np.int64) for name in names}
+
+    dtype = np.dtype(
+        [("fields", ">i2")]
+        + [field for name in names for field in ((f"{name}_length", ">i4"), (name, ">i8"))]
+    )
+    with connections[queryset.db].cursor() as cursor:
+        with cursor.cursor.copy(f"COPY ({sql}) TO STDOUT (FORMAT binary)", params) as copy:
+            data = b"".join(bytes(block) for block in copy)
+
+    body = memoryview(data)[COPY_HEADER_SIZE:len(data) - COPY_TRAILER_SIZE]
+    if len(body) % dtype.itemsize:
+        raise ValueError("Formato inesperado no COPY binário.")
+    rows = np.frombuffer(body, dtype=dtype)
+    return {name: rows[name].astype(np.int64) for name in names}
+
+
+def rescale(values: np.ndarray, from_scale: int, to_scale: int) -> np.ndarray:
+    """Muda a escala, arredondando metade para longe do zero (como o numeric).
+
+    Example:
+        rescale(np.array([12345, -12345]), 3, 2) retorna array([1235, -1235]).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if to_scale >= from_scale:
+        return values * 10 ** (to_scale - from_scale)
+    divisor = 10 ** (from_scale - to_scale)
+    quotient = (np.abs(values) + divisor // 2) // divisor
+    return np.where(values < 0, -quotient, quotient)
+
+
+def multiply(
+    left: np.ndarray,
+    left_scale: int,
+    right: np.ndarray,
+    right_scale: int,
+    scale: int,
+) -> np.ndarray:
+    """Produto exato de dois arrays em escala fixa, devolvido em `scale`.
+
+    Example:
+        multiply(quantidades, QUANTITY_SCALE, precos, MONEY_SCALE, MONEY_SCALE)
+        dá o valor de cada item em centavos.
+    """
+    product = np.asarray(left, dtype=np.int64) * np.asarray(right, dtype=np.int64)
+    return rescale(product, left_scale + right_scale, scale)
+
+
+def to_decimal(value: int, scale: int) -> Decimal:
+    """Um inteiro em escala fixa como Decimal exato, ex: (1999, 2) -> Decimal('19.99')."""
+    return Decimal(int(value)).scaleb(-scale)
+
+
+def to_decimals(values: np.ndarray, scale: int) -> list[Decimal]:
+    """Array em escala fixa como lista de Decimals exatos (para a resposta da API)."""
+    return [Decimal(value).scaleb(-scale) for value in np.asarray(values).tolist()]
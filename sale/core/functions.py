@@ -0,0 +1,110 @@
+"""
+Funções SQL próprias para usar em annotate(), filter(), values(), etc.
+"""
+
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import (
+    Aggregate,
+    Case,
+    CharField,
+    DecimalField,
+    FloatField,
+    Func,
+    IntegerField,
+    Value,
+    When,
+)
+
+# Faixas etárias: (idade mínima, rótulo), da mais velha para a mais nova
+AGE_BANDS = [
+    (60, "Sênior (60+)"),
+    (50, "Adulto Maduro (50-59)"),
+    (35, "Adulto (35-49)"),
+    (25, "Adulto Jovem (25-34)"),
+    (18, "Jovem (18-24)"),
+    (0, "Menor de Idade"),
+]
+
+
+class Age(Func):
+    """Idade exata em anos completos, calculada no banco.
+
+    Equivale a: EXTRACT(YEAR FROM age(CURRENT_DATE, birth_date))::integer
+    age() já considera se o aniversário deste ano passou ou não.
+    """
+
+    template = "EXTRACT(YEAR FROM age(CURRENT_DATE, %(expressions)s))::integer"
+    output_field = IntegerField()
+    arity = 1
+
+
+def age_band(age: str = "age_years") -> Case:
+    """Monta o CASE WHEN que converte uma idade em faixa etária.
+
+    Args:
+        age: Nome do campo/anotação com a idade em anos.
+
+    Returns:
+        Case: Expressão com o rótulo da faixa (ver AGE_BANDS).
+    """
+    return Case(
+        *[
+            When(**{f"{age}__gte": minimum}, then=Value(label))
+            for minimum, label in AGE_BANDS
+        ],
+        default=Value("Não Informado"),
+        output_field=CharField(),
+    )
+
+
+
+class Epoch(Func):
+    """Segundos desde 1970-01-01 UTC de um timestamptz, com fração.
+
+    Equivale a: EXTRACT(EPOCH FROM max(date))
+    Extract(..., "epoch") do Django converte antes para o fuso do projeto
+    (date AT TIME ZONE ...), e o epoch do timestamp resultante fica deslocado
+    pelo offset do fuso; aqui o epoch é o do instante.
+    """
+
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+    output_field = DecimalField()
+    arity = 1
+
+
+class PercentileCont(Aggregate):
+    """Percentis contínuos (interpolados) de uma coluna, numa única ordenação.
+
+    Equivale a: percentile_cont(ARRAY[0.5, 0.9]) WITHIN GROUP (ORDER BY salary)
+    Retorna uma lista de floats, na ordem das frações pedidas.
+    """
+
+    function = "percentile_cont"
+    template = "%(function)s(ARRAY[%(fractions)s]) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = ArrayField(FloatField())
+
+    def __init__(self, expression, fractions, **extra):
+        fractions = ", ".join(f"{float(fraction)!r}" for fraction in fractions)
+        super().__init__(expression, fractions=fractions, **extra)
+
+
+class WidthBucket(Func):
+    """Número da faixa (1..buckets) de um valor num histograma de faixas iguais.
+
+    Equivale a: LEAST(width_bucket(salary, minimo, maximo, buckets), buckets)
+    O LEAST devolve o próprio máximo para a última faixa (width_bucket o
+    colocaria na faixa buckets + 1).
+    """
+
+    template = "LEAST(width_bucket(%(expressions)s), %(buckets)s)"
+    output_field = IntegerField()
+
+    def __init__(self, expression, low, high, buckets, **extra):
+        super().__init__(
+            expression,
+            Value(float(low)),
+            Value(float(high)),
+            Value(int(buckets)),
+            buckets=int(buckets),
+            **extra,
+        )
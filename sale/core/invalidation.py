@@ -0,0 +1,186 @@
+"""
+Barramento de invalidação de caches entre workers (Postgres LISTEN/NOTIFY).
+
+Os triggers da migration 0015 publicam, a cada comando que altera uma das
+tabelas com cache em memória (produtos e dimensões), um NOTIFY no canal
+core_invalidation com {"table": ..., "ids": [...]} (sem "ids" quando a
+tabela inteira deve ser descartada). O NOTIFY só é entregue no COMMIT, e
+vale para todos os workers de todos os hosts ligados ao mesmo banco.
+
+Cada worker tem um thread ouvinte, iniciado na primeira inscrição:
+
+- Agrupamento: as notificações que chegam dentro de COALESCE_WINDOW são
+  somadas por tabela (união dos ids) e entregues aos callbacks de uma vez.
+- Reconexão: se a conexão cair, os callbacks recebem None (descartar tudo,
+  porque notificações podem ter se perdido) e o ouvinte reconecta com
+  espera exponencial; ao voltar, descarta tudo de novo.
+- TTL de reserva: enquanto o ouvinte não está conectado (`healthy` falso),
+  os caches voltam a expirar por tempo em vez de confiar no barramento.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import psycopg
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "core_invalidation"
+
+# Desligado, os caches voltam a depender só da expiração por tempo
+ENABLED = getattr(settings, "INVALIDATION_BUS_ENABLED", True)
+
+# Janela (segundos) em que notificações seguidas são agrupadas
+COALESCE_WINDOW = getattr(settings, "INVALIDATION_COALESCE_WINDOW", 0.05)
+
+# Espera entre tentativas de reconexão (segundos): dobra até o máximo
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+# Sem notificações por este tempo (segundos), confere se a conexão está viva
+PING_INTERVAL = 10.0
+
+# ids alterados, ou None para "a tabela inteira"
+Callback = Callable[[set[int] | None], None]
+
+
+class InvalidationBus:
+    """Ouvinte do canal core_invalidation e seus inscritos, por tabela."""
+
+    def __init__(self, enabled: bool = ENABLED, coalesce_window: float = COALESCE_WINDOW) -> None:
+        self.enabled = enabled
+        self.coalesce_window = coalesce_window
+        self._subscribers: dict[str, list[Callback]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+
+    @property
+    def healthy(self) -> bool:
+        """True enquanto o ouvinte está conectado e escutando o canal."""
+        return self._connected.is_set() and self._pid == os.getpid()
+
+    def subscribe(self, table: str, callback: Callback) -> None:
+        """Chama `callback(ids)` quando linhas de `table` mudarem em qualquer worker.
+
+        Args:
+            table: Nome da tabela no banco (ex: 'product').
+            callback: Recebe os ids alterados ou None (descartar a tabela
+                inteira). Roda no thread ouvinte: deve ser rápido e não
+                consultar o banco, só marcar o que está velho.
+        """
+        with self._lock:
+            self._subscribers.setdefault(table, []).append(callback)
+        self.start()
+
+    def start(self) -> None:
+        """Inicia o thread ouvinte (uma vez por processo, inclusive após fork)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._connected.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="invalidation-bus", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def publish(self, changes: dict[str, set[int] | None]) -> None:
+        """Entrega as alterações (tabela -> ids ou None) aos inscritos."""
+        with self._lock:
+            subscribers = {table: list(callbacks) for table, callbacks in self._subscribers.items()}
+        for table, ids in changes.items():
+            for callback in subscribers.get(table, []):
+                try:
+                    callback(None if ids is None else set(ids))
+                except Exception:
+                    logger.exception("Falha no callback de invalidação de %s.", table)
+
+    def _flush_all(self) -> None:
+        with self._lock:
+            tables = list(self._subscribers)
+        self.publish(dict.fromkeys(tables))
+
+    def _run(self) -> None:
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop.is_set():
+            try:
+                with self._connect() as connection:
+                    connection.execute(f"LISTEN {CHANNEL}")
+                    self._connected.set()
+                    # O que mudou enquanto estava desconectado não foi ouvido
+                    self._flush_all()
+                    delay = RECONNECT_MIN_DELAY
+                    self._listen(connection)
+            except psycopg.Error as error:
+                logger.warning("Barramento de invalidação desconectado: %s", error)
+            except Exception:
+                logger.exception("Erro no ouvinte do barramento de invalidação.")
+            finally:
+                if self._connected.is_set():
+                    self._connected.clear()
+                    self._flush_all()
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _connect(self) -> psycopg.Connection:
+        # Conexão própria, fora do pool do Django: fica presa no LISTEN
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        params.pop("cursor_factory", None)
+        params.pop("context", None)
+        return psycopg.connect(**params, autocommit=True)
+
+    def _listen(self, connection: psycopg.Connection) -> None:
+        pending: dict[str, set[int] | None] = {}
+        deadline = None
+        pinged_at = time.monotonic()
+        while not self._stop.is_set():
+            # Acorda a cada segundo para ver o _stop, ou no fim da janela
+            timeout = 1.0 if deadline is None else max(deadline - time.monotonic(), 0)
+            for notify in connection.notifies(timeout=timeout, stop_after=1):
+                self._merge(pending, notify.payload)
+                pinged_at = time.monotonic()
+                if deadline is None:
+                    deadline = pinged_at + self.coalesce_window
+            if deadline is not None and time.monotonic() >= deadline:
+                self.publish(pending)
+                pending, deadline = {}, None
+            if time.monotonic() - pinged_at > PING_INTERVAL:
+                # Uma conexão derrubada pelo servidor nem sempre acorda o
+                # notifies(); a consulta levanta o erro e dispara a reconexão
+                connection.execute("SELECT 1")
+                pinged_at = time.monotonic()
+
+    @staticmethod
+    def _merge(pending: dict[str, set[int] | None], payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            table = message["table"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Notificação de invalidação inválida: %r", payload)
+            return
+        ids = message.get("ids")
+        if ids is None or (table in pending and pending[table] is None):
+            pending[table] = None
+        else:
+            pending.setdefault(table, set()).update(ids)
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,337 @@
+"""
+Feed de vendas ao vivo (Server-Sent Events) para os dashboards das filiais.
+
+Os gerentes recarregavam o dashboard a cada poucos segundos, e cada recarga
+batia nos endpoints de listagem. Com o feed, o navegador abre uma conexão
+(EventSource em /api/core/live/sales/) e recebe, a cada
+LIVE_FEED_BATCH_INTERVAL segundos, as vendas criadas ou alteradas no
+intervalo e os totais delas por filial, assim que são confirmadas.
+
+O custo não cresce com o número de dashboards:
+
+- Um ouvinte por processo: os triggers da migration 0019 publicam os ids de
+  sale e sale_item no canal do barramento de invalidação (core.invalidation),
+  que já tem uma conexão LISTEN por worker. O NOTIFY só chega no COMMIT.
+- Um lote por intervalo: um thread por processo junta os ids recebidos e,
+  se houver alguém conectado, faz as mesmas duas consultas (no primário) por
+  lote, não importa quantos clientes.
+- Uma codificação por lote: o JSON de cada evento é montado uma vez (e uma
+  vez por filtro de filiais distinto) e entregue pronto a cada conexão, que
+  é só uma fila no event loop do ASGI, sem thread por cliente.
+
+Sem ids (lote com mais de 500 linhas, barramento desconectado ou
+reconectando), o lote lê as vendas com modified_at desde o anterior, com uma
+folga de WINDOW_OVERLAP; as relidas pela folga e iguais às já enviadas não
+vão de novo. Clientes lentos, com a fila cheia, têm a conexão encerrada; o
+EventSource reconecta sozinho depois de RETRY_MS.
+
+Exige servidor ASGI (ver sale/asgi.py): sob WSGI cada conexão prenderia um
+thread do servidor.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.invalidation import invalidation_bus
+from core.models import Sale, SaleItem
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, "LIVE_FEED_ENABLED", True)
+
+# Intervalo (segundos) entre lotes enviados aos clientes
+BATCH_INTERVAL = getattr(settings, "LIVE_FEED_BATCH_INTERVAL", 1.0)
+
+# Sem eventos por este tempo (segundos), manda um comentário para manter a conexão
+KEEPALIVE_INTERVAL = getattr(settings, "LIVE_FEED_KEEPALIVE_INTERVAL", 15.0)
+
+# Eventos pendentes por cliente; passou disso, a conexão é encerrada
+QUEUE_SIZE = getattr(settings, "LIVE_FEED_QUEUE_SIZE", 32)
+
+# Vendas listadas por evento (os totais por filial contam todas)
+MAX_SALES_PER_EVENT = 500
+
+# Folga da leitura por modified_at: o valor é gravado antes do COMMIT
+WINDOW_OVERLAP = timedelta(seconds=5)
+
+# Espera do EventSource antes de reconectar (milissegundos)
+RETRY_MS = 3000
+
+_MONEY = DecimalField(max_digits=18, decimal_places=2)
+
+
+class _Batch:
+    """Vendas de um lote, codificadas uma vez por filtro de filiais."""
+
+    def __init__(
+        self,
+        at: datetime,
+        branches: list[dict[str, Any]],
+        sales: list[dict[str, Any]],
+        truncated: bool,
+    ) -> None:
+        self.at = at
+        self.branches = branches
+        self.sales = sales
+        self.truncated = truncated
+        self._encoded: dict[frozenset[int] | None, str | None] = {}
+
+    def encode(self, branches: frozenset[int] | None) -> str | None:
+        """Evento SSE pronto, ou None se nada do lote é das filiais pedidas."""
+        # Só roda no event loop: o dict não precisa de lock
+        if branches not in self._encoded:
+            totals, sales = self.branches, self.sales
+            if branches is not None:
+                totals = [row for row in totals if row["branch"] in branches]
+                sales = [row for row in sales if row["branch"] in branches]
+            if not totals and not sales:
+                self._encoded[branches] = None
+            else:
+                data = json.dumps(
+                    {"at": self.at, "branches": totals, "sales": sales, "truncated": self.truncated},
+                    cls=JSONEncoder,
+                    ensure_ascii=False,
+                )
+                self._encoded[branches] = f"event: sales\ndata: {data}\n\n"
+        return self._encoded[branches]
+
+
+class Subscription:
+    """Uma conexão: a fila de eventos dela, no event loop em que foi aberta."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, branches: frozenset[int] | None) -> None:
+        self.loop = loop
+        self.branches = branches
+        self.queue: asyncio.Queue[str] = asyncio.Queue(QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, batch: _Batch) -> None:
+        chunk = batch.encode(self.branches)
+        if chunk is None or self.lagged:
+            return
+        try:
+            self.queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class SalesFeed:
+    """Conexões abertas no processo e o thread que monta os lotes."""
+
+    def __init__(self, bus=invalidation_bus, batch_interval: float = BATCH_INTERVAL) -> None:
+        self.bus = bus
+        self.batch_interval = batch_interval
+        self._subscriptions: set[Subscription] = set()
+        self._sale_ids: set[int] = set()
+        self._item_ids: set[int] = set()
+        # Recebeu um aviso sem ids: o próximo lote lê por modified_at
+        self._everything = False
+        self._flushed_at: datetime | None = None
+        # Lotes enviados dentro da folga, só lidos e trocados pelo thread do feed
+        self._recent: list[_Batch] = []
+        self._subscribed = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.dropped = 0
+
+    def connect(self, branches: frozenset[int] | None = None) -> Subscription:
+        """Registra uma conexão no event loop atual (chamar de código async)."""
+        subscription = Subscription(asyncio.get_running_loop(), branches)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        self._start()
+        return subscription
+
+    def disconnect(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    async def stream(self, subscription: Subscription):
+        """Corpo da resposta SSE de uma conexão; desconecta ao terminar."""
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_INTERVAL)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.lagged:
+                    # Fila estourou: encerra, e o cliente reconecta do zero
+                    with self._lock:
+                        self.dropped += 1
+                    return
+                yield chunk
+        finally:
+            self.disconnect(subscription)
+
+    def stats(self) -> dict[str, Any]:
+        """Conexões abertas, lotes enviados e conexões encerradas por lentidão."""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "bus_healthy": self.bus.healthy,
+            }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _start(self) -> None:
+        with self._lock:
+            if not self._subscribed:
+                self.bus.subscribe("sale", self._on_sales)
+                self.bus.subscribe("sale_item", self._on_items)
+                self._subscribed = True
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-sales-feed", daemon=True)
+            self._thread.start()
+
+    def _on_sales(self, ids: set[int] | None) -> None:
+        # Roda no thread do barramento: só anota
+        with self._lock:
+            if ids is None:
+                self._everything = True
+            else:
+                self._sale_ids |= ids
+
+    def _on_items(self, ids: set[int] | None) -> None:
+        with self._lock:
+            if ids is None:
+                self._everything = True
+            else:
+                self._item_ids |= ids
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.batch_interval):
+            try:
+                self._flush()
+            except Exception:
+                logger.exception("Erro no feed de vendas ao vivo.")
+
+    def _flush(self) -> None:
+        now = timezone.now()
+        with self._lock:
+            sale_ids, item_ids, everything = self._sale_ids, self._item_ids, self._everything
+            self._sale_ids, self._item_ids, self._everything = set(), set(), False
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            # Ninguém ouvindo: o próximo cliente começa a partir de agora
+            self._flushed_at = now
+            return
+
+        since = None
+        sent: dict[int, dict[str, Any]] = {}
+        if everything or not self.bus.healthy:
+            since = (self._flushed_at or now) - WINDOW_OVERLAP
+            # A folga relê vendas dos lotes anteriores; o mais recente prevalece
+            sent = {row["id"]: row for recent in self._recent for row in recent.sales}
+        elif not sale_ids and not item_ids:
+            self._flushed_at = now
+            return
+
+        try:
+            batch = self._load(now, sale_ids, item_ids, since, sent)
+        except DatabaseError:
+            logger.warning("Falha ao ler o lote do feed de vendas.", exc_info=True)
+            connections[DEFAULT_DB_ALIAS].close()
+            # Os ids deste lote se perderam: o próximo lê por modified_at
+            with self._lock:
+                self._everything = True
+            return
+        self._flushed_at = now
+        if batch is None:
+            return
+        self._recent = [recent for recent in self._recent if recent.at >= now - WINDOW_OVERLAP]
+        self._recent.append(batch)
+
+        with self._lock:
+            self.batches += 1
+        by_loop: dict[asyncio.AbstractEventLoop, list[Subscription]] = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, members in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, members, batch)
+            except RuntimeError:
+                # Loop já encerrado (servidor parando)
+                for subscription in members:
+                    self.disconnect(subscription)
+
+    @staticmethod
+    def _load(
+        now: datetime,
+        sale_ids: set[int],
+        item_ids: set[int],
+        since: datetime | None,
+        sent: dict[int, dict[str, Any]] | None = None,
+    ) -> _Batch | None:
+        items = SaleItem.objects.using(DEFAULT_DB_ALIAS)
+        if since is None:
+            changed = Q(id__in=sale_ids) | Q(id__in=items.filter(id__in=item_ids).values("sale"))
+        else:
+            changed = Q(modified_at__gte=since) | Q(
+                id__in=items.filter(modified_at__gte=since).values("sale")
+            )
+        sales = Sale.objects.using(DEFAULT_DB_ALIAS).filter(changed)
+        revenue = Sum(
+            F("sale_items__quantity") * F("sale_items__sale_price"),
+            filter=Q(sale_items__active=True),
+            output_field=_MONEY,
+        )
+
+        rows = list(
+            sales.values("id", "branch", "date", "active")
+            .annotate(total=revenue, items=Count("sale_items", filter=Q(sale_items__active=True)))
+            .order_by("-id")[:MAX_SALES_PER_EVENT + 1]
+        )
+        truncated = len(rows) > MAX_SALES_PER_EVENT
+        # Vendas iguais às já enviadas saem da lista e dos totais por filial
+        repeated = {row["id"] for row in rows if sent and sent.get(row["id"]) == row}
+        if repeated:
+            rows = [row for row in rows if row["id"] not in repeated]
+            sales = sales.exclude(id__in=repeated)
+        if not rows:
+            return None
+        branches = list(
+            sales.filter(active=True)
+            .values("branch")
+            .annotate(sales=Count("id", distinct=True), total=revenue)
+            .order_by("branch")
+        )
+        return _Batch(
+            at=now,
+            branches=branches,
+            sales=rows[:MAX_SALES_PER_EVENT],
+            truncated=truncated,
+        )
+
+
+def _deliver(subscriptions: list[Subscription], batch: _Batch) -> None:
+    # Roda no event loop das conexões
+    for subscription in subscriptions:
+        subscription.deliver(batch)
+
+
+sales_feed = SalesFeed()
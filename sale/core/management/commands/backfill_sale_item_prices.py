@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import batch, selectors
+from core.models import BatchJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche sale_item.sale_price nulo com o preço do produto vigente na "
+        "data da venda (product_price_history), em lotes por keyset. "
+        "Interrompido, continua de onde parou ao rodar de novo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=batch.CHUNK_SIZE)
+        parser.add_argument("--sleep", type=float, default=batch.SLEEP)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Só mostra quantos itens seriam preenchidos.",
+        )
+        parser.add_argument(
+            "--fallback",
+            choices=["none", "earliest"],
+            default="none",
+            help=(
+                "Itens de vendas anteriores ao histórico: 'none' deixa nulo, "
+                "'earliest' usa o preço mais antigo registrado."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        report = selectors.get_missing_sale_item_prices_report()
+        self.stdout.write(
+            f"sem preço={report['missing']} resolvíveis={report['resolvable']} "
+            f"sem histórico na data={report['unresolvable']} "
+            f"faturamento recuperado={report['revenue'] or 0}"
+        )
+        if options["dry_run"]:
+            return
+
+        job = batch.start("backfill_sale_item_prices", fallback=options["fallback"])
+        job = batch.run(
+            job,
+            chunk_size=options["batch_size"],
+            sleep=options["sleep"],
+            on_progress=lambda job: self.stdout.write(
+                f"job={job.pk} {job.progress:.1%} id={job.last_pk}/{job.max_pk} "
+                f"preenchidos={job.rows_updated}"
+            ),
+        )
+
+        if job.status == BatchJob.Status.FAILED:
+            raise CommandError(f"Job {job.pk} falhou: {job.error}")
+        self.stdout.write(
+            self.style.SUCCESS(f"job={job.pk} concluído: {job.rows_updated} itens preenchidos.")
+        )
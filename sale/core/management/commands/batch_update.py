@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import batch
+from core.models import BatchJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa uma atualização em massa em lotes por faixa de id (core.batch). "
+        "Ex: batch_update increase_all_salaries percentage=10. "
+        "Um job interrompido continua de onde parou com --resume <id> ou "
+        "repetindo o mesmo comando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", choices=sorted(batch.JOBS))
+        parser.add_argument("params", nargs="*", help="Parâmetros no formato chave=valor.")
+        parser.add_argument("--resume", type=int, metavar="JOB_ID")
+        parser.add_argument("--list", action="store_true", help="Lista os jobs e sai.")
+        parser.add_argument("--chunk-size", type=int, default=batch.CHUNK_SIZE)
+        parser.add_argument("--sleep", type=float, default=batch.SLEEP)
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for job in BatchJob.objects.order_by("-id")[:20]:
+                self.stdout.write(self._describe(job))
+            return
+
+        if options["resume"]:
+            try:
+                job = batch.resume(options["resume"])
+            except BatchJob.DoesNotExist:
+                raise CommandError(f"Job {options['resume']} não existe.")
+        elif options["name"]:
+            params = {}
+            for item in options["params"]:
+                key, separator, value = item.partition("=")
+                if not separator:
+                    raise CommandError(f"Parâmetro inválido: {item} (use chave=valor).")
+                params[key] = value
+            try:
+                job = batch.start(options["name"], **params)
+            except TypeError as error:
+                raise CommandError(f"Parâmetros inválidos para {options['name']}: {error}")
+        else:
+            raise CommandError("Informe o nome do job, --resume ou --list.")
+
+        self.stdout.write(f"Iniciando {self._describe(job)}")
+        job = batch.run(
+            job,
+            chunk_size=options["chunk_size"],
+            sleep=options["sleep"],
+            on_progress=lambda job: self.stdout.write(self._describe(job)),
+        )
+
+        if job.status == BatchJob.Status.FAILED:
+            raise CommandError(f"{self._describe(job)}: {job.error}")
+        self.stdout.write(self.style.SUCCESS(self._describe(job)))
+
+    def _describe(self, job: BatchJob) -> str:
+        return (
+            f"job={job.pk} {job.name} {job.params} status={job.status} "
+            f"progresso={job.progress:.1%} id={job.last_pk}/{job.max_pk} "
+            f"linhas={job.rows_updated}"
+        )
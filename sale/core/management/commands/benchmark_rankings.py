@@ -0,0 +1,148 @@
+import statistics
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F, Max, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import selectors
+from core.models import Branch, Department, Employee, Product, ProductGroup, Sale, SaleItem
+
+
+def naive_top_products_by_branch(limit):
+    """Uma consulta por filial, como era feito antes das window functions."""
+    rows = []
+    for branch in Branch.objects.order_by("id"):
+        top = (
+            SaleItem.objects.filter(sale__branch=branch, sale__active=True, active=True)
+            .values("product")
+            .annotate(revenue=Sum(F("quantity") * F("sale_price")))
+            .order_by("-revenue", "product")[:limit]
+        )
+        rows.extend((branch.id, row["product"]) for row in top)
+    return rows
+
+
+def naive_top_products_by_month(limit, year):
+    """Uma consulta por mês do ano, cada uma no seu intervalo de datas."""
+    tz = timezone.get_current_timezone()
+    rows = []
+    for month in range(1, 13):
+        start = datetime(year, month, 1, tzinfo=tz)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+        top = (
+            SaleItem.objects.filter(
+                sale__date__gte=start, sale__date__lt=end, sale__active=True, active=True
+            )
+            .values("product")
+            .annotate(revenue=Sum(F("quantity") * F("sale_price")))
+            .order_by("-revenue", "product")[:limit]
+        )
+        rows.extend((start, row["product"]) for row in top)
+    return rows
+
+
+def naive_top_employees_by_department(limit):
+    """Uma consulta por departamento (empates cortados, ao contrário do RANK)."""
+    rows = []
+    for department in Department.objects.order_by("id"):
+        top = (
+            Employee.objects.filter(department=department, active=True)
+            .order_by("-salary", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        rows.extend((department.id, employee) for employee in top)
+    return rows
+
+
+def naive_products_margin_rank_by_group(limit):
+    """Traz todos os produtos e ordena/corta por grupo em Python."""
+    groups: dict[int, list] = {}
+    for product in Product.objects.filter(active=True, cost_price__gt=0):
+        margin = (product.sale_price - product.cost_price) / product.cost_price * 100
+        groups.setdefault(product.product_group_id, []).append((-margin, product.id))
+    rows = []
+    for group_id in sorted(groups):
+        rows.extend((group_id, product) for _, product in sorted(groups[group_id])[:limit])
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os selectors de ranking com window functions (top-N por grupo "
+        "numa única consulta) com o laço ingênuo de uma consulta por grupo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--year", type=int, help="Ano do top por mês (padrão: o da última venda)."
+        )
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        year = options["year"]
+        if year is None:
+            last_sale = Sale.objects.aggregate(last=Max("date"))["last"]
+            year = timezone.localtime(last_sale).year if last_sale else timezone.localdate().year
+        cases = [
+            (
+                "top produtos por filial",
+                lambda: [
+                    (row["sale__branch"], row["product"])
+                    for row in selectors.get_top_products_by_branch(limit)
+                ],
+                lambda: naive_top_products_by_branch(limit),
+            ),
+            (
+                f"top produtos por mês de {year}",
+                lambda: [
+                    (row["month"], row["product"])
+                    for row in selectors.get_top_products_by_month(limit, year)
+                ],
+                lambda: naive_top_products_by_month(limit, year),
+            ),
+            (
+                "top funcionários por departamento",
+                lambda: [
+                    (row["department"], row["id"])
+                    for row in selectors.get_top_employees_by_department(limit)
+                ],
+                lambda: naive_top_employees_by_department(limit),
+            ),
+            (
+                "margem por grupo de produtos",
+                lambda: [
+                    (row["product_group"], row["id"])
+                    for row in selectors.get_products_margin_rank_by_group(limit)
+                ],
+                lambda: naive_products_margin_rank_by_group(limit),
+            ),
+        ]
+        self.stdout.write(
+            f"{Branch.objects.count()} filiais, {Department.objects.count()} "
+            f"departamentos, {ProductGroup.objects.count()} grupos, limit={limit}"
+        )
+        for name, window, naive in cases:
+            window_ms, window_queries, window_rows = self._measure(window, options["repeat"])
+            naive_ms, naive_queries, naive_rows = self._measure(naive, options["repeat"])
+            same = sorted(window_rows) == sorted(naive_rows)
+            self.stdout.write(
+                f"{name}: window {window_ms:.1f}ms/{window_queries} consulta(s), "
+                f"laço {naive_ms:.1f}ms/{naive_queries} consulta(s), "
+                f"{naive_ms / window_ms if window_ms else 0:.1f}x, "
+                f"{'mesmo resultado' if same else 'resultados diferentes (empates)'}"
+            )
+
+    def _measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                rows = func()
+                timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(queries), rows
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import associations
+
+
+class Command(BaseCommand):
+    help = (
+        "Monta a matriz de co-compra de produtos a partir das vendas e grava os "
+        "K produtos mais associados a cada produto em product_association."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=associations.CHUNK_SIZE)
+        parser.add_argument("--top-k", type=int, default=associations.TOP_K)
+        parser.add_argument("--min-support", type=float, default=associations.MIN_SUPPORT)
+        parser.add_argument(
+            "--min-confidence", type=float, default=associations.MIN_CONFIDENCE
+        )
+        parser.add_argument("--min-lift", type=float, default=associations.MIN_LIFT)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = associations.build_product_associations(
+            chunk_size=options["chunk_size"],
+            top_k=options["top_k"],
+            min_support=options["min_support"],
+            min_confidence=options["min_confidence"],
+            min_lift=options["min_lift"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} associações gravadas em {time.perf_counter() - started:.1f}s."
+            )
+        )
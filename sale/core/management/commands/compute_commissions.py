@@ -0,0 +1,45 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import commissions
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula as comissões mensais dos funcionários (CommissionStatement). "
+        "Sem --period, recalcula só os meses com vendas alteradas desde a "
+        "última execução."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            action="append",
+            default=[],
+            metavar="AAAA-MM",
+            help="Mês a recalcular por inteiro (pode repetir).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["period"]:
+            try:
+                periods = [
+                    datetime.strptime(period, "%Y-%m").date()
+                    for period in options["period"]
+                ]
+            except ValueError as error:
+                raise CommandError(f"Período inválido: {error}")
+            written = commissions.compute_commissions(periods)
+        else:
+            periods = commissions.recompute_pending()
+            written = None
+
+        elapsed = time.perf_counter() - started
+        months = ", ".join(period.strftime("%Y-%m") for period in periods) or "nenhum"
+        summary = f"meses: {months} ({elapsed:.1f}s)"
+        if written is not None:
+            summary += f" - {written} extratos gravados"
+        self.stdout.write(self.style.SUCCESS(summary))
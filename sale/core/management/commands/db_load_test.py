@@ -0,0 +1,69 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara requisições concorrentes contra um endpoint e mede a latência "
+        "(p50/p90/p99). Rode com DB_POOL=1 e DB_POOL=0 para comparar o pool de "
+        "conexões com uma conexão nova por requisição."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/core/department/")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="Por thread.")
+        parser.add_argument("--warmup", type=int, default=5, help="Por thread.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        latencies: list[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal errors
+            client = Client(SERVER_NAME="localhost")
+            local: list[float] = []
+            local_errors = 0
+            for _ in range(options["warmup"]):
+                client.get(path)
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                response = client.get(path)
+                local.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    local_errors += 1
+            with lock:
+                latencies.extend(local)
+                errors += local_errors
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        database = settings.DATABASES["default"]
+        self.stdout.write(
+            f"pool={'on' if database['OPTIONS'].get('pool') else 'off'} "
+            f"conn_max_age={database['CONN_MAX_AGE']} path={path}"
+        )
+        self.stdout.write(
+            f"requests={len(latencies)} errors={errors} "
+            f"throughput={len(latencies) / elapsed:.1f} req/s"
+        )
+        self.stdout.write(
+            f"p50={quantiles[49]:.2f}ms p90={quantiles[89]:.2f}ms "
+            f"p99={quantiles[98]:.2f}ms max={max(latencies):.2f}ms"
+        )
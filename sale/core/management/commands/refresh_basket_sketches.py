@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core import distributions
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza os sketches diários de quantis do valor das vendas "
+        "(basket_value_sketch), usados pela distribuição aproximada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            help="Primeiro dia (AAAA-MM-DD). Padrão: último dia já calculado.",
+        )
+        parser.add_argument(
+            "--end",
+            type=date.fromisoformat,
+            help="Último dia (AAAA-MM-DD). Padrão: hoje.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = distributions.refresh_basket_sketches(options["start"], options["end"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{days} dias atualizados em {time.perf_counter() - started:.1f}s."
+            )
+        )
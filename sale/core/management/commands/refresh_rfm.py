@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import rfm
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula a segmentação RFM (recência, frequência, valor) de todos os "
+        "clientes e grava em customer_rfm."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        summary = rfm.refresh_rfm()
+        for segment, total in sorted(summary.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"{segment}: {total}")
+        self.stdout.write(
+            self.style.SUCCESS(f"RFM atualizado em {time.perf_counter() - started:.1f}s.")
+        )
@@ -0,0 +1,89 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:05
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employee',
+            name='department',
+            field=models.ForeignKey(db_column='id_department', on_delete=django.db.models.deletion.RESTRICT, related_name='employees', to='core.department'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='idx_customer_name_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['income'], name='idx_customer_income'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['gender'], name='idx_customer_gender'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='idx_employee_name_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['salary'], name='idx_employee_salary'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['admission_date'], name='idx_employee_admission'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['birth_date'], name='idx_employee_birth_date'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='idx_product_name_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sale_price'], name='idx_product_sale_price'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['cost_price'], name='idx_product_cost_price'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date'], name='idx_sale_date'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['branch', 'date'], name='idx_sale_branch_date'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['employee', 'date'], name='idx_sale_employee_date'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', 'date'], name='idx_sale_customer_date'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(condition=models.Q(('sale_price__isnull', True)), fields=['id'], name='idx_sale_item_without_price'),
+        ),
+        migrations.AddIndex(
+            model_name='state',
+            index=models.Index(fields=['abbreviation'], name='idx_state_abbreviation'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='idx_supplier_name_upper'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_filter_indexes'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunSQL(
+            sql=[
+                "CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese)",
+                "ALTER TEXT SEARCH CONFIGURATION pt_unaccent "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem",
+            ],
+            reverse_sql=["DROP TEXT SEARCH CONFIGURATION pt_unaccent"],
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_vector',
+            field=models.GeneratedField(db_column='search_vector', db_persist=True, expression=django.contrib.postgres.search.SearchVector('name', config='pt_unaccent'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='search_vector',
+            field=models.GeneratedField(db_column='search_vector', db_persist=True, expression=django.contrib.postgres.search.SearchVector('name', config='pt_unaccent'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=models.GeneratedField(db_column='search_vector', db_persist=True, expression=django.contrib.postgres.search.SearchVector('name', config='pt_unaccent'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='search_vector',
+            field=models.GeneratedField(db_column='search_vector', db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('name', config='pt_unaccent', weight='A'), '||', django.contrib.postgres.search.SearchVector('legal_document', config='pt_unaccent', weight='B'), django.contrib.postgres.search.SearchConfig('pt_unaccent')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_customer_search'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_employee_search'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_product_search'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_supplier_search'),
+        ),
+    ]
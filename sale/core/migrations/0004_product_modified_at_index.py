@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['modified_at'], name='idx_product_modified_at'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:16
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_product_modified_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchJob',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('name', models.CharField(db_column='name', max_length=64)),
+                ('params', models.JSONField(db_column='params', default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_column='status', default='running', max_length=16)),
+                ('last_pk', models.BigIntegerField(db_column='last_pk', default=0)),
+                ('max_pk', models.BigIntegerField(db_column='max_pk', default=0)),
+                ('rows_updated', models.BigIntegerField(db_column='rows_updated', default=0)),
+                ('error', models.TextField(blank=True, db_column='error', default='')),
+                ('finished_at', models.DateTimeField(blank=True, db_column='finished_at', null=True)),
+            ],
+            options={
+                'verbose_name': 'Batch Job',
+                'verbose_name_plural': 'Batch Jobs',
+                'db_table': 'batch_job',
+                'db_table_comment': 'Chunked bulk update and its progress',
+                'managed': True,
+                'indexes': [models.Index(fields=['name', 'status'], name='idx_batch_job_name_status')],
+            },
+        ),
+    ]
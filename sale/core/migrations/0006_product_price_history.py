@@ -0,0 +1,119 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_batch_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('cost_price', models.DecimalField(db_column='cost_price', decimal_places=2, max_digits=16)),
+                ('sale_price', models.DecimalField(db_column='sale_price', decimal_places=2, max_digits=16)),
+                ('valid_from', models.DateTimeField(db_column='valid_from')),
+                ('valid_to', models.DateTimeField(blank=True, db_column='valid_to', null=True)),
+                ('product', models.ForeignKey(db_column='id_product', on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='core.product')),
+            ],
+            options={
+                'verbose_name': 'Product Price History',
+                'verbose_name_plural': 'Product Price History',
+                'db_table': 'product_price_history',
+                'db_table_comment': 'Sale and cost price of a product over time',
+                'managed': True,
+                'indexes': [models.Index(fields=['product', '-valid_from'], include=('valid_to', 'sale_price', 'cost_price'), name='idx_price_history_asof')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'valid_from'), name='uq_product_price_history_product_valid_from')],
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                # Preço alterado: fecha a linha vigente e abre uma nova. Se o
+                # preço já mudou na MESMA transação (now() é o início dela), a
+                # linha aberta tem valid_from = now() e é só corrigida
+                # (ON CONFLICT). Trigger por comando com tabelas de transição:
+                # um UPDATE em milhões de produtos grava o histórico num único
+                # comando, não em milhões de chamadas do trigger.
+                """
+                CREATE FUNCTION product_price_history_on_update() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    WITH changed AS (
+                        SELECT n.id, n.cost_price, n.sale_price
+                        FROM new_rows n
+                        JOIN old_rows o ON o.id = n.id
+                        WHERE (n.cost_price, n.sale_price)
+                              IS DISTINCT FROM (o.cost_price, o.sale_price)
+                    ), closed AS (
+                        UPDATE product_price_history h
+                        SET valid_to = now(), modified_at = now()
+                        FROM changed c
+                        WHERE h.id_product = c.id
+                          AND h.valid_to IS NULL
+                          AND h.valid_from < now()
+                    )
+                    INSERT INTO product_price_history
+                        (id_product, cost_price, sale_price, valid_from, valid_to,
+                         created_at, modified_at, active)
+                    SELECT c.id, c.cost_price, c.sale_price, now(), NULL,
+                           now(), now(), true
+                    FROM changed c
+                    ON CONFLICT (id_product, valid_from) DO UPDATE
+                    SET cost_price = EXCLUDED.cost_price,
+                        sale_price = EXCLUDED.sale_price,
+                        modified_at = now();
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION product_price_history_on_insert() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO product_price_history
+                        (id_product, cost_price, sale_price, valid_from, valid_to,
+                         created_at, modified_at, active)
+                    SELECT n.id, n.cost_price, n.sale_price, now(), NULL,
+                           now(), now(), true
+                    FROM new_rows n;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER trg_product_price_history_update
+                AFTER UPDATE ON product
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION product_price_history_on_update()
+                """,
+                """
+                CREATE TRIGGER trg_product_price_history_insert
+                AFTER INSERT ON product
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION product_price_history_on_insert()
+                """,
+                # Produtos existentes: o único preço conhecido é o atual
+                """
+                INSERT INTO product_price_history
+                    (id_product, cost_price, sale_price, valid_from, valid_to,
+                     created_at, modified_at, active)
+                SELECT id, cost_price, sale_price, created_at, NULL, now(), now(), true
+                FROM product
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER trg_product_price_history_insert ON product",
+                "DROP TRIGGER trg_product_price_history_update ON product",
+                "DROP FUNCTION product_price_history_on_insert()",
+                "DROP FUNCTION product_price_history_on_update()",
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_product_price_history'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                # Item inserido sem preço recebe o preço atual do produto
+                """
+                CREATE FUNCTION sale_item_snapshot_price() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF NEW.sale_price IS NULL THEN
+                        SELECT p.sale_price INTO NEW.sale_price
+                        FROM product p
+                        WHERE p.id = NEW.id_product;
+                    END IF;
+                    RETURN NEW;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_snapshot_price
+                BEFORE INSERT ON sale_item
+                FOR EACH ROW EXECUTE FUNCTION sale_item_snapshot_price()
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER trg_sale_item_snapshot_price ON sale_item",
+                "DROP FUNCTION sale_item_snapshot_price()",
+            ],
+        ),
+    ]
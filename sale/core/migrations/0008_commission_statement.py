@@ -0,0 +1,145 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_sale_item_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionChange',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('sale_hour', models.DateTimeField(db_column='sale_hour')),
+            ],
+            options={
+                'verbose_name': 'Commission Change',
+                'verbose_name_plural': 'Commission Changes',
+                'db_table': 'commission_change',
+                'db_table_comment': 'Sale hours touched since commissions were last computed',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='CommissionStatement',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('period', models.DateField(db_column='period', help_text='Primeiro dia do mês de referência.')),
+                ('items', models.BigIntegerField(db_column='items', default=0)),
+                ('total_sales', models.DecimalField(db_column='total_sales', decimal_places=2, max_digits=18)),
+                ('commission', models.DecimalField(db_column='commission', decimal_places=2, max_digits=18)),
+                ('employee', models.ForeignKey(db_column='id_employee', on_delete=django.db.models.deletion.RESTRICT, related_name='commission_statements', to='core.employee')),
+            ],
+            options={
+                'verbose_name': 'Commission Statement',
+                'verbose_name_plural': 'Commission Statements',
+                'db_table': 'commission_statement',
+                'db_table_comment': 'Monthly commission of each employee',
+                'managed': True,
+                'indexes': [models.Index(fields=['employee', 'period'], name='idx_commission_employee')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'employee'), name='uq_commission_statement_period_employee')],
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                # Marca as horas (date_trunc('hour')) das vendas tocadas por
+                # cada comando. Hora, e não mês: o mês depende do fuso do
+                # projeto, que é aplicado em Python no recálculo.
+                """
+                CREATE FUNCTION commission_mark_sale() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO commission_change (sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT date_trunc('hour', n.date), now(), now(), true
+                        FROM new_rows n;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        INSERT INTO commission_change (sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT date_trunc('hour', o.date), now(), now(), true
+                        FROM old_rows o;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION commission_mark_sale_item() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO commission_change (sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT date_trunc('hour', s.date), now(), now(), true
+                        FROM new_rows n
+                        JOIN sale s ON s.id = n.id_sale;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        INSERT INTO commission_change (sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT date_trunc('hour', s.date), now(), now(), true
+                        FROM old_rows o
+                        JOIN sale s ON s.id = o.id_sale;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER trg_sale_commission_insert
+                AFTER INSERT ON sale
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_commission_update
+                AFTER UPDATE ON sale
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_commission_delete
+                AFTER DELETE ON sale
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_commission_insert
+                AFTER INSERT ON sale_item
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale_item()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_commission_update
+                AFTER UPDATE ON sale_item
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale_item()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_commission_delete
+                AFTER DELETE ON sale_item
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION commission_mark_sale_item()
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER trg_sale_commission_insert ON sale",
+                "DROP TRIGGER trg_sale_commission_update ON sale",
+                "DROP TRIGGER trg_sale_commission_delete ON sale",
+                "DROP TRIGGER trg_sale_item_commission_insert ON sale_item",
+                "DROP TRIGGER trg_sale_item_commission_update ON sale_item",
+                "DROP TRIGGER trg_sale_item_commission_delete ON sale_item",
+                "DROP FUNCTION commission_mark_sale_item()",
+                "DROP FUNCTION commission_mark_sale()",
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_commission_statement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerRFM',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('last_purchase', models.DateTimeField(blank=True, db_column='last_purchase', null=True)),
+                ('frequency', models.IntegerField(db_column='frequency', default=0)),
+                ('monetary', models.DecimalField(db_column='monetary', decimal_places=2, default=0, max_digits=18)),
+                ('recency_score', models.SmallIntegerField(db_column='recency_score', default=0)),
+                ('frequency_score', models.SmallIntegerField(db_column='frequency_score', default=0)),
+                ('monetary_score', models.SmallIntegerField(db_column='monetary_score', default=0)),
+                ('segment', models.CharField(choices=[('champions', 'Champions'), ('loyal', 'Loyal'), ('new', 'New'), ('needs_attention', 'Needs attention'), ('at_risk', 'At risk'), ('hibernating', 'Hibernating'), ('no_purchases', 'No purchases')], db_column='segment', max_length=32)),
+                ('customer', models.OneToOneField(db_column='id_customer', on_delete=django.db.models.deletion.CASCADE, related_name='rfm', to='core.customer')),
+            ],
+            options={
+                'verbose_name': 'Customer RFM',
+                'verbose_name_plural': 'Customer RFM',
+                'db_table': 'customer_rfm',
+                'db_table_comment': 'Recency/frequency/monetary scores and segment of a customer',
+                'managed': True,
+                'indexes': [models.Index(fields=['segment'], name='idx_customer_rfm_segment')],
+            },
+        ),
+    ]
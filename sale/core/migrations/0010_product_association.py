@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_customer_rfm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAssociation',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('rank', models.SmallIntegerField(db_column='rank')),
+                ('co_count', models.IntegerField(db_column='co_count')),
+                ('support', models.FloatField(db_column='support')),
+                ('confidence', models.FloatField(db_column='confidence')),
+                ('lift', models.FloatField(db_column='lift')),
+                ('product', models.ForeignKey(db_column='id_product', on_delete=django.db.models.deletion.CASCADE, related_name='associations', to='core.product')),
+                ('related_product', models.ForeignKey(db_column='id_related_product', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.product')),
+            ],
+            options={
+                'verbose_name': 'Product Association',
+                'verbose_name_plural': 'Product Associations',
+                'db_table': 'product_association',
+                'db_table_comment': 'Products frequently bought together',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='uq_product_association_product_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_product_association'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', '-salary'], name='idx_employee_department_salary'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale'], include=('product', 'quantity', 'sale_price'), name='idx_sale_item_sale_covering'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:35
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_ranking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketValueSketch',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('day', models.DateField(db_column='day', unique=True)),
+                ('count', models.BigIntegerField(db_column='count', default=0)),
+                ('total', models.DecimalField(db_column='total', decimal_places=2, default=0, max_digits=20)),
+                ('minimum', models.DecimalField(blank=True, db_column='minimum', decimal_places=2, max_digits=18, null=True)),
+                ('maximum', models.DecimalField(blank=True, db_column='maximum', decimal_places=2, max_digits=18, null=True)),
+                ('zero_count', models.BigIntegerField(db_column='zero_count', default=0)),
+                ('offset', models.IntegerField(db_column='offset', default=0)),
+                ('bins', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), db_column='bins', default=list, size=None)),
+            ],
+            options={
+                'verbose_name': 'Basket Value Sketch',
+                'verbose_name_plural': 'Basket Value Sketches',
+                'db_table': 'basket_value_sketch',
+                'db_table_comment': 'Daily quantile sketch of the sale (basket) value',
+                'managed': True,
+            },
+        ),
+    ]
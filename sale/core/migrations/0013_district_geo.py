@@ -0,0 +1,195 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_basket_value_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistrictGeo',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('district_name', models.CharField(db_column='district_name', max_length=128)),
+                ('city_name', models.CharField(db_column='city_name', max_length=128)),
+                ('state_name', models.CharField(db_column='state_name', max_length=128)),
+                ('state_abbreviation', models.CharField(db_column='state_abbreviation', max_length=2)),
+                ('zone_name', models.CharField(db_column='zone_name', max_length=128)),
+                ('city', models.ForeignKey(db_column='id_city', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.city')),
+                ('district', models.OneToOneField(db_column='id_district', db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='geo', to='core.district')),
+                ('state', models.ForeignKey(db_column='id_state', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.state')),
+                ('zone', models.ForeignKey(db_column='id_zone', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.zone')),
+            ],
+            options={
+                'verbose_name': 'District Geo',
+                'verbose_name_plural': 'District Geo',
+                'db_table': 'district_geo',
+                'db_table_comment': 'Flattened district -> city -> state / zone hierarchy',
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='branch',
+            name='geo',
+            field=models.ForeignObject(editable=False, from_fields=['district'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.districtgeo', to_fields=['district']),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='geo',
+            field=models.ForeignObject(editable=False, from_fields=['district'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.districtgeo', to_fields=['district']),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='geo',
+            field=models.ForeignObject(editable=False, from_fields=['district'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.districtgeo', to_fields=['district']),
+        ),
+        migrations.AddIndex(
+            model_name='districtgeo',
+            index=models.Index(fields=['state_abbreviation'], name='idx_district_geo_state_abbr'),
+        ),
+        migrations.RunSQL(
+            sql=[
+                # Reescreve a linha de district_geo dos bairros informados
+                # (e apaga a dos que não existem mais)
+                """
+                CREATE FUNCTION district_geo_sync(ids bigint[]) RETURNS void
+                LANGUAGE sql AS $$
+                    DELETE FROM district_geo g
+                    WHERE g.id_district = ANY(ids)
+                      AND NOT EXISTS (SELECT 1 FROM district d WHERE d.id = g.id_district);
+
+                    INSERT INTO district_geo
+                        (id_district, district_name, id_city, city_name, id_state, state_name,
+                         state_abbreviation, id_zone, zone_name, created_at, modified_at, active)
+                    SELECT d.id, d.name, c.id, c.name, s.id, s.name,
+                           s.abbreviation, z.id, z.name, now(), now(), d.active
+                    FROM district d
+                    JOIN city c ON c.id = d.id_city
+                    JOIN state s ON s.id = c.id_state
+                    JOIN zone z ON z.id = d.id_zone
+                    WHERE d.id = ANY(ids)
+                    ON CONFLICT (id_district) DO UPDATE SET
+                        district_name = EXCLUDED.district_name,
+                        id_city = EXCLUDED.id_city,
+                        city_name = EXCLUDED.city_name,
+                        id_state = EXCLUDED.id_state,
+                        state_name = EXCLUDED.state_name,
+                        state_abbreviation = EXCLUDED.state_abbreviation,
+                        id_zone = EXCLUDED.id_zone,
+                        zone_name = EXCLUDED.zone_name,
+                        active = EXCLUDED.active,
+                        modified_at = now();
+                $$
+                """,
+                """
+                CREATE FUNCTION district_geo_from_district() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        PERFORM district_geo_sync(ARRAY(SELECT id FROM old_rows));
+                    ELSE
+                        PERFORM district_geo_sync(ARRAY(SELECT id FROM new_rows));
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION district_geo_from_city() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM district_geo_sync(ARRAY(
+                        SELECT d.id FROM district d JOIN new_rows n ON n.id = d.id_city
+                    ));
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION district_geo_from_state() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM district_geo_sync(ARRAY(
+                        SELECT d.id
+                        FROM district d
+                        JOIN city c ON c.id = d.id_city
+                        JOIN new_rows n ON n.id = c.id_state
+                    ));
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION district_geo_from_zone() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    PERFORM district_geo_sync(ARRAY(
+                        SELECT d.id FROM district d JOIN new_rows n ON n.id = d.id_zone
+                    ));
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER trg_district_geo_insert
+                AFTER INSERT ON district
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_district()
+                """,
+                """
+                CREATE TRIGGER trg_district_geo_update
+                AFTER UPDATE ON district
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_district()
+                """,
+                """
+                CREATE TRIGGER trg_district_geo_delete
+                AFTER DELETE ON district
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_district()
+                """,
+                # Cidades, estados e zonas com bairros não podem ser apagados
+                # (RESTRICT), então só o UPDATE precisa de trigger
+                """
+                CREATE TRIGGER trg_city_district_geo_update
+                AFTER UPDATE ON city
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_city()
+                """,
+                """
+                CREATE TRIGGER trg_state_district_geo_update
+                AFTER UPDATE ON state
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_state()
+                """,
+                """
+                CREATE TRIGGER trg_zone_district_geo_update
+                AFTER UPDATE ON zone
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION district_geo_from_zone()
+                """,
+                "SELECT district_geo_sync(ARRAY(SELECT id FROM district))",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER trg_district_geo_insert ON district",
+                "DROP TRIGGER trg_district_geo_update ON district",
+                "DROP TRIGGER trg_district_geo_delete ON district",
+                "DROP TRIGGER trg_city_district_geo_update ON city",
+                "DROP TRIGGER trg_state_district_geo_update ON state",
+                "DROP TRIGGER trg_zone_district_geo_update ON zone",
+                "DROP FUNCTION district_geo_from_zone()",
+                "DROP FUNCTION district_geo_from_state()",
+                "DROP FUNCTION district_geo_from_city()",
+                "DROP FUNCTION district_geo_from_district()",
+                "DROP FUNCTION district_geo_sync(bigint[])",
+            ],
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+# Tabelas pequenas guardadas em memória por core.dimensions
+VERSIONED_TABLES = [
+    "branch",
+    "city",
+    "department",
+    "district",
+    "marital_status",
+    "product_group",
+    "state",
+    "zone",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_district_geo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('table_name', models.CharField(db_column='table_name', max_length=63, unique=True)),
+                ('version', models.BigIntegerField(db_column='version', default=0)),
+            ],
+            options={
+                'verbose_name': 'Table Version',
+                'verbose_name_plural': 'Table Versions',
+                'db_table': 'table_version',
+                'db_table_comment': 'Change counter of a table, bumped by triggers',
+                'managed': True,
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                # Um incremento por comando (FOR EACH STATEMENT), não por linha
+                """
+                CREATE FUNCTION table_version_bump() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO table_version (table_name, version, created_at, modified_at, active)
+                    VALUES (TG_TABLE_NAME, 1, now(), now(), true)
+                    ON CONFLICT (table_name) DO UPDATE SET
+                        version = table_version.version + 1,
+                        modified_at = now();
+                    RETURN NULL;
+                END
+                $$
+                """,
+                *[
+                    f"""
+                    CREATE TRIGGER trg_{table}_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_version_bump()
+                    """
+                    for table in VERSIONED_TABLES
+                ],
+            ],
+            reverse_sql=[
+                *[f"DROP TRIGGER trg_{table}_version ON {table}" for table in VERSIONED_TABLES],
+                "DROP FUNCTION table_version_bump()",
+            ],
+        ),
+    ]
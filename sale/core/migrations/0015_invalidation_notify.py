@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# Tabelas com caches em memória nos workers (core.invalidation)
+NOTIFY_TABLES = [
+    "branch",
+    "city",
+    "department",
+    "district",
+    "marital_status",
+    "product",
+    "product_group",
+    "state",
+    "zone",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_table_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                # Um NOTIFY por comando com os ids alterados. Acima de 500 ids
+                # (o payload tem limite de 8000 bytes), em DELETE e em
+                # TRUNCATE vai só a tabela: quem escuta descarta a tabela toda.
+                """
+                CREATE FUNCTION core_notify_invalidation() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                DECLARE
+                    ids bigint[];
+                BEGIN
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        SELECT array_agg(id) INTO ids FROM (SELECT id FROM new_rows LIMIT 501) n;
+                        IF ids IS NULL THEN
+                            RETURN NULL;
+                        END IF;
+                    END IF;
+
+                    IF ids IS NOT NULL AND cardinality(ids) <= 500 THEN
+                        PERFORM pg_notify(
+                            'core_invalidation',
+                            json_build_object('table', TG_TABLE_NAME, 'ids', ids)::text
+                        );
+                    ELSE
+                        PERFORM pg_notify(
+                            'core_invalidation',
+                            json_build_object('table', TG_TABLE_NAME)::text
+                        );
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                *[
+                    sql
+                    for table in NOTIFY_TABLES
+                    for sql in (
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_insert
+                        AFTER INSERT ON {table}
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_update
+                        AFTER UPDATE ON {table}
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_delete
+                        AFTER DELETE OR TRUNCATE ON {table}
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                    )
+                ],
+            ],
+            reverse_sql=[
+                *[
+                    f"DROP TRIGGER trg_{table}_notify_{event} ON {table}"
+                    for table in NOTIFY_TABLES
+                    for event in ("insert", "update", "delete")
+                ],
+                "DROP FUNCTION core_notify_invalidation()",
+            ],
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Tabelas lidas por selectors com cache (core.result_cache) que ainda não
+# tinham contador de versão (0014)
+VERSIONED_TABLES = [
+    "employee",
+    "product",
+]
+
+# ... nem NOTIFY (0015); product já tinha
+NOTIFY_TABLES = [
+    "employee",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_invalidation_notify'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                *[
+                    f"""
+                    CREATE TRIGGER trg_{table}_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_version_bump()
+                    """
+                    for table in VERSIONED_TABLES
+                ],
+                *[
+                    sql
+                    for table in NOTIFY_TABLES
+                    for sql in (
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_insert
+                        AFTER INSERT ON {table}
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_update
+                        AFTER UPDATE ON {table}
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                        f"""
+                        CREATE TRIGGER trg_{table}_notify_delete
+                        AFTER DELETE OR TRUNCATE ON {table}
+                        FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                        """,
+                    )
+                ],
+            ],
+            reverse_sql=[
+                *[
+                    f"DROP TRIGGER trg_{table}_notify_{event} ON {table}"
+                    for table in NOTIFY_TABLES
+                    for event in ("insert", "update", "delete")
+                ],
+                *[f"DROP TRIGGER trg_{table}_version ON {table}" for table in VERSIONED_TABLES],
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:47
+
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_selector_cache_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoalescedResponse',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('key', models.CharField(db_column='key', max_length=64, unique=True)),
+                ('status_code', models.SmallIntegerField(db_column='status_code')),
+                ('data', models.JSONField(db_column='data', encoder=rest_framework.utils.encoders.JSONEncoder)),
+            ],
+            options={
+                'verbose_name': 'Coalesced Response',
+                'verbose_name_plural': 'Coalesced Responses',
+                'db_table': 'coalesced_response',
+                'db_table_comment': 'Shared result of a coalesced report request',
+                'managed': True,
+            },
+        ),
+        # Sem WAL: é um cache, pode se perder num crash
+        migrations.RunSQL(
+            sql="ALTER TABLE coalesced_response SET UNLOGGED",
+            reverse_sql="ALTER TABLE coalesced_response SET LOGGED",
+        ),
+    ]
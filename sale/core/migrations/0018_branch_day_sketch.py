@@ -0,0 +1,152 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:58
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_coalesced_response'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDaySketchChange',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('sale_hour', models.DateTimeField(db_column='sale_hour')),
+                ('branch', models.ForeignKey(db_column='id_branch', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.branch')),
+            ],
+            options={
+                'verbose_name': 'Branch Day Sketch Change',
+                'verbose_name_plural': 'Branch Day Sketch Changes',
+                'db_table': 'branch_day_sketch_change',
+                'db_table_comment': 'Branches and sale hours touched since the sketches were last refreshed',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchDaySketch',
+            fields=[
+                ('id', models.BigAutoField(db_column='id', primary_key=True, serialize=False, verbose_name='Identifier')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at', verbose_name='Created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_column='modified_at', verbose_name='Modified at')),
+                ('active', models.BooleanField(db_column='active', default=True, verbose_name='Active')),
+                ('day', models.DateField(db_column='day')),
+                ('sales', models.BigIntegerField(db_column='sales', default=0)),
+                ('quantity', models.BigIntegerField(db_column='quantity', default=0)),
+                ('customers', models.BinaryField(db_column='customers')),
+                ('products', models.BinaryField(db_column='products')),
+                ('top_products', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), db_column='top_products', default=list, size=None)),
+                ('top_quantities', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), db_column='top_quantities', default=list, size=None)),
+                ('branch', models.ForeignKey(db_column='id_branch', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.branch')),
+            ],
+            options={
+                'verbose_name': 'Branch Day Sketch',
+                'verbose_name_plural': 'Branch Day Sketches',
+                'db_table': 'branch_day_sketch',
+                'db_table_comment': 'Daily distinct-customer and product sketches of a branch',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('day', 'branch'), name='uq_branch_day_sketch_day_branch')],
+            },
+        ),
+        migrations.RunSQL(
+            sql=[
+                # Filial e hora das vendas tocadas por cada comando; o dia
+                # depende do fuso do projeto, aplicado em Python (como na 0008)
+                """
+                CREATE FUNCTION sketch_mark_sale() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO branch_day_sketch_change
+                            (id_branch, sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT n.id_branch, date_trunc('hour', n.date), now(), now(), true
+                        FROM new_rows n;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        INSERT INTO branch_day_sketch_change
+                            (id_branch, sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT o.id_branch, date_trunc('hour', o.date), now(), now(), true
+                        FROM old_rows o;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE FUNCTION sketch_mark_sale_item() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO branch_day_sketch_change
+                            (id_branch, sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT s.id_branch, date_trunc('hour', s.date), now(), now(), true
+                        FROM new_rows n
+                        JOIN sale s ON s.id = n.id_sale;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        INSERT INTO branch_day_sketch_change
+                            (id_branch, sale_hour, created_at, modified_at, active)
+                        SELECT DISTINCT s.id_branch, date_trunc('hour', s.date), now(), now(), true
+                        FROM old_rows o
+                        JOIN sale s ON s.id = o.id_sale;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """,
+                """
+                CREATE TRIGGER trg_sale_sketch_insert
+                AFTER INSERT ON sale
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_sketch_update
+                AFTER UPDATE ON sale
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_sketch_delete
+                AFTER DELETE ON sale
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_sketch_insert
+                AFTER INSERT ON sale_item
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale_item()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_sketch_update
+                AFTER UPDATE ON sale_item
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale_item()
+                """,
+                """
+                CREATE TRIGGER trg_sale_item_sketch_delete
+                AFTER DELETE ON sale_item
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION sketch_mark_sale_item()
+                """,
+            ],
+            reverse_sql=[
+                "DROP TRIGGER trg_sale_sketch_insert ON sale",
+                "DROP TRIGGER trg_sale_sketch_update ON sale",
+                "DROP TRIGGER trg_sale_sketch_delete ON sale",
+                "DROP TRIGGER trg_sale_item_sketch_insert ON sale_item",
+                "DROP TRIGGER trg_sale_item_sketch_update ON sale_item",
+                "DROP TRIGGER trg_sale_item_sketch_delete ON sale_item",
+                "DROP FUNCTION sketch_mark_sale_item()",
+                "DROP FUNCTION sketch_mark_sale()",
+            ],
+        ),
+    ]
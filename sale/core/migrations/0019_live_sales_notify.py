@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Tabelas do feed de vendas ao vivo (core.live_feed), no mesmo canal do
+# barramento de invalidação (0015)
+NOTIFY_TABLES = [
+    "sale",
+    "sale_item",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_branch_day_sketch'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                sql
+                for table in NOTIFY_TABLES
+                for sql in (
+                    f"""
+                    CREATE TRIGGER trg_{table}_notify_insert
+                    AFTER INSERT ON {table}
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                    """,
+                    f"""
+                    CREATE TRIGGER trg_{table}_notify_update
+                    AFTER UPDATE ON {table}
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                    """,
+                    f"""
+                    CREATE TRIGGER trg_{table}_notify_delete
+                    AFTER DELETE OR TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_invalidation()
+                    """,
+                )
+            ],
+            reverse_sql=[
+                f"DROP TRIGGER trg_{table}_notify_{event} ON {table}"
+                for table in NOTIFY_TABLES
+                for event in ("insert", "update", "delete")
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:14
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_live_sales_notify'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='districtgeo',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city_name'), name='text_pattern_ops'), name='idx_district_geo_city_upper'),
+        ),
+    ]
@@ -1,6 +1,15 @@
 from datetime import date
 
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Upper
+from rest_framework.utils.encoders import JSONEncoder
+
+# Configuração de busca textual: português sem acentos (criada na migration 0003)
+SEARCH_CONFIG = "pt_unaccent"
 
 
 class BaseModel(models.Model):
@@ -51,6 +60,133 @@ class NameBaseModel(BaseModel):
         return f"ID: {self.id} - Name: {self.name}"
 
 
+class BasketValueSketch(BaseModel):
+    """Sketch de quantis do valor das vendas (cestas) de um dia.
+
+    Histograma em faixas logarítmicas (DDSketch): a faixa i conta as cestas
+    com valor em (gamma^(i-1), gamma^i], então qualquer quantil estimado tem
+    erro relativo de no máximo core.distributions.RELATIVE_ACCURACY. Sketches
+    de dias diferentes são somados faixa a faixa; atualizado pelo comando
+    refresh_basket_sketches.
+    """
+
+    day = models.DateField(
+        unique=True,
+        db_column="day",
+    )
+    count = models.BigIntegerField(
+        default=0,
+        db_column="count",
+    )
+    total = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        db_column="total",
+    )
+    minimum = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_column="minimum",
+    )
+    maximum = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_column="maximum",
+    )
+    # Cestas de valor zero (ou negativo), fora das faixas logarítmicas
+    zero_count = models.BigIntegerField(
+        default=0,
+        db_column="zero_count",
+    )
+    # Índice da primeira faixa de `bins`
+    offset = models.IntegerField(
+        default=0,
+        db_column="offset",
+    )
+    bins = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        db_column="bins",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "basket_value_sketch"
+        verbose_name = "Basket Value Sketch"
+        verbose_name_plural = "Basket Value Sketches"
+        db_table_comment = "Daily quantile sketch of the sale (basket) value"
+
+
+class BatchJob(BaseModel):
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(
+        max_length=64,
+        db_column="name",
+    )
+    params = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        db_column="params",
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.RUNNING,
+        db_column="status",
+    )
+    last_pk = models.BigIntegerField(
+        default=0,
+        db_column="last_pk",
+    )
+    max_pk = models.BigIntegerField(
+        default=0,
+        db_column="max_pk",
+    )
+    rows_updated = models.BigIntegerField(
+        default=0,
+        db_column="rows_updated",
+    )
+    error = models.TextField(
+        blank=True,
+        default="",
+        db_column="error",
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_column="finished_at",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "batch_job"
+        verbose_name = "Batch Job"
+        verbose_name_plural = "Batch Jobs"
+        db_table_comment = "Chunked bulk update and its progress"
+        indexes = [
+            models.Index(fields=["name", "status"], name="idx_batch_job_name_status"),
+        ]
+
+    def __str__(self) -> str:
+        return f"ID: {self.id} - {self.name} ({self.status})"
+
+    @property
+    def progress(self) -> float:
+        """Fração (0 a 1) da faixa de ids já percorrida."""
+        if self.status == self.Status.DONE or self.max_pk <= 0:
+            return 1.0
+        return min(self.last_pk / self.max_pk, 1.0)
+
+
 class Branch(NameBaseModel):
     district = models.ForeignKey(
         to="District",
@@ -58,6 +194,17 @@ class Branch(NameBaseModel):
         db_column="id_district",
     )
 
+    # Atalho para district_geo pelo id_district, sem coluna própria
+    geo = models.ForeignObject(
+        to="DistrictGeo",
+        on_delete=models.DO_NOTHING,
+        from_fields=["district"],
+        to_fields=["district"],
+        null=True,
+        editable=False,
+        related_name="+",
+    )
+
     class Meta:
         managed = True
         db_table = "branch"
@@ -66,6 +213,94 @@ class Branch(NameBaseModel):
         db_table_comment = "Place where the sales are made"
 
 
+class BranchDaySketch(BaseModel):
+    """Sketches de clientes distintos e de produtos de uma filial num dia.
+
+    `customers` é um HyperLogLog (registradores uint8) e `products` um
+    count-min de quantidade vendida (contadores int64, em milésimos), ambos
+    com os parâmetros de core.sketches; `top_products`/`top_quantities` são
+    os produtos mais vendidos do dia. Sketches de filiais e dias diferentes
+    são combinados (máximo e soma) para responder a qualquer período.
+    """
+
+    branch = models.ForeignKey(
+        to="Branch",
+        on_delete=models.CASCADE,
+        db_column="id_branch",
+        related_name="+",
+    )
+    day = models.DateField(
+        db_column="day",
+    )
+    sales = models.BigIntegerField(
+        default=0,
+        db_column="sales",
+    )
+    # Quantidade vendida no dia, em milésimos: o N do erro do count-min
+    quantity = models.BigIntegerField(
+        default=0,
+        db_column="quantity",
+    )
+    customers = models.BinaryField(
+        db_column="customers",
+    )
+    products = models.BinaryField(
+        db_column="products",
+    )
+    top_products = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        db_column="top_products",
+    )
+    # Quantidade exata de cada produto de top_products no dia, em milésimos
+    top_quantities = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        db_column="top_quantities",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "branch_day_sketch"
+        verbose_name = "Branch Day Sketch"
+        verbose_name_plural = "Branch Day Sketches"
+        db_table_comment = "Daily distinct-customer and product sketches of a branch"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "branch"],
+                name="uq_branch_day_sketch_day_branch",
+            ),
+        ]
+
+
+class BranchDaySketchChange(BaseModel):
+    """Filial e hora (UTC) de uma venda criada/alterada/removida.
+
+    Preenchida pelos triggers da migration 0018 em sale e sale_item; a
+    atualização incremental (core.sketches.refresh_pending) refaz os
+    sketches dessas filiais nesses dias e apaga as linhas consumidas.
+    """
+
+    # Sem FK no banco: a linha pode se referir a uma filial já removida
+    branch = models.ForeignKey(
+        to="Branch",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_column="id_branch",
+        related_name="+",
+    )
+    sale_hour = models.DateTimeField(
+        db_column="sale_hour",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "branch_day_sketch_change"
+        verbose_name = "Branch Day Sketch Change"
+        verbose_name_plural = "Branch Day Sketch Changes"
+        db_table_comment = "Branches and sale hours touched since the sketches were last refreshed"
+
+
 class City(NameBaseModel):
     state = models.ForeignKey(
         to="State",
@@ -81,6 +316,101 @@ class City(NameBaseModel):
         db_table_comment = "Place where the sales are made"
 
 
+class CoalescedResponse(BaseModel):
+    """Último resultado de um relatório coalescido, compartilhado entre processos.
+
+    Gravado por quem calculou o relatório segurando o advisory lock da chave
+    (core.single_flight); quem esperou pelo lock em outro processo lê daqui
+    em vez de repetir a consulta. Tabela UNLOGGED: é só um cache.
+    """
+
+    # sha256 do viewset, action, URL e parâmetros da requisição
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        db_column="key",
+    )
+    status_code = models.SmallIntegerField(
+        db_column="status_code",
+    )
+    data = models.JSONField(
+        encoder=JSONEncoder,
+        db_column="data",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "coalesced_response"
+        verbose_name = "Coalesced Response"
+        verbose_name_plural = "Coalesced Responses"
+        db_table_comment = "Shared result of a coalesced report request"
+
+
+class CommissionChange(BaseModel):
+    """Hora (UTC) de uma venda criada/alterada/removida desde o último cálculo.
+
+    Preenchida pelos triggers da migration 0008 em sale e sale_item; o
+    recálculo incremental de comissões converte essas horas nos meses a
+    refazer e apaga as linhas consumidas.
+    """
+
+    # Sem unique de propósito: cada comando grava suas próprias linhas, e o
+    # recálculo apaga exatamente as que leu (core.change_log.claim_changes)
+    sale_hour = models.DateTimeField(
+        db_column="sale_hour",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "commission_change"
+        verbose_name = "Commission Change"
+        verbose_name_plural = "Commission Changes"
+        db_table_comment = "Sale hours touched since commissions were last computed"
+
+
+class CommissionStatement(BaseModel):
+    employee = models.ForeignKey(
+        to="Employee",
+        on_delete=models.RESTRICT,
+        db_column="id_employee",
+        related_name="commission_statements",
+    )
+    period = models.DateField(
+        db_column="period",
+        help_text="Primeiro dia do mês de referência.",
+    )
+    items = models.BigIntegerField(
+        default=0,
+        db_column="items",
+    )
+    total_sales = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        db_column="total_sales",
+    )
+    commission = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        db_column="commission",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "commission_statement"
+        verbose_name = "Commission Statement"
+        verbose_name_plural = "Commission Statements"
+        db_table_comment = "Monthly commission of each employee"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "employee"],
+                name="uq_commission_statement_period_employee",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["employee", "period"], name="idx_commission_employee"),
+        ]
+
+
 class Customer(NameBaseModel):
     class Gender(models.TextChoices):
         MALE = "M", "Male"
@@ -108,12 +438,105 @@ class Customer(NameBaseModel):
         db_column="id_marital_status",
     )
 
+    # Atalho para district_geo pelo id_district, sem coluna própria
+    geo = models.ForeignObject(
+        to="DistrictGeo",
+        on_delete=models.DO_NOTHING,
+        from_fields=["district"],
+        to_fields=["district"],
+        null=True,
+        editable=False,
+        related_name="+",
+    )
+
+    search_vector = models.GeneratedField(
+        expression=SearchVector("name", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_column="search_vector",
+    )
+
     class Meta:
         managed = True
         db_table = "customer"
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
         db_table_comment = "Person who buys the products"
+        indexes = [
+            models.Index(
+                OpClass(Upper("name"), name="text_pattern_ops"),
+                name="idx_customer_name_upper",
+            ),
+            GinIndex(fields=["search_vector"], name="idx_customer_search"),
+            models.Index(fields=["income"], name="idx_customer_income"),
+            models.Index(fields=["gender"], name="idx_customer_gender"),
+        ]
+
+
+class CustomerRFM(BaseModel):
+    """Segmentação RFM (recência, frequência, valor) de um cliente.
+
+    Recalculada em lote por core.rfm (comando refresh_rfm); as notas vão de
+    1 (pior quintil) a 5 (melhor quintil), e 0 para quem nunca comprou.
+    """
+
+    class Segment(models.TextChoices):
+        CHAMPIONS = "champions", "Champions"
+        LOYAL = "loyal", "Loyal"
+        NEW = "new", "New"
+        NEEDS_ATTENTION = "needs_attention", "Needs attention"
+        AT_RISK = "at_risk", "At risk"
+        HIBERNATING = "hibernating", "Hibernating"
+        NO_PURCHASES = "no_purchases", "No purchases"
+
+    customer = models.OneToOneField(
+        to="Customer",
+        on_delete=models.CASCADE,
+        db_column="id_customer",
+        related_name="rfm",
+    )
+    last_purchase = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_column="last_purchase",
+    )
+    frequency = models.IntegerField(
+        default=0,
+        db_column="frequency",
+    )
+    monetary = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        db_column="monetary",
+    )
+    recency_score = models.SmallIntegerField(
+        default=0,
+        db_column="recency_score",
+    )
+    frequency_score = models.SmallIntegerField(
+        default=0,
+        db_column="frequency_score",
+    )
+    monetary_score = models.SmallIntegerField(
+        default=0,
+        db_column="monetary_score",
+    )
+    segment = models.CharField(
+        max_length=32,
+        choices=Segment.choices,
+        db_column="segment",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "customer_rfm"
+        verbose_name = "Customer RFM"
+        verbose_name_plural = "Customer RFM"
+        db_table_comment = "Recency/frequency/monetary scores and segment of a customer"
+        indexes = [
+            models.Index(fields=["segment"], name="idx_customer_rfm_segment"),
+        ]
 
 
 class Department(NameBaseModel):
@@ -145,6 +568,81 @@ class District(NameBaseModel):
         db_table_comment = "Place where the sales are made"
 
 
+class DistrictGeo(BaseModel):
+    """Hierarquia geográfica de um bairro já resolvida (bairro, cidade, estado, zona).
+
+    Mantida pelos triggers da migration 0013 em district, city, state e zone:
+    qualquer insert/update/delete nessas tabelas reescreve as linhas afetadas.
+    Customer, Employee e Branch chegam aqui pelo campo virtual `geo`, com um
+    único JOIN em vez de district -> city -> state.
+    """
+
+    # Sem FK no banco de propósito: o trigger de district apaga a linha junto
+    # com o bairro, inclusive em DELETEs feitos fora do Django
+    district = models.OneToOneField(
+        to="District",
+        on_delete=models.CASCADE,
+        db_column="id_district",
+        db_constraint=False,
+        related_name="geo",
+    )
+    district_name = models.CharField(
+        max_length=128,
+        db_column="district_name",
+    )
+    city = models.ForeignKey(
+        to="City",
+        on_delete=models.DO_NOTHING,
+        db_column="id_city",
+        db_constraint=False,
+        related_name="+",
+    )
+    city_name = models.CharField(
+        max_length=128,
+        db_column="city_name",
+    )
+    state = models.ForeignKey(
+        to="State",
+        on_delete=models.DO_NOTHING,
+        db_column="id_state",
+        db_constraint=False,
+        related_name="+",
+    )
+    state_name = models.CharField(
+        max_length=128,
+        db_column="state_name",
+    )
+    state_abbreviation = models.CharField(
+        max_length=2,
+        db_column="state_abbreviation",
+    )
+    zone = models.ForeignKey(
+        to="Zone",
+        on_delete=models.DO_NOTHING,
+        db_column="id_zone",
+        db_constraint=False,
+        related_name="+",
+    )
+    zone_name = models.CharField(
+        max_length=128,
+        db_column="zone_name",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "district_geo"
+        verbose_name = "District Geo"
+        verbose_name_plural = "District Geo"
+        db_table_comment = "Flattened district -> city -> state / zone hierarchy"
+        indexes = [
+            models.Index(fields=["state_abbreviation"], name="idx_district_geo_state_abbr"),
+            models.Index(
+                OpClass(Upper("city_name"), name="text_pattern_ops"),
+                name="idx_district_geo_city_upper",
+            ),
+        ]
+
+
 class Employee(NameBaseModel):
     salary = models.DecimalField(
         max_digits=16,
@@ -178,16 +676,52 @@ class Employee(NameBaseModel):
         db_column="id_marital_status",
     )
 
+    # Atalho para district_geo pelo id_district, sem coluna própria
+    geo = models.ForeignObject(
+        to="DistrictGeo",
+        on_delete=models.DO_NOTHING,
+        from_fields=["district"],
+        to_fields=["district"],
+        null=True,
+        editable=False,
+        related_name="+",
+    )
+
+    search_vector = models.GeneratedField(
+        expression=SearchVector("name", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_column="search_vector",
+    )
+
     class Meta:
         managed = True
         db_table = "employee"
         verbose_name = "Employee"
         verbose_name_plural = "Employees"
         db_table_comment = "Person who works in the company"
+        indexes = [
+            models.Index(
+                OpClass(Upper("name"), name="text_pattern_ops"),
+                name="idx_employee_name_upper",
+            ),
+            GinIndex(fields=["search_vector"], name="idx_employee_search"),
+            models.Index(fields=["salary"], name="idx_employee_salary"),
+            models.Index(fields=["admission_date"], name="idx_employee_admission"),
+            models.Index(fields=["birth_date"], name="idx_employee_birth_date"),
+            models.Index(
+                fields=["department", "-salary"],
+                name="idx_employee_department_salary",
+            ),
+        ]
 
     @property
     def age(self) -> int:
         """Calculate age of employee."""
+        # Idade já calculada no banco (annotate(age_years=Age("birth_date")))
+        if "age_years" in self.__dict__:
+            return self.age_years
+
         today = date.today()
 
         # Calcula diferença bruta de anos
@@ -236,12 +770,78 @@ class Product(NameBaseModel):
         db_column="id_supplier",
     )
 
+    search_vector = models.GeneratedField(
+        expression=SearchVector("name", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_column="search_vector",
+    )
+
     class Meta:
         managed = True
         db_table = "product"
         verbose_name = "Product"
         verbose_name_plural = "Products"
         db_table_comment = "Product that is sold"
+        indexes = [
+            models.Index(
+                OpClass(Upper("name"), name="text_pattern_ops"),
+                name="idx_product_name_upper",
+            ),
+            GinIndex(fields=["search_vector"], name="idx_product_search"),
+            models.Index(fields=["sale_price"], name="idx_product_sale_price"),
+            models.Index(fields=["cost_price"], name="idx_product_cost_price"),
+            models.Index(fields=["modified_at"], name="idx_product_modified_at"),
+        ]
+
+
+class ProductAssociation(BaseModel):
+    """"Quem comprou `product` também comprou `related_product`".
+
+    Top-K vizinhos de cada produto, reconstruídos em lote por
+    core.associations (comando build_product_associations).
+    """
+
+    product = models.ForeignKey(
+        to="Product",
+        on_delete=models.CASCADE,
+        db_column="id_product",
+        related_name="associations",
+    )
+    related_product = models.ForeignKey(
+        to="Product",
+        on_delete=models.CASCADE,
+        db_column="id_related_product",
+        related_name="+",
+    )
+    rank = models.SmallIntegerField(
+        db_column="rank",
+    )
+    co_count = models.IntegerField(
+        db_column="co_count",
+    )
+    support = models.FloatField(
+        db_column="support",
+    )
+    confidence = models.FloatField(
+        db_column="confidence",
+    )
+    lift = models.FloatField(
+        db_column="lift",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "product_association"
+        verbose_name = "Product Association"
+        verbose_name_plural = "Product Associations"
+        db_table_comment = "Products frequently bought together"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "rank"],
+                name="uq_product_association_product_rank",
+            ),
+        ]
 
 
 class ProductGroup(NameBaseModel):
@@ -264,6 +864,63 @@ class ProductGroup(NameBaseModel):
         db_table_comment = "Group of products"
 
 
+class ProductPriceHistory(BaseModel):
+    """Preços de um produto em cada intervalo [valid_from, valid_to).
+
+    Gravado pelos triggers da migration 0006 sempre que um produto é criado
+    ou tem sale_price/cost_price alterado (inclusive por QuerySet.update()).
+    valid_to nulo é o preço vigente.
+    """
+
+    product = models.ForeignKey(
+        to="Product",
+        # Histórico não tem valor sem o produto
+        on_delete=models.CASCADE,
+        db_column="id_product",
+        related_name="price_history",
+    )
+    cost_price = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        db_column="cost_price",
+    )
+    sale_price = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        db_column="sale_price",
+    )
+    valid_from = models.DateTimeField(
+        db_column="valid_from",
+    )
+    valid_to = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_column="valid_to",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "product_price_history"
+        verbose_name = "Product Price History"
+        verbose_name_plural = "Product Price History"
+        db_table_comment = "Sale and cost price of a product over time"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "valid_from"],
+                name="uq_product_price_history_product_valid_from",
+            ),
+        ]
+        indexes = [
+            # Busca "preço vigente em T": id_product = %s AND valid_from <= T,
+            # pegando o maior valid_from (uma descida no índice)
+            models.Index(
+                fields=["product", "-valid_from"],
+                name="idx_price_history_asof",
+                include=["valid_to", "sale_price", "cost_price"],
+            ),
+        ]
+
+
 class Sale(BaseModel):
     date = models.DateTimeField(
         db_column="date",
@@ -293,6 +950,12 @@ class Sale(BaseModel):
         verbose_name = "Sale"
         verbose_name_plural = "Sales"
         db_table_comment = "Sale made by an employee to a customer"
+        indexes = [
+            models.Index(fields=["date"], name="idx_sale_date"),
+            models.Index(fields=["branch", "date"], name="idx_sale_branch_date"),
+            models.Index(fields=["employee", "date"], name="idx_sale_employee_date"),
+            models.Index(fields=["customer", "date"], name="idx_sale_customer_date"),
+        ]
 
 
 class SaleItem(BaseModel):
@@ -327,6 +990,29 @@ class SaleItem(BaseModel):
         verbose_name = "Sale Item"
         verbose_name_plural = "Sale Items"
         db_table_comment = "Item of a sale"
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(sale_price__isnull=True),
+                name="idx_sale_item_without_price",
+            ),
+            models.Index(
+                fields=["sale"],
+                include=["product", "quantity", "sale_price"],
+                name="idx_sale_item_sale_covering",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Congela o preço de tabela no momento da venda. O trigger da migration
+        # 0007 faz o mesmo para bulk_create() e INSERTs fora do Django.
+        if self._state.adding and self.sale_price is None and self.product_id:
+            self.sale_price = (
+                Product.objects.filter(pk=self.product_id)
+                .values_list("sale_price", flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
 
 
 class State(NameBaseModel):
@@ -341,6 +1027,9 @@ class State(NameBaseModel):
         verbose_name = "State"
         verbose_name_plural = "States"
         db_table_comment = "State where the customers live"
+        indexes = [
+            models.Index(fields=["abbreviation"], name="idx_state_abbreviation"),
+        ]
 
 
 class Supplier(NameBaseModel):
@@ -350,12 +1039,56 @@ class Supplier(NameBaseModel):
         db_column="legal_document",
     )
 
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("name", config=SEARCH_CONFIG, weight="A")
+            + SearchVector("legal_document", config=SEARCH_CONFIG, weight="B")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_column="search_vector",
+    )
+
     class Meta:
         managed = True
         db_table = "supplier"
         verbose_name = "Supplier"
         verbose_name_plural = "Suppliers"
         db_table_comment = "Person who supplies the products"
+        indexes = [
+            models.Index(
+                OpClass(Upper("name"), name="text_pattern_ops"),
+                name="idx_supplier_name_upper",
+            ),
+            GinIndex(fields=["search_vector"], name="idx_supplier_search"),
+        ]
+
+
+class TableVersion(BaseModel):
+    """Contador de alterações de uma tabela.
+
+    Os triggers das migrations 0014 e 0016 somam 1 em `version` a cada
+    INSERT, UPDATE, DELETE ou TRUNCATE na tabela; caches em memória
+    (core.dimensions, core.result_cache) comparam o número que têm com o do
+    banco para saber se estão velhos.
+    """
+
+    table_name = models.CharField(
+        max_length=63,
+        unique=True,
+        db_column="table_name",
+    )
+    version = models.BigIntegerField(
+        default=0,
+        db_column="version",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "table_version"
+        verbose_name = "Table Version"
+        verbose_name_plural = "Table Versions"
+        db_table_comment = "Change counter of a table, bumped by triggers"
 
 
 class Zone(NameBaseModel):
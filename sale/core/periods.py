@@ -0,0 +1,66 @@
+"""
+Períodos em dias inteiros convertidos em intervalos de instantes.
+
+Filtrar um DateTimeField por dia com `date__date__gte` vira
+`("date" AT TIME ZONE 'UTC')::date >= ...`, expressão que nenhum índice em
+"date" atende. Aqui [start, end] (dias no fuso do projeto) vira
+`date >= início de start AND date < início do dia seguinte a end`, que usa
+idx_sale_date e os índices compostos (filial, data), (funcionário, data)...
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+
+def day_start(day: date) -> datetime:
+    """Início (00:00 no fuso do projeto) de um dia."""
+    moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+def day_bounds(start: date | None, end: date | None) -> tuple[datetime | None, datetime | None]:
+    """Converte [start, end] (dias inteiros) no intervalo semiaberto [início, fim).
+
+    Args:
+        start: Primeiro dia (opcional).
+        end: Último dia, inclusive (opcional).
+
+    Returns:
+        tuple[datetime | None, datetime | None]: Início de start e início do dia
+            seguinte a end; None onde o dia não foi informado.
+    """
+    return (
+        day_start(start) if start else None,
+        day_start(end + timedelta(days=1)) if end else None,
+    )
+
+
+def filter_days(
+    queryset: QuerySet,
+    field: str,
+    start: date | None = None,
+    end: date | None = None,
+) -> QuerySet:
+    """Filtra um QuerySet pelos dias [start, end] de um DateTimeField.
+
+    Args:
+        queryset: QuerySet a filtrar.
+        field: Caminho do campo (ex: "date", "sale__date").
+        start: Primeiro dia (opcional).
+        end: Último dia, inclusive (opcional).
+
+    Returns:
+        QuerySet: O mesmo QuerySet com `field >= início AND field < fim`.
+
+    Example:
+        filter_days(SaleItem.objects.all(), "sale__date", date(2024, 1, 1), date(2024, 1, 31))
+    """
+    start_at, end_at = day_bounds(start, end)
+    if start_at:
+        queryset = queryset.filter(**{f"{field}__gte": start_at})
+    if end_at:
+        queryset = queryset.filter(**{f"{field}__lt": end_at})
+    return queryset
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+from core.cube import DIMENSIONS
+from core.models import Customer
+
 
 class DepartmentPaginatorSerializer(serializers.Serializer):
     qtd_departments = serializers.IntegerField(
@@ -8,3 +11,137 @@ class DepartmentPaginatorSerializer(serializers.Serializer):
         max_value=100,
         default=5
     )
+
+
+class SearchSerializer(serializers.Serializer):
+    q = serializers.CharField(
+        required=True,
+        min_length=1,
+        max_length=100,
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=50,
+        default=10
+    )
+
+
+class AgeHistogramSerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(
+        choices=["department", "district", "gender"],
+        required=False,
+        default="department"
+    )
+
+
+class CommissionPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField(input_formats=["%Y-%m"])
+
+
+class RelatedProductsSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        required=False,
+        default=10,
+        min_value=1,
+        max_value=50,
+    )
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """Período opcional [start, end] em dias inteiros."""
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start deve ser anterior a end.")
+        return attrs
+
+
+class RankingSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+        default=10
+    )
+
+
+class BranchRankingSerializer(RankingSerializer, DateRangeSerializer):
+    pass
+
+
+class MonthRankingSerializer(RankingSerializer):
+    year = serializers.IntegerField(min_value=2000, max_value=2100)
+
+
+class DistributionSerializer(serializers.Serializer):
+    buckets = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+        default=10
+    )
+
+
+class BasketDistributionSerializer(DistributionSerializer, DateRangeSerializer):
+    approximate = serializers.BooleanField(required=False, default=False)
+
+
+class RegionRollupSerializer(DateRangeSerializer):
+    level = serializers.ChoiceField(
+        choices=["zone", "state", "city", "district"],
+        required=False,
+        default="state",
+    )
+
+
+class SalesCubeSerializer(DateRangeSerializer):
+    group_by = serializers.ListField(
+        child=serializers.ChoiceField(choices=DIMENSIONS),
+        required=False,
+        default=list,
+    )
+    product_group = serializers.ListField(child=serializers.IntegerField(), required=False)
+    branch = serializers.ListField(child=serializers.IntegerField(), required=False)
+    employee = serializers.ListField(child=serializers.IntegerField(), required=False)
+    gender = serializers.ListField(
+        child=serializers.ChoiceField(choices=Customer.Gender.choices),
+        required=False,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=10000,
+        required=False,
+        default=1000,
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if len(set(attrs["group_by"])) != len(attrs["group_by"]):
+            raise serializers.ValidationError("group_by com dimensão repetida.")
+        attrs["filters"] = {
+            name: attrs.pop(name)
+            for name in ("product_group", "branch", "employee", "gender")
+            if name in attrs
+        }
+        return attrs
+
+
+class BranchSketchSerializer(DateRangeSerializer):
+    branches = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class TopProductsSketchSerializer(BranchSketchSerializer):
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+        default=20
+    )
+
+
+class LiveSalesSerializer(serializers.Serializer):
+    branches = serializers.ListField(child=serializers.IntegerField(), required=False)
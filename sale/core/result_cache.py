@@ -0,0 +1,222 @@
+"""
+Cache em memória dos resultados de selectors.
+
+Selectors como count_all_products e get_product_count_by_group leem tabelas
+que mudam pouco, mas repetiam a mesma agregação a cada requisição. Com
+`cached_selector(*models)` o resultado fica guardado por (selector,
+argumentos) junto com a versão de cada tabela de origem, e vale exatamente
+enquanto nenhuma delas mudar.
+
+Versões: a tabela table_version tem um contador por tabela, somado pelos
+triggers das migrations 0014/0016 a cada comando que a altera. Por ser
+trigger, pega tudo: save(), delete(), QuerySet.update(), bulk_create() e
+SQL direto. Com o barramento de invalidação (core.invalidation) conectado,
+as versões lidas valem até chegar um NOTIFY da tabela; sem ele, ou quando o
+cliente acabou de escrever (read-your-writes), são relidas do primário a
+cada chamada (uma consulta pelo índice único de table_version).
+
+Regras:
+
+- Dentro de transação não há cache: a versão lida incluiria escritas ainda
+  não confirmadas, que podem sofrer rollback.
+- Na falta, o selector roda no primário: numa réplica atrasada o resultado
+  seria anterior às versões lidas.
+- O resultado é guardado serializado (pickle): QuerySets são avaliados, cada
+  acerto devolve uma cópia nova, e o tamanho em bytes é exato.
+- Limites: LRU por número de entradas (SELECTOR_CACHE_MAX_ENTRIES) e por
+  memória (SELECTOR_CACHE_MAX_BYTES); resultados maiores que
+  SELECTOR_CACHE_MAX_ENTRY_BYTES não são guardados.
+
+As tabelas usadas precisam dos dois triggers (versão e NOTIFY).
+"""
+
+import functools
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+
+from core.db_router import is_pinned, pin_to_primary
+from core.invalidation import invalidation_bus
+from core.models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, "SELECTOR_CACHE_ENABLED", True)
+
+# Limites por worker
+MAX_ENTRIES = getattr(settings, "SELECTOR_CACHE_MAX_ENTRIES", 1024)
+MAX_BYTES = getattr(settings, "SELECTOR_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+MAX_ENTRY_BYTES = getattr(settings, "SELECTOR_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024)
+
+
+class TableVersions:
+    """Versões conhecidas das tabelas, relidas quando o barramento avisa."""
+
+    def __init__(self, bus=invalidation_bus) -> None:
+        self.bus = bus
+        self._versions: dict[str, int] = {}
+        # Tabelas avisadas pelo barramento e ainda não relidas
+        self._stale: set[str] = set()
+        self._subscribed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        """Versão atual de cada tabela, na ordem recebida."""
+        self._subscribe(tables)
+        versions = self._versions
+        if (
+            is_pinned()
+            or not self.bus.healthy
+            or not self._stale.isdisjoint(tables)
+            or any(table not in versions for table in tables)
+        ):
+            versions = self._load(tables)
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def _subscribe(self, tables: tuple[str, ...]) -> None:
+        if self._subscribed.issuperset(tables):
+            return
+        with self._lock:
+            for table in tables:
+                if table not in self._subscribed:
+                    self.bus.subscribe(table, functools.partial(self._on_change, table))
+                    self._subscribed.add(table)
+
+    def _on_change(self, table: str, ids: set[int] | None) -> None:
+        # Roda no thread do barramento: só anota
+        with self._lock:
+            self._stale.add(table)
+
+    def _load(self, tables: tuple[str, ...]) -> dict[str, int]:
+        # Desmarca antes de ler: um aviso que chegue durante a consulta marca
+        # a tabela de novo e a próxima chamada relê
+        with self._lock:
+            self._stale.difference_update(tables)
+        loaded = dict(
+            TableVersion.objects.using(DEFAULT_DB_ALIAS)
+            .filter(table_name__in=tables)
+            .values_list("table_name", "version")
+        )
+        with self._lock:
+            versions = dict(self._versions)
+            for table in tables:
+                versions[table] = loaded.get(table, 0)
+            self._versions = versions
+        return versions
+
+
+class ResultCache:
+    """LRU de resultados serializados, limitado por entradas e por bytes."""
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+        max_entry_bytes: int = MAX_ENTRY_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        # chave -> (versões das tabelas, resultado serializado)
+        self._entries: OrderedDict[Hashable, tuple[tuple[int, ...], bytes]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, versions: tuple[int, ...]) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, versions: tuple[int, ...], data: bytes) -> None:
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (versions, data)
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Entradas, bytes ocupados, acertos e faltas desde o início do worker."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+table_versions = TableVersions()
+result_cache = ResultCache()
+
+
+def cached_selector(*models: type[Model]):
+    """Decorator que guarda o resultado do selector até as tabelas mudarem.
+
+    Args:
+        *models: Models cujas tabelas o selector lê (todas, inclusive as dos
+            JOINs); uma escrita em qualquer uma invalida o resultado.
+
+    Example:
+        @cached_selector(Product, ProductGroup)
+        @replica_selector
+        def get_product_count_by_group(): ...
+
+    Note:
+        Argumentos que não são hashable fazem a chamada passar direto, sem cache.
+    """
+    tables = tuple(model._meta.db_table for model in models)
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not ENABLED or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+                return func(*args, **kwargs)
+
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+
+            versions = table_versions.get(tables)
+            data = result_cache.get(key, versions)
+            if data is not None:
+                return pickle.loads(data)
+
+            with pin_to_primary():
+                result = func(*args, **kwargs)
+                # Serializar avalia QuerySets, ainda presos ao primário
+                data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            result_cache.set(key, versions, data)
+            return result
+
+        return wrapper
+
+    return decorator
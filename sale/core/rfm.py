@@ -0,0 +1,204 @@
+"""
+Segmentação RFM (recência, frequência, valor) dos clientes, em lote.
+
+1. Uma consulta agrupada por cliente traz, de todas as vendas ativas, a
+   data da última compra, o número de compras e o valor total, direto em
+   arrays de inteiros (core.fixed_point: valor em centavos).
+2. As três colunas viram arrays NumPy e recebem notas de 1 a 5 por quintil
+   (np.quantile + np.searchsorted), sem laço Python por cliente.
+3. O resultado volta ao banco por COPY numa tabela temporária e um único
+   INSERT ... ON CONFLICT DO UPDATE em customer_rfm; clientes sem compras
+   recebem o segmento "no_purchases" num INSERT ... SELECT.
+
+O CustomerViewSet filtra por segmento lendo customer_rfm, sem recalcular.
+"""
+
+import logging
+import time
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F, Max, Sum
+
+from core.fixed_point import MONEY_SCALE, fetch_arrays, scaled
+from core.functions import Epoch
+from core.models import CustomerRFM, Sale
+
+logger = logging.getLogger(__name__)
+
+# Limites dos quintis: nota 1 abaixo de 20%, ..., nota 5 acima de 80%
+QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+Segment = CustomerRFM.Segment
+
+
+def load_customer_metrics() -> dict[str, np.ndarray]:
+    """Carrega última compra, frequência e valor de cada cliente com compras.
+
+    Returns:
+        dict[str, np.ndarray]: Arrays alinhados 'customer' (ids),
+            'last_purchase' (epoch em segundos), 'frequency' e 'monetary'
+            (em centavos, int64).
+            Equivale a: SELECT s.id_customer, MAX(s.date), COUNT(DISTINCT s.id),
+                               SUM(si.quantity * si.sale_price)
+                        FROM sale s
+                        LEFT JOIN sale_item si ON si.id_sale = s.id
+                        WHERE s.active
+                        GROUP BY s.id_customer
+    """
+    metrics = fetch_arrays(
+        Sale.objects.using(DEFAULT_DB_ALIAS).filter(active=True).values("customer").order_by(),
+        customer=F("customer"),
+        # Microssegundos: o epoch em segundos tem fração
+        last_purchase=scaled(Epoch(Max("date")), 6),
+        frequency=Count("id", distinct=True),
+        monetary=scaled(
+            Sum(F("sale_items__quantity") * F("sale_items__sale_price")), MONEY_SCALE
+        ),
+    )
+    metrics["last_purchase"] = metrics["last_purchase"] / 1_000_000
+    return metrics
+
+
+def quantile_scores(values: np.ndarray) -> np.ndarray:
+    """Nota de 1 a 5 conforme o quintil de cada valor (maior valor, maior nota).
+
+    Args:
+        values: Array com uma métrica por cliente.
+
+    Returns:
+        np.ndarray: Array int16 com as notas, na mesma ordem.
+
+    Note:
+        Valores empatados no limite de um quintil ficam na nota de baixo:
+        se 70% dos clientes compraram uma única vez, todos eles ficam com
+        nota 1 de frequência, e não 4 ou 5.
+    """
+    if values.size == 0:
+        return np.empty(0, dtype=np.int16)
+    edges = np.quantile(values, QUANTILES)
+    return (np.searchsorted(edges, values, side="left") + 1).astype(np.int16)
+
+
+def segment_customers(recency: np.ndarray, frequency: np.ndarray) -> np.ndarray:
+    """Converte as notas de recência e frequência no segmento do cliente.
+
+    Returns:
+        np.ndarray: Array de strings com um valor de CustomerRFM.Segment.
+    """
+    conditions = [
+        (recency >= 4) & (frequency >= 4),
+        (recency >= 3) & (frequency >= 3),
+        (recency >= 4) & (frequency <= 2),
+        (recency <= 2) & (frequency >= 3),
+        (recency <= 2) & (frequency <= 2),
+    ]
+    choices = [
+        Segment.CHAMPIONS.value,
+        Segment.LOYAL.value,
+        Segment.NEW.value,
+        Segment.AT_RISK.value,
+        Segment.HIBERNATING.value,
+    ]
+    return np.select(conditions, choices, default=Segment.NEEDS_ATTENTION.value)
+
+
+def refresh_rfm() -> dict[str, int]:
+    """Recalcula e grava a segmentação RFM de todos os clientes.
+
+    Returns:
+        dict[str, int]: Quantidade de clientes por segmento.
+    """
+    started = time.perf_counter()
+    metrics = load_customer_metrics()
+    loaded = time.perf_counter()
+
+    recency = quantile_scores(metrics["last_purchase"])
+    frequency = quantile_scores(metrics["frequency"])
+    monetary = quantile_scores(metrics["monetary"])
+    segments = segment_customers(recency, frequency)
+    scored = time.perf_counter()
+
+    _write(metrics, recency, frequency, monetary, segments)
+    logger.info(
+        "RFM: %s clientes (leitura %.1fs, notas %.1fs, gravação %.1fs).",
+        metrics["customer"].size,
+        loaded - started,
+        scored - loaded,
+        time.perf_counter() - scored,
+    )
+
+    names, counts = np.unique(segments, return_counts=True)
+    summary = dict(zip(names.tolist(), counts.tolist()))
+    summary[Segment.NO_PURCHASES.value] = CustomerRFM.objects.using(DEFAULT_DB_ALIAS).filter(
+        segment=Segment.NO_PURCHASES,
+    ).count()
+    return summary
+
+
+def _write(metrics, recency, frequency, monetary, segments) -> None:
+    connection = connections[DEFAULT_DB_ALIAS]
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TEMP TABLE _customer_rfm (
+                id_customer bigint, last_purchase double precision, frequency integer,
+                monetary_cents bigint, recency_score smallint,
+                frequency_score smallint, monetary_score smallint, segment varchar(32)
+            ) ON COMMIT DROP
+            """
+        )
+        with cursor.cursor.copy("COPY _customer_rfm FROM STDIN") as copy:
+            for row in zip(
+                metrics["customer"].tolist(),
+                metrics["last_purchase"].tolist(),
+                metrics["frequency"].tolist(),
+                metrics["monetary"].tolist(),
+                recency.tolist(),
+                frequency.tolist(),
+                monetary.tolist(),
+                segments.tolist(),
+            ):
+                copy.write_row(row)
+        cursor.execute("ANALYZE _customer_rfm")
+
+        cursor.execute(
+            """
+            INSERT INTO customer_rfm
+                (id_customer, last_purchase, frequency, monetary, recency_score,
+                 frequency_score, monetary_score, segment, created_at, modified_at, active)
+            SELECT id_customer, to_timestamp(last_purchase), frequency,
+                   monetary_cents / 100.0, recency_score, frequency_score,
+                   monetary_score, segment, now(), now(), true
+            FROM _customer_rfm
+            ON CONFLICT (id_customer) DO UPDATE SET
+                last_purchase = EXCLUDED.last_purchase,
+                frequency = EXCLUDED.frequency,
+                monetary = EXCLUDED.monetary,
+                recency_score = EXCLUDED.recency_score,
+                frequency_score = EXCLUDED.frequency_score,
+                monetary_score = EXCLUDED.monetary_score,
+                segment = EXCLUDED.segment,
+                modified_at = now()
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO customer_rfm
+                (id_customer, last_purchase, frequency, monetary, recency_score,
+                 frequency_score, monetary_score, segment, created_at, modified_at, active)
+            SELECT c.id, NULL, 0, 0, 0, 0, 0, %s, now(), now(), true
+            FROM customer c
+            WHERE NOT EXISTS (SELECT 1 FROM _customer_rfm r WHERE r.id_customer = c.id)
+            ON CONFLICT (id_customer) DO UPDATE SET
+                last_purchase = NULL,
+                frequency = 0,
+                monetary = 0,
+                recency_score = 0,
+                frequency_score = 0,
+                monetary_score = 0,
+                segment = EXCLUDED.segment,
+                modified_at = now()
+            """,
+            [Segment.NO_PURCHASES.value],
+        )
@@ -0,0 +1,84 @@
+"""
+Busca textual (full-text search) com tsvector do PostgreSQL.
+
+Product, Customer, Supplier e Employee mantêm uma coluna gerada
+`search_vector` (to_tsvector na configuração `pt_unaccent`, ou seja,
+português sem acentos) indexada com GIN. Aqui montamos a tsquery com
+prefixo em cada termo, filtramos pelo índice e ordenamos por relevância.
+
+O ranking só é calculado sobre os primeiros MAX_RANKED registros que o
+índice devolver: um prefixo curto como 'a:*' casa com boa parte da tabela,
+e calcular ts_rank e ordenar milhões de linhas estoura o tempo de uma
+busca a cada tecla.
+"""
+
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, QuerySet
+
+from core.models import SEARCH_CONFIG
+
+# Palavras (letras/dígitos, inclusive acentuadas) do texto digitado
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Candidatos vindos do índice GIN que entram no ranking
+MAX_RANKED = getattr(settings, "SEARCH_MAX_RANKED", 1_000)
+
+
+def build_search_query(text: str) -> SearchQuery | None:
+    """Monta uma tsquery de prefixo a partir do texto digitado.
+
+    Args:
+        text: Texto livre digitado pelo usuário (ex: 'joão sil').
+
+    Returns:
+        SearchQuery | None: Query equivalente a to_tsquery('joão:* & sil:*'),
+            ou None se o texto não tiver nenhuma palavra.
+
+    Note:
+        Os termos são extraídos por regex, então operadores da sintaxe de
+        tsquery (&, |, !, :) digitados pelo usuário nunca chegam ao banco.
+    """
+    terms = _TERM_RE.findall(text)
+    if not terms:
+        return None
+
+    raw = " & ".join(f"{term}:*" for term in terms)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+def search(queryset: QuerySet, text: str) -> QuerySet:
+    """Filtra e ordena um QuerySet por relevância na busca textual.
+
+    Args:
+        queryset: QuerySet de um model com o campo `search_vector`.
+        text: Texto livre digitado pelo usuário.
+
+    Returns:
+        QuerySet: Registros que casam com todos os termos, anotados com `rank`
+            e ordenados do mais relevante para o menos relevante.
+            Equivale a: SELECT *, ts_rank(search_vector, q) AS rank
+                        FROM product
+                        WHERE id IN (
+                            SELECT id FROM product
+                            WHERE search_vector @@ q
+                            LIMIT MAX_RANKED
+                        )
+                        ORDER BY rank DESC, id
+
+    Note:
+        Com mais de MAX_RANKED registros casando, o ranking vale só entre os
+        candidatos lidos do índice, não entre todos os que casam.
+    """
+    query = build_search_query(text)
+    if query is None:
+        return queryset.none()
+
+    candidates = queryset.filter(search_vector=query).values("pk")[:MAX_RANKED]
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "id")
+    )
@@ -10,42 +10,50 @@ Usaremos os modelos do nosso projeto de vendas para exemplificar.
 =============================================================================
 """
 
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Any
 
+from django.db import connection
 from django.db.models import (
     Avg,
-    Case,
     Count,
     ExpressionWrapper,
     F,
-    IntegerField,
+    FilteredRelation,
     Max,
     Min,
     Q,
     QuerySet,
     Sum,
     Value,
-    When,
+    Window,
 )
-from django.db.models.fields import CharField
 from django.db.models.fields import DecimalField as DecimalFieldType
-from django.db.models.functions import ExtractYear
+from django.db.models.functions import Coalesce, PercentRank, Rank, RowNumber, TruncMonth
+from django.utils import timezone
 
+from core import batch, cube, distributions, sketches
+from core.db_router import replica_selector
+from core.functions import Age, age_band
 from core.models import (
     Branch,
+    CommissionStatement,
     Customer,
     Department,
     Employee,
     Product,
+    ProductAssociation,
     ProductGroup,
+    ProductPriceHistory,
     Sale,
     SaleItem,
     State,
     Supplier,
     Zone,
 )
+from core.periods import filter_days
+from core.result_cache import cached_selector
 
 
 # =============================================================================
@@ -336,8 +344,10 @@ def deactivate_all_products() -> int:
         update() atualiza TODOS os registros do QuerySet de uma vez.
         IMPORTANTE: update() NÃO chama o método save() do model.
         IMPORTANTE: update() NÃO dispara signals (pre_save, post_save).
+        Em tabelas grandes o UPDATE é feito em lotes por faixa de id, cada
+        lote na sua transação (ver core.batch).
     """
-    return Product.objects.all().update(active=False)
+    return batch.run_batch_update("deactivate_all_products")
 
 
 def update_product_group_commission(group_id: int, new_commission: Decimal) -> int:
@@ -350,9 +360,15 @@ def update_product_group_commission(group_id: int, new_commission: Decimal) -> i
     Returns:
         int: O número de linhas afetadas.
             Equivale a: UPDATE product_group SET commission_percentage = %s WHERE id = %s
+
+    Note:
+        Passa por core.batch como os demais UPDATEs em massa; como afeta uma
+        única linha, vira um único lote.
     """
-    return ProductGroup.objects.filter(id=group_id).update(
-        commission_percentage=new_commission,
+    return batch.run_batch_update(
+        "update_product_group_commission",
+        group_id=group_id,
+        new_commission=new_commission,
     )
 
 
@@ -393,10 +409,13 @@ def deactivate_customers_by_gender(gender: str) -> int:
         int: O número de linhas afetadas.
             Equivale a: UPDATE customer SET active = false WHERE gender = %s
 
+    Note:
+        Executado em lotes por faixa de id (ver core.batch).
+
     Example:
         deactivate_customers_by_gender('M') desativa todos os clientes masculinos.
     """
-    return Customer.objects.filter(gender=gender).update(active=False)
+    return batch.run_batch_update("deactivate_customers_by_gender", gender=gender)
 
 
 # =============================================================================
@@ -454,6 +473,7 @@ def delete_single_product(product_id: int) -> tuple:
 # =============================================================================
 # count() — Conta o número de registros
 # =============================================================================
+@cached_selector(Product)
 def count_all_products() -> int:
     """Conta o total de produtos.
 
@@ -1530,16 +1550,17 @@ def get_customers_by_city_name(city_name: str) -> QuerySet[Customer]:
     Returns:
         QuerySet[Customer]: QuerySet com clientes da cidade especificada.
             Equivale a: SELECT c.* FROM customer c
-                        JOIN district d ON c.id_district = d.id
-                        JOIN city ci ON d.id_city = ci.id
-                        WHERE LOWER(ci.name) LIKE LOWER('%city_name%')
+                        JOIN district_geo g ON g.id_district = c.id_district
+                        WHERE UPPER(g.city_name) LIKE UPPER('%city_name%')
 
     Note:
         Navega por MÚLTIPLOS relacionamentos: Customer -> District -> City.
-        Cada '__' navega para a próxima tabela.
+        Cada '__' navega para a próxima tabela. Aqui o caminho
+        district__city__name foi trocado por geo__city_name: district_geo
+        já guarda a hierarquia resolvida, então é um JOIN só.
     """
     return Customer.objects.filter(
-        district__city__name__icontains=city_name,
+        geo__city_name__icontains=city_name,
     )
 
 
@@ -1554,17 +1575,16 @@ def get_customers_by_state_abbreviation(
     Returns:
         QuerySet[Customer]: QuerySet com clientes do estado especificado.
             Equivale a: SELECT c.* FROM customer c
-                        JOIN district d ON c.id_district = d.id
-                        JOIN city ci ON d.id_city = ci.id
-                        JOIN state s ON ci.id_state = s.id
-                        WHERE s.abbreviation = %s
+                        JOIN district_geo g ON g.id_district = c.id_district
+                        WHERE g.state_abbreviation = %s
 
     Note:
         Navega por TRÊS relacionamentos: Customer -> District -> City -> State.
-        Django gera os JOINs automaticamente, não importa a profundidade.
+        Django gera os JOINs automaticamente, não importa a profundidade;
+        com geo__state_abbreviation, os três viram um JOIN com district_geo.
     """
     return Customer.objects.filter(
-        district__city__state__abbreviation=abbreviation,
+        geo__state_abbreviation=abbreviation,
     )
 
 
@@ -1577,15 +1597,14 @@ def get_employees_in_zone(zone_name: str) -> QuerySet[Employee]:
     Returns:
         QuerySet[Employee]: QuerySet com funcionários da zona especificada.
             Equivale a: SELECT e.* FROM employee e
-                        JOIN district d ON e.id_district = d.id
-                        JOIN zone z ON d.id_zone = z.id
-                        WHERE LOWER(z.name) LIKE LOWER('%zone_name%')
+                        JOIN district_geo g ON g.id_district = e.id_district
+                        WHERE UPPER(g.zone_name) LIKE UPPER('%zone_name%')
 
     Note:
-        Navega: Employee -> District -> Zone.
+        Navega: Employee -> District -> Zone, em um JOIN com district_geo.
     """
     return Employee.objects.filter(
-        district__zone__name__icontains=zone_name,
+        geo__zone_name__icontains=zone_name,
     )
 
 
@@ -1656,6 +1675,7 @@ def get_customer_bought(customer_id: int) -> QuerySet[Product]:
 # =============================================================================
 # Relacionamento Reverso (reverse relationships)
 # =============================================================================
+@replica_selector
 def get_sale_total(sale_id: int) -> Decimal:
     """Calcula o valor total de uma venda específica.
 
@@ -1676,6 +1696,7 @@ def get_sale_total(sale_id: int) -> Decimal:
     ).get("total") or Decimal("0.00")
 
 
+@replica_selector
 def get_branch_sales(branch_id: int) -> Decimal:
     """Busca vendas realizadas por uma filial específica.
 
@@ -1801,12 +1822,14 @@ def increase_all_salaries(percentage: Decimal) -> int:
         F() permite atualizar usando o valor ATUAL do campo.
         Tudo é feito no banco — NÃO precisa trazer para Python.
         IMPORTANTE: por usar F(), a operação é ATÔMICA — sem race conditions.
+        O UPDATE roda em lotes por faixa de id (ver core.batch); se for
+        interrompido, chamar de novo com o mesmo percentual continua de onde
+        parou, sem dar o aumento duas vezes.
 
     Example:
         increase_all_salaries(Decimal('10')) dá aumento de 10%.
     """
-    multiplier = 1 + percentage / 100
-    return Employee.objects.all().update(salary=F("salary") * multiplier)
+    return batch.run_batch_update("increase_all_salaries", percentage=percentage)
 
 
 def apply_discount_to_products(
@@ -1827,11 +1850,13 @@ def apply_discount_to_products(
     Note:
         F() garante que a operação é atômica — dois requests simultâneos
         NÃO vão sobrescrever o valor um do outro.
+        Executado em lotes por faixa de id (ver core.batch).
     """
-    multiplier = 1 - discount_percentage / 100
-    return Product.objects.filter(
-        product_group=group_id,
-    ).update(sale_price=F("sale_price") * multiplier)
+    return batch.run_batch_update(
+        "apply_discount_to_products",
+        discount_percentage=discount_percentage,
+        group_id=group_id,
+    )
 
 
 def get_products_expensive_for_group() -> QuerySet[Product]:
@@ -1906,8 +1931,12 @@ def get_products_where_commission_exceeds_cost() -> QuerySet[Product]:
 # Max: valor máximo
 # StdDev: desvio padrão
 # Variance: variância
+#
+# Os selectors de relatório abaixo usam @replica_selector (core.db_router):
+# leem de uma réplica quando houver, sem competir com as escritas do PDV.
 
 
+@replica_selector
 def get_total_employee_salary() -> dict:
     """Calcula o salário total de todos os funcionários.
 
@@ -1923,6 +1952,7 @@ def get_total_employee_salary() -> dict:
     return Employee.objects.aggregate(Sum("salary"))
 
 
+@replica_selector
 def get_total_salary_with_alias() -> dict:
     """Calcula o salário total com um nome de alias personalizado.
 
@@ -1937,6 +1967,8 @@ def get_total_salary_with_alias() -> dict:
     return Employee.objects.aggregate(total=Sum("salary"))
 
 
+@cached_selector(Product)
+@replica_selector
 def get_average_product_price() -> dict:
     """Calcula o preço médio de todos os produtos.
 
@@ -1951,6 +1983,7 @@ def get_average_product_price() -> dict:
     return Product.objects.aggregate(preco_medio=Avg("sale_price"))
 
 
+@replica_selector
 def get_salary_stats() -> dict:
     """Calcula estatísticas de salários de todos os funcionários.
 
@@ -1969,6 +2002,7 @@ def get_salary_stats() -> dict:
     )
 
 
+@replica_selector
 def get_customer_stats() -> dict:
     """Calcula estatísticas de clientes: total, renda média e renda máxima.
 
@@ -1988,6 +2022,7 @@ def get_customer_stats() -> dict:
     )
 
 
+@replica_selector
 def get_active_employee_salary_stats() -> dict:
     """Calcula estatísticas de salários de funcionários ativos.
 
@@ -2010,6 +2045,7 @@ def get_active_employee_salary_stats() -> dict:
     )
 
 
+@replica_selector
 def get_total_sale_items_value() -> dict:
     """Calcula a soma do preço de venda de todos os itens.
 
@@ -2023,6 +2059,7 @@ def get_total_sale_items_value() -> dict:
     return SaleItem.objects.aggregate(total=Sum("sale_price"))
 
 
+@replica_selector
 def get_product_price_stats_by_group(group_id: int) -> dict:
     """Calcula estatísticas de preços de produtos de um grupo específico.
 
@@ -2057,6 +2094,8 @@ def get_product_price_stats_by_group(group_id: int) -> dict:
 # annotate() adiciona um campo calculado a CADA registro do QuerySet.
 # O campo anotado pode ser usado em filter(), order_by(), values(), etc.
 # Diferente de aggregate() que retorna UM dicionário com totais.
+@cached_selector(Department, Employee)
+@replica_selector
 def get_departments_with_employee_count() -> QuerySet[Department]:
     """Retorna departamentos com contagem de funcionários de cada um.
 
@@ -2072,10 +2111,11 @@ def get_departments_with_employee_count() -> QuerySet[Department]:
         Acesse o valor com: department.total_employees
     """
     return Department.objects.annotate(
-        total_employees=Count("employee"),
+        total_employees=Count("employees"),
     )
 
 
+@replica_selector
 def get_product_groups_with_total_revenue() -> QuerySet[ProductGroup]:
     """Retorna grupos de produtos com receita total de cada um.
 
@@ -2095,6 +2135,7 @@ def get_product_groups_with_total_revenue() -> QuerySet[ProductGroup]:
     )
 
 
+@replica_selector
 def get_departments_ordered_by_employee_count() -> QuerySet[Department]:
     """Retorna departamentos ordenados por número de funcionários (decrescente).
 
@@ -2128,6 +2169,7 @@ def get_products_with_profit() -> QuerySet[Product]:
     )
 
 
+@replica_selector
 def get_departments_with_avg_salary() -> QuerySet[Department]:
     """Retorna departamentos com salário médio de seus funcionários.
 
@@ -2146,6 +2188,7 @@ def get_departments_with_avg_salary() -> QuerySet[Department]:
     )
 
 
+@replica_selector
 def get_product_groups_with_stats() -> QuerySet[ProductGroup]:
     """Retorna grupos de produtos com múltiplas estatísticas calculadas.
 
@@ -2169,6 +2212,7 @@ def get_product_groups_with_stats() -> QuerySet[ProductGroup]:
     )
 
 
+@replica_selector
 def get_top_departments_by_salary_budget(limit: int) -> QuerySet[Department]:
     """Retorna os departamentos com maior folha salarial total.
 
@@ -2435,6 +2479,8 @@ def get_products_with_renamed_fields() -> QuerySet[Product, dict[str, Any]]:
 
 
 # Total de produtos por grupo
+@cached_selector(Product, ProductGroup)
+@replica_selector
 def get_product_count_by_group() -> QuerySet[Product, dict[str, Any]]:
     """Retorna o total de produtos por grupo.
 
@@ -2459,6 +2505,7 @@ def get_product_count_by_group() -> QuerySet[Product, dict[str, Any]]:
     )
 
 
+@replica_selector
 def get_product_stats_by_group() -> QuerySet[Product, dict[str, Any]]:
     """Retorna estatísticas de produtos por grupo.
 
@@ -2556,21 +2603,11 @@ def categorize_employee_age(employee_id: int) -> str:
         Employee.objects.filter(id=employee_id)
         .annotate(
             # Calcular idade (não podemos usar property diretamente)
-            # Usamos a lógica no banco de dados
-            current_year=Value(date.today().year, output_field=IntegerField()),
-            birth_year=ExtractYear("birth_date"),
-            calculated_age=F("current_year") - F("birth_year"),
+            # Usamos a lógica no banco de dados: age() do PostgreSQL já
+            # considera se o aniversário deste ano passou
+            calculated_age=Age("birth_date"),
             # Categorizar por faixa etária
-            age_category=Case(
-                When(calculated_age__lt=18, then=Value("Menor de Idade")),
-                When(calculated_age__lt=25, then=Value("Jovem (18-24)")),
-                When(calculated_age__lt=35, then=Value("Adulto Jovem (25-34)")),
-                When(calculated_age__lt=50, then=Value("Adulto (35-49)")),
-                When(calculated_age__lt=60, then=Value("Adulto Maduro (50-59)")),
-                When(calculated_age__gte=60, then=Value("Sênior (60+)")),
-                default=Value("Não Informado"),
-                output_field=CharField(),
-            ),
+            age_category=age_band("calculated_age"),
         )
         .first()
     )
@@ -2578,6 +2615,820 @@ def categorize_employee_age(employee_id: int) -> str:
     return employee.age_category if employee else "Funcionário não encontrado"
 
 
+def get_employees_with_age() -> QuerySet[Employee]:
+    """Retorna funcionários com a idade exata calculada no banco.
+
+    Returns:
+        QuerySet[Employee]: QuerySet com o campo anotado 'age_years'.
+            Equivale a: SELECT *, EXTRACT(YEAR FROM age(CURRENT_DATE, birth_date)) AS age_years
+                        FROM employee
+
+    Note:
+        A property Employee.age devolve a anotação 'age_years' quando ela
+        existe, então listar funcionários não precisa mais de nenhum loop em Python.
+    """
+    return Employee.objects.annotate(age_years=Age("birth_date"))
+
+
+@replica_selector
+def get_employee_age_histogram(group_by: str) -> QuerySet[Employee, dict[str, Any]]:
+    """Conta funcionários por faixa etária, agrupados por um segundo campo.
+
+    Args:
+        group_by: 'department', 'district' ou 'gender'.
+
+    Returns:
+        QuerySet[Employee, dict[str, Any]]: Uma linha por (grupo, faixa etária).
+            Equivale a: SELECT d.name AS group_name,
+                               CASE WHEN age(...) >= 60 THEN 'Sênior (60+)' ... END AS age_band,
+                               COUNT(e.id) AS total
+                        FROM employee e
+                        JOIN department d ON e.id_department = d.id
+                        GROUP BY d.name, age_band
+
+    Examples:
+        get_employee_age_histogram('department') retorna:
+        [
+            {'group_name': 'RH', 'age_band': 'Adulto (35-49)', 'total': 12},
+            {'group_name': 'RH', 'age_band': 'Adulto Jovem (25-34)', 'total': 7},
+            ...
+        ]
+    """
+    group_field = {
+        "department": "department__name",
+        "district": "district__name",
+        "gender": "gender",
+    }[group_by]
+
+    return (
+        Employee.objects.annotate(age_years=Age("birth_date"))
+        .annotate(
+            group_name=F(group_field),
+            age_band=age_band("age_years"),
+        )
+        .values("group_name", "age_band")
+        .annotate(total=Count("id"))
+        .order_by("group_name", "age_band")
+    )
+
+
+# =============================================================================
+# Window functions — ranking dentro de cada grupo (top-N por grupo)
+# =============================================================================
+# Window(...) calcula um valor por linha olhando as linhas da mesma partição
+# (PARTITION BY), sem colapsar o resultado como o GROUP BY. Filtrar pela
+# posição (position__lte) faz o Django envolver a consulta num subselect, e o
+# "top N de cada grupo" sai numa única query, em vez de uma por grupo.
+#   RowNumber()   -> 1, 2, 3, 4 (empates recebem posições diferentes)
+#   Rank()        -> 1, 2, 2, 4 (empates dividem a posição)
+#   PercentRank() -> (rank - 1) / (linhas da partição - 1), de 0 a 1
+def _sale_item_revenue() -> ExpressionWrapper:
+    return ExpressionWrapper(
+        F("quantity") * F("sale_price"),
+        output_field=DecimalFieldType(max_digits=18, decimal_places=2),
+    )
+
+
+@replica_selector
+def get_top_products_by_branch(
+    limit: int,
+    start: date | None = None,
+    end: date | None = None,
+) -> QuerySet[SaleItem, dict[str, Any]]:
+    """Retorna os N produtos mais vendidos (em valor) de cada filial.
+
+    Args:
+        limit: Quantidade de produtos por filial.
+        start: Primeiro dia do período (opcional).
+        end: Último dia do período (opcional).
+
+    Returns:
+        QuerySet[SaleItem, dict[str, Any]]: Uma linha por (filial, produto).
+            Equivale a: SELECT * FROM (
+                            SELECT s.id_branch, si.id_product, SUM(si.quantity * si.sale_price) AS revenue,
+                                   ROW_NUMBER() OVER (
+                                       PARTITION BY s.id_branch
+                                       ORDER BY SUM(si.quantity * si.sale_price) DESC, si.id_product
+                                   ) AS position
+                            FROM sale_item si
+                            JOIN sale s ON s.id = si.id_sale
+                            WHERE s.date >= %s AND s.date < %s
+                            GROUP BY s.id_branch, si.id_product
+                        ) t
+                        WHERE position <= %s
+
+    Note:
+        O índice idx_sale_item_sale_covering (id_sale INCLUDE id_product,
+        quantity, sale_price) deixa a junção com as vendas do período só no
+        índice, sem visitar a tabela sale_item.
+    """
+    queryset = filter_days(
+        SaleItem.objects.filter(sale__active=True, active=True), "sale__date", start, end
+    )
+
+    return (
+        queryset.values(
+            "sale__branch",
+            "product",
+            branch_name=F("sale__branch__name"),
+            product_name=F("product__name"),
+        )
+        .annotate(
+            revenue=Sum(_sale_item_revenue()),
+            quantity_sold=Sum("quantity"),
+        )
+        # A janela vem num annotate() separado, depois dos agregados: no
+        # mesmo annotate() o Django a colocaria no GROUP BY
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("sale__branch"),
+                order_by=[F("revenue").desc(), F("product").asc()],
+            ),
+        )
+        .filter(position__lte=limit)
+        .order_by("sale__branch", "position")
+    )
+
+
+@replica_selector
+def get_top_products_by_month(limit: int, year: int) -> QuerySet[SaleItem, dict[str, Any]]:
+    """Retorna os N produtos mais vendidos (em valor) de cada mês de um ano.
+
+    Args:
+        limit: Quantidade de produtos por mês.
+        year: Ano das vendas.
+
+    Returns:
+        QuerySet[SaleItem, dict[str, Any]]: Uma linha por (mês, produto).
+            Equivale a: SELECT * FROM (
+                            SELECT date_trunc('month', s.date) AS month, si.id_product,
+                                   SUM(si.quantity * si.sale_price) AS revenue,
+                                   ROW_NUMBER() OVER (
+                                       PARTITION BY date_trunc('month', s.date)
+                                       ORDER BY SUM(si.quantity * si.sale_price) DESC, si.id_product
+                                   ) AS position
+                            FROM sale_item si
+                            JOIN sale s ON s.id = si.id_sale
+                            WHERE s.date >= '2025-01-01' AND s.date < '2026-01-01'
+                            GROUP BY 1, si.id_product
+                        ) t
+                        WHERE position <= %s
+
+    Note:
+        O filtro do ano usa um intervalo em s.date (e não EXTRACT(YEAR ...)),
+        então o índice idx_sale_date delimita as vendas lidas.
+    """
+    return (
+        SaleItem.objects.filter(
+            sale__active=True,
+            active=True,
+            sale__date__gte=datetime(year, 1, 1, tzinfo=timezone.get_current_timezone()),
+            sale__date__lt=datetime(year + 1, 1, 1, tzinfo=timezone.get_current_timezone()),
+        )
+        .annotate(month=TruncMonth("sale__date"))
+        .values("month", "product", product_name=F("product__name"))
+        .annotate(
+            revenue=Sum(_sale_item_revenue()),
+            quantity_sold=Sum("quantity"),
+        )
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("month"),
+                order_by=[F("revenue").desc(), F("product").asc()],
+            ),
+        )
+        .filter(position__lte=limit)
+        .order_by("month", "position")
+    )
+
+
+@replica_selector
+def get_top_employees_by_department(limit: int) -> QuerySet[Employee, dict[str, Any]]:
+    """Retorna os N funcionários de maior salário de cada departamento.
+
+    Args:
+        limit: Posição máxima no departamento.
+
+    Returns:
+        QuerySet[Employee, dict[str, Any]]: Funcionários com 'position' (RANK:
+            salários iguais dividem a posição, então um departamento pode
+            trazer mais de N linhas) e 'percent_rank' (0 = maior salário).
+            Equivale a: SELECT * FROM (
+                            SELECT e.id, e.name, e.id_department, e.salary,
+                                   RANK() OVER w AS position,
+                                   PERCENT_RANK() OVER w AS percent_rank
+                            FROM employee e
+                            WHERE e.active
+                            WINDOW w AS (PARTITION BY e.id_department ORDER BY e.salary DESC)
+                        ) t
+                        WHERE position <= %s
+
+    Note:
+        O índice idx_employee_department_salary (id_department, salary DESC)
+        já entrega as linhas na ordem da janela, sem o Sort do plano.
+    """
+    window = {
+        "partition_by": F("department"),
+        "order_by": F("salary").desc(),
+    }
+    return (
+        Employee.objects.filter(active=True)
+        .values("id", "name", "department", "salary")
+        .annotate(
+            department_name=F("department__name"),
+            position=Window(Rank(), **window),
+            percent_rank=Window(PercentRank(), **window),
+        )
+        .filter(position__lte=limit)
+        .order_by("department", "position", "id")
+    )
+
+
+@replica_selector
+def get_products_margin_rank_by_group(limit: int) -> QuerySet[Product, dict[str, Any]]:
+    """Retorna os N produtos de maior margem de cada grupo de produtos.
+
+    Args:
+        limit: Posição máxima no grupo.
+
+    Returns:
+        QuerySet[Product, dict[str, Any]]: Produtos com 'margin_pct',
+            'position' (RANK) e 'percent_rank' dentro do grupo.
+            Equivale a: SELECT * FROM (
+                            SELECT p.id, p.name, p.id_product_group,
+                                   (p.sale_price - p.cost_price) / p.cost_price * 100 AS margin_pct,
+                                   RANK() OVER w AS position,
+                                   PERCENT_RANK() OVER w AS percent_rank
+                            FROM product p
+                            WHERE p.active AND p.cost_price > 0
+                            WINDOW w AS (PARTITION BY p.id_product_group ORDER BY margin_pct DESC)
+                        ) t
+                        WHERE position <= %s
+
+    Note:
+        Substitui ordenar em Python o resultado de
+        get_products_with_high_margin_ordered() para separar por grupo.
+    """
+    margin = ExpressionWrapper(
+        (F("sale_price") - F("cost_price")) / F("cost_price") * 100,
+        output_field=DecimalFieldType(max_digits=10, decimal_places=2),
+    )
+    window = {
+        "partition_by": F("product_group"),
+        "order_by": margin.desc(),
+    }
+    return (
+        Product.objects.filter(active=True, cost_price__gt=0)
+        .values("id", "name", "product_group")
+        .annotate(
+            product_group_name=F("product_group__name"),
+            margin_pct=margin,
+            position=Window(Rank(), **window),
+            percent_rank=Window(PercentRank(), **window),
+        )
+        .filter(position__lte=limit)
+        .order_by("product_group", "position", "id")
+    )
+
+
+# =============================================================================
+# Percentis e distribuição — mediana, p90/p99 e histograma
+# =============================================================================
+# Complementa get_salary_stats()/get_customer_stats(): soma e média escondem
+# a assimetria de salário, renda e valor das vendas. Ver core.distributions.
+@replica_selector
+def get_salary_distribution(buckets: int = 10) -> dict[str, Any]:
+    """Retorna a distribuição dos salários dos funcionários ativos.
+
+    Args:
+        buckets: Quantidade de faixas do histograma.
+
+    Returns:
+        dict[str, Any]: count, min, max, avg, p50, p90, p99 e histogram.
+            Retorna: {'count': 120, 'min': Decimal('1500.00'), ..., 'p50': 3200.0,
+                      'histogram': [{'bucket': 1, 'lower': 1500.0, 'upper': 2850.0,
+                                     'total': 31}, ...]}
+
+    Note:
+        percentile_cont e width_bucket calculam tudo no banco, em duas
+        consultas, sem trazer os salários para o Python.
+    """
+    return distributions.exact_distribution(
+        Employee.objects.filter(active=True), "salary", buckets
+    )
+
+
+@replica_selector
+def get_income_distribution(buckets: int = 10) -> dict[str, Any]:
+    """Retorna a distribuição da renda dos clientes ativos.
+
+    Args:
+        buckets: Quantidade de faixas do histograma.
+
+    Returns:
+        dict[str, Any]: Mesmo formato de get_salary_distribution().
+    """
+    return distributions.exact_distribution(
+        Customer.objects.filter(active=True), "income", buckets
+    )
+
+
+@replica_selector
+def get_basket_value_distribution(
+    start: date | None = None,
+    end: date | None = None,
+    buckets: int = 10,
+    approximate: bool = False,
+) -> dict[str, Any]:
+    """Retorna a distribuição do valor das vendas (soma dos itens de cada venda).
+
+    Args:
+        start: Primeiro dia do período (opcional).
+        end: Último dia do período (opcional).
+        buckets: Quantidade de faixas do histograma.
+        approximate: Lê os sketches diários em vez dos itens de venda.
+
+    Returns:
+        dict[str, Any]: Mesmo formato de get_salary_distribution(), com
+            'approximate' indicando de onde veio o resultado.
+
+    Note:
+        O modo exato lê todos os itens do período; o aproximado lê uma linha
+        de basket_value_sketch por dia (erro relativo de até 1% nos quantis)
+        e responde em milissegundos mesmo com dezenas de milhões de itens.
+    """
+    if approximate:
+        return distributions.approximate_basket_distribution(start, end, buckets)
+    return distributions.exact_basket_distribution(start, end, buckets)
+
+
+# =============================================================================
+# Rollup geográfico — vendas e clientes por zona, estado, cidade ou bairro
+# =============================================================================
+# district_geo (migration 0013) guarda a hierarquia de cada bairro já
+# resolvida; o campo virtual `geo` de Customer/Employee/Branch chega nela com
+# um JOIN pelo id_district, em vez de district -> city -> state.
+REGION_LEVELS = ["zone", "state", "city", "district"]
+
+
+@replica_selector
+def get_region_rollup(
+    level: str,
+    start: date | None = None,
+    end: date | None = None,
+) -> list[dict[str, Any]]:
+    """Retorna faturamento, vendas e clientes de cada região de um nível.
+
+    Args:
+        level: 'zone', 'state', 'city' ou 'district'.
+        start: Primeiro dia das vendas (opcional).
+        end: Último dia das vendas (opcional).
+
+    Returns:
+        list[dict[str, Any]]: Uma linha por região, da que mais faturou para a
+            que menos. O faturamento é atribuído à região da filial da venda;
+            os clientes (distintos, que compraram no período), à região onde
+            moram.
+            Equivale a: SELECT g.id_state, g.state_name, SUM(si.quantity * si.sale_price),
+                               COUNT(DISTINCT s.id)
+                        FROM sale_item si
+                        JOIN sale s ON s.id = si.id_sale
+                        JOIN branch b ON b.id = s.id_branch
+                        JOIN district_geo g ON g.id_district = b.id_district
+                        WHERE s.date >= %s AND s.date < %s
+                        GROUP BY g.id_state, g.state_name;
+                        SELECT g.id_state, g.state_name, COUNT(DISTINCT s.id_customer)
+                        FROM sale s
+                        JOIN customer c ON c.id = s.id_customer
+                        JOIN district_geo g ON g.id_district = c.id_district
+                        WHERE s.date >= %s AND s.date < %s
+                        GROUP BY g.id_state, g.state_name
+
+    Example:
+        get_region_rollup('state') retorna:
+        [
+            {'region': 1, 'region_name': 'São Paulo', 'revenue': Decimal('35210.40'),
+             'sales': 30, 'customers': 3},
+            ...
+        ]
+    """
+    if level not in REGION_LEVELS:
+        raise ValueError(f"Nível inválido: {level}")
+
+    sale_items = filter_days(
+        SaleItem.objects.filter(active=True, sale__active=True), "sale__date", start, end
+    )
+
+    regions: dict[int, dict[str, Any]] = {}
+    sales = (
+        sale_items.values(
+            region=F(f"sale__branch__geo__{level}"),
+            region_name=F(f"sale__branch__geo__{level}_name"),
+        )
+        .annotate(
+            revenue=Sum(_sale_item_revenue()),
+            sales=Count("sale", distinct=True),
+        )
+        .order_by()
+    )
+    for row in sales:
+        regions[row["region"]] = {**row, "customers": 0}
+
+    customers = (
+        filter_days(Sale.objects.filter(active=True), "date", start, end)
+        .values(
+            region=F(f"customer__geo__{level}"),
+            region_name=F(f"customer__geo__{level}_name"),
+        )
+        .annotate(customers=Count("customer", distinct=True))
+        .order_by()
+    )
+    for row in customers:
+        region = regions.setdefault(
+            row["region"],
+            {
+                "region": row["region"],
+                "region_name": row["region_name"],
+                "revenue": Decimal(0),
+                "sales": 0,
+            },
+        )
+        region["customers"] = row["customers"]
+
+    return sorted(
+        regions.values(), key=lambda row: (-(row["revenue"] or 0), row["region_name"])
+    )
+
+
+# =============================================================================
+# Cubo de vendas — cortes ad-hoc de sale_item por dimensão
+# =============================================================================
+# Com SALES_CUBE_ENABLED, core.cube mantém sale_item em arrays NumPy por
+# worker e agrupa em memória; sem ele, a mesma consulta vai ao banco.
+@replica_selector
+def get_sales_cube(
+    group_by: list[str],
+    start: date | None = None,
+    end: date | None = None,
+    filters: dict[str, list] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Retorna faturamento, quantidade e itens vendidos por combinação de dimensões.
+
+    Args:
+        group_by: Dimensões de cube.DIMENSIONS ('product_group', 'branch',
+            'employee', 'gender', 'month'); vazio = total geral.
+        start: Primeiro dia do período (opcional).
+        end: Último dia do período (opcional).
+        filters: Valores aceitos por dimensão (opcional).
+        limit: Quantidade máxima de grupos (opcional).
+
+    Returns:
+        list[dict[str, Any]]: Do maior faturamento para o menor.
+            Equivale a: SELECT p.id_product_group, DATE_TRUNC('month', s.date) AS month,
+                               SUM(si.quantity * si.sale_price) AS revenue,
+                               SUM(si.quantity) AS quantity, COUNT(si.id) AS items
+                        FROM sale_item si
+                        JOIN sale s ON s.id = si.id_sale
+                        JOIN product p ON p.id = si.id_product
+                        WHERE si.active AND s.active
+                        GROUP BY 1, 2
+                        ORDER BY revenue DESC
+
+    Example:
+        get_sales_cube(["branch", "month"], filters={"gender": ["F"]}) retorna:
+        [
+            {'branch': 1, 'month': date(2026, 9, 1), 'revenue': Decimal('1520.40'),
+             'quantity': Decimal('37.000'), 'items': 12},
+            ...
+        ]
+    """
+    return cube.query(group_by, start, end, filters, limit)
+
+
+# =============================================================================
+# Sketches por filial e dia — clientes distintos e produtos mais vendidos
+# =============================================================================
+# Respostas aproximadas, em tempo constante em relação ao volume de vendas:
+# combinam uma linha de branch_day_sketch por filial e dia do período.
+# Ver core.sketches para os limites de erro.
+@replica_selector
+def get_distinct_customers_estimate(
+    start: date | None = None,
+    end: date | None = None,
+    branches: list[int] | None = None,
+) -> dict[str, Any]:
+    """Retorna a quantidade estimada de clientes distintos que compraram.
+
+    Args:
+        start: Primeiro dia do período (opcional).
+        end: Último dia do período (opcional).
+        branches: Filiais consideradas (opcional; padrão, todas).
+
+    Returns:
+        dict[str, Any]: 'customers' (estimativa), 'relative_error' (erro
+            padrão relativo), 'sales' e 'sketches' (linhas combinadas).
+            Equivale a: SELECT COUNT(DISTINCT id_customer)
+                        FROM sale
+                        WHERE active AND id_branch IN (...)
+                          AND date >= %s AND date < %s
+
+    Example:
+        get_distinct_customers_estimate(date(2026, 7, 1), date(2026, 9, 30), [1]) retorna:
+        {'customers': 1834, 'relative_error': 0.0163, 'sales': 5210, 'sketches': 92}
+    """
+    return sketches.estimate_distinct_customers(start, end, branches)
+
+
+@replica_selector
+def get_top_products_estimate(
+    start: date | None = None,
+    end: date | None = None,
+    branches: list[int] | None = None,
+    limit: int = 20,
+) -> dict[str, Any]:
+    """Retorna os produtos mais vendidos (em quantidade), estimados pelos sketches.
+
+    Args:
+        start: Primeiro dia do período (opcional).
+        end: Último dia do período (opcional).
+        branches: Filiais consideradas (opcional; padrão, todas).
+        limit: Quantidade de produtos.
+
+    Returns:
+        dict[str, Any]: 'products' (product, product_name, quantity), do mais
+            vendido para o menos; 'total_quantity' do período e
+            'max_overestimate', quanto cada quantidade pode passar da real
+            com probabilidade 'confidence'.
+            Equivale a: SELECT si.id_product, SUM(si.quantity)
+                        FROM sale_item si
+                        JOIN sale s ON s.id = si.id_sale
+                        WHERE si.active AND s.active
+                          AND s.date >= %s AND s.date < %s
+                        GROUP BY si.id_product
+                        ORDER BY 2 DESC
+                        LIMIT 20
+
+    Note:
+        As quantidades nunca ficam abaixo das reais. Só concorrem produtos
+        que estiveram entre os mais vendidos de alguma filial em algum dia.
+    """
+    return sketches.estimate_top_products(start, end, branches, limit)
+
+
+# =============================================================================
+# Histórico de preços — preço vigente numa data ("as-of")
+# =============================================================================
+# product_price_history guarda um intervalo [valid_from, valid_to) por preço
+# de cada produto; valid_to nulo é o preço atual. Os triggers da migration
+# 0006 gravam o histórico em toda alteração de preço, inclusive update().
+def _price_in_effect(prefix: str, moment: str) -> Q:
+    """Condição "o intervalo de preço contém o instante `moment`"."""
+    return Q(**{f"{prefix}valid_from__lte": F(moment)}) & (
+        Q(**{f"{prefix}valid_to__isnull": True})
+        | Q(**{f"{prefix}valid_to__gt": F(moment)})
+    )
+
+
+def get_product_price_as_of(product_id: int, moment: datetime) -> ProductPriceHistory | None:
+    """Retorna o preço de um produto vigente num instante.
+
+    Args:
+        product_id: O ID do produto.
+        moment: O instante desejado (ex: a data de uma venda).
+
+    Returns:
+        ProductPriceHistory | None: Linha do histórico com cost_price e sale_price,
+            ou None se o produto não tinha preço registrado naquele instante.
+            Equivale a: SELECT * FROM product_price_history
+                        WHERE id_product = %s AND valid_from <= %s
+                        ORDER BY valid_from DESC LIMIT 1
+
+    Note:
+        Uma única descida no índice idx_price_history_asof (id_product, valid_from DESC).
+    """
+    return (
+        ProductPriceHistory.objects.filter(product=product_id, valid_from__lte=moment)
+        .filter(Q(valid_to__isnull=True) | Q(valid_to__gt=moment))
+        .order_by("-valid_from")
+        .first()
+    )
+
+
+def get_sale_items_with_historical_prices(
+    queryset: QuerySet[SaleItem] | None = None,
+) -> QuerySet[SaleItem]:
+    """Anota cada item de venda com o preço e o custo vigentes na data da venda.
+
+    Args:
+        queryset: Itens a anotar (padrão: todos).
+
+    Returns:
+        QuerySet[SaleItem]: Itens com os campos 'historical_sale_price' e
+            'historical_cost_price' (None se não havia preço registrado).
+            Equivale a: SELECT si.*, h.sale_price, h.cost_price
+                        FROM sale_item si
+                        JOIN sale s ON s.id = si.id_sale
+                        LEFT JOIN product_price_history h
+                          ON h.id_product = si.id_product
+                         AND h.valid_from <= s.date
+                         AND (h.valid_to IS NULL OR h.valid_to > s.date)
+
+    Note:
+        Um único JOIN para todos os itens, resolvido pelo banco em lote
+        (hash/merge join), e não uma consulta por item.
+    """
+    if queryset is None:
+        queryset = SaleItem.objects.all()
+
+    return queryset.annotate(
+        price_as_of=FilteredRelation(
+            "product__price_history",
+            condition=_price_in_effect("product__price_history__", "sale__date"),
+        ),
+    ).annotate(
+        historical_sale_price=F("price_as_of__sale_price"),
+        historical_cost_price=F("price_as_of__cost_price"),
+    )
+
+
+def get_prices_as_of(
+    lookups: list[tuple[int, datetime]],
+) -> dict[tuple[int, datetime], tuple[Decimal, Decimal]]:
+    """Resolve, numa única consulta, o preço vigente de vários (produto, instante).
+
+    Args:
+        lookups: Pares (product_id, instante).
+
+    Returns:
+        dict[tuple[int, datetime], tuple[Decimal, Decimal]]: Para cada par com
+            preço registrado, a tupla (cost_price, sale_price).
+            Equivale a: SELECT q.id_product, q.moment, h.cost_price, h.sale_price
+                        FROM unnest(%s::bigint[], %s::timestamptz[]) AS q(id_product, moment)
+                        CROSS JOIN LATERAL (
+                            SELECT cost_price, sale_price FROM product_price_history
+                            WHERE id_product = q.id_product AND valid_from <= q.moment
+                            ORDER BY valid_from DESC LIMIT 1
+                        ) h
+
+    Example:
+        get_prices_as_of([(1, venda.date), (2, venda.date)])
+    """
+    if not lookups:
+        return {}
+
+    product_ids = [product_id for product_id, _ in lookups]
+    moments = [moment for _, moment in lookups]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT q.id_product, q.moment, h.cost_price, h.sale_price
+            FROM unnest(%s::bigint[], %s::timestamptz[]) AS q(id_product, moment)
+            CROSS JOIN LATERAL (
+                SELECT cost_price, sale_price, valid_to
+                FROM product_price_history
+                WHERE id_product = q.id_product AND valid_from <= q.moment
+                ORDER BY valid_from DESC
+                LIMIT 1
+            ) h
+            WHERE h.valid_to IS NULL OR h.valid_to > q.moment
+            """,
+            [product_ids, moments],
+        )
+        return {
+            (product_id, moment): (cost_price, sale_price)
+            for product_id, moment, cost_price, sale_price in cursor.fetchall()
+        }
+
+
+def get_missing_sale_item_prices_report() -> dict[str, Any]:
+    """Resume os itens de venda sem preço e quanto o histórico consegue preencher.
+
+    Returns:
+        dict[str, Any]: {'missing': itens com sale_price nulo,
+            'resolvable': quantos têm preço vigente na data da venda,
+            'unresolvable': quantos não têm (venda anterior ao histórico),
+            'revenue': faturamento que passa a ser contado depois do backfill}.
+
+    Note:
+        Usado pelo --dry-run do comando backfill_sale_item_prices.
+    """
+    result = get_sale_items_with_historical_prices(
+        get_sale_items_without_price(),
+    ).aggregate(
+        missing=Count("id"),
+        resolvable=Count("historical_sale_price"),
+        revenue=Sum(
+            F("quantity") * F("historical_sale_price"),
+            output_field=DecimalFieldType(),
+        ),
+    )
+    result["unresolvable"] = result["missing"] - result["resolvable"]
+    return result
+
+
+@replica_selector
+def get_related_products(product_id: int, limit: int = 10) -> QuerySet[ProductAssociation, dict[str, Any]]:
+    """Retorna os produtos mais comprados junto com um produto.
+
+    Args:
+        product_id: O ID do produto.
+        limit: Quantidade máxima de produtos.
+
+    Returns:
+        QuerySet[ProductAssociation, dict[str, Any]]: Vizinhos já calculados
+            por core.associations, do mais forte para o mais fraco.
+            Equivale a: SELECT pa.id_related_product, p.name, pa.confidence, pa.lift
+                        FROM product_association pa
+                        JOIN product p ON p.id = pa.id_related_product
+                        WHERE pa.id_product = %s
+                        ORDER BY pa.rank
+                        LIMIT %s
+
+    Note:
+        Lê o top-K gravado pelo comando build_product_associations pelo índice
+        (id_product, rank): custa O(K), sem tocar em sale_item.
+    """
+    return (
+        ProductAssociation.objects.filter(product=product_id)
+        .order_by("rank")
+        .values(
+            "related_product",
+            "co_count",
+            "support",
+            "confidence",
+            "lift",
+            name=F("related_product__name"),
+        )[:limit]
+    )
+
+
+@replica_selector
+def get_commission_statements(period: date) -> QuerySet[CommissionStatement, dict[str, Any]]:
+    """Retorna o extrato de comissões de um mês, já calculado.
+
+    Args:
+        period: Qualquer dia do mês desejado.
+
+    Returns:
+        QuerySet[CommissionStatement, dict[str, Any]]: Uma linha por funcionário,
+            da maior comissão para a menor.
+            Equivale a: SELECT e.name, cs.items, cs.total_sales, cs.commission
+                        FROM commission_statement cs
+                        JOIN employee e ON e.id = cs.id_employee
+                        WHERE cs.period = %s
+                        ORDER BY cs.commission DESC
+
+    Note:
+        Os valores são gravados por core.commissions (comando compute_commissions);
+        aqui só se lê a tabela materializada.
+    """
+    return (
+        CommissionStatement.objects.filter(period=period.replace(day=1))
+        .values(
+            "employee",
+            "period",
+            "items",
+            "total_sales",
+            "commission",
+            employee_name=F("employee__name"),
+        )
+        .order_by("-commission", "employee")
+    )
+
+
+@replica_selector
+def get_sales_margin_as_of() -> dict[str, Decimal | None]:
+    """Calcula faturamento, custo e margem com os preços da data de cada venda.
+
+    Returns:
+        dict[str, Decimal | None]: {'revenue': ..., 'cost': ..., 'margin': ...}.
+            O faturamento usa o preço gravado no item e, se ele for nulo, o
+            preço de tabela vigente na data da venda.
+
+    Example:
+        get_sales_margin_as_of() retorna:
+        {'revenue': Decimal('1500.00'), 'cost': Decimal('900.00'), 'margin': Decimal('600.00')}
+    """
+    result = get_sale_items_with_historical_prices().aggregate(
+        revenue=Sum(
+            F("quantity") * Coalesce("sale_price", "historical_sale_price"),
+            output_field=DecimalFieldType(),
+        ),
+        cost=Sum(
+            F("quantity") * F("historical_cost_price"),
+            output_field=DecimalFieldType(),
+        ),
+    )
+    if result["revenue"] is None or result["cost"] is None:
+        result["margin"] = None
+    else:
+        result["margin"] = result["revenue"] - result["cost"]
+    return result
+
+
 # =============================================================================
 # Exercício 1
 # =============================================================================
@@ -1,89 +1,175 @@
+import re
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
 from rest_framework import serializers
 
 from core import models
-
-
-class ProductGroupSerializer(serializers.ModelSerializer):
+from core.dimensions import dimension_cache
+
+# SQLSTATE do PostgreSQL para FK apontando para linha inexistente
+_FOREIGN_KEY_VIOLATION = "23503"
+
+# DETAIL da violação: Key (id_branch)=(42) is not present in table "branch".
+_FOREIGN_KEY_DETAIL = re.compile(
+    r"Key \((?P<column>[^)]+)\)=\((?P<value>[^)]*)\) is not present in table"
+)
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """FK por id que, nas dimensões pequenas, valida pelo cache em memória.
+
+    Ids que não estão no cache (criados há menos de
+    DIMENSION_CACHE_CHECK_INTERVAL segundos) e querysets filtrados caem na
+    consulta normal do PrimaryKeyRelatedField. O contrário (linha apagada há
+    pouco, ainda no cache) passa na validação e é barrado pela FK no save:
+    ver `ModelSerializer`.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        if (
+            dimension_cache.handles(queryset.model)
+            and not queryset.query.has_filters()
+            and not isinstance(data, bool)
+        ):
+            try:
+                instance = dimension_cache.instance(queryset.model, int(data))
+            except (TypeError, ValueError):
+                instance = None
+            if instance is not None:
+                return instance
+        # Tipo inválido, id fora do cache ou tabela grande: validação normal
+        return super().to_internal_value(data)
+
+
+@contextmanager
+def _foreign_key_errors(model):
+    """Converte a violação de FK do save no 400 que a validação daria.
+
+    O cache de dimensões pode validar um id apagado há menos de um intervalo
+    de conferência (ou enquanto o barramento está fora); o INSERT/UPDATE falha
+    na FK e, sem isto, viraria um 500.
+    """
+    try:
+        # Savepoint: dentro de uma transação maior, só o save é desfeito
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            yield
+            # As FKs criadas pelo Django são DEFERRABLE INITIALLY DEFERRED:
+            # confere agora, dentro do savepoint, e não só no COMMIT
+            connections[DEFAULT_DB_ALIAS].check_constraints()
+    except IntegrityError as error:
+        cause = error.__cause__
+        if getattr(cause, "sqlstate", None) != _FOREIGN_KEY_VIOLATION:
+            raise
+        dimension_cache.invalidate()
+        detail = _FOREIGN_KEY_DETAIL.search(getattr(cause.diag, "message_detail", None) or "")
+        if detail is None:
+            raise
+        fields = {field.column: field.name for field in model._meta.concrete_fields}
+        message = serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+        raise serializers.ValidationError(
+            {
+                fields.get(detail["column"], detail["column"]): [
+                    message.format(pk_value=detail["value"])
+                ]
+            }
+        ) from error
+
+
+class ModelSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
+    def create(self, validated_data):
+        with _foreign_key_errors(self.Meta.model):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with _foreign_key_errors(self.Meta.model):
+            return super().update(instance, validated_data)
+
+
+class ProductGroupSerializer(ModelSerializer):
     class Meta:
         model = models.ProductGroup
         fields = '__all__'
 
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(ModelSerializer):
     class Meta:
         model = models.Supplier
-        fields = '__all__'
+        exclude = ['search_vector']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ModelSerializer):
     class Meta:
         model = models.Product
-        fields = '__all__'
+        exclude = ['search_vector']
 
 
-class ZoneSerializer(serializers.ModelSerializer):
+class ZoneSerializer(ModelSerializer):
     class Meta:
         model = models.Zone
         fields = '__all__'
 
 
-class StateSerializer(serializers.ModelSerializer):
+class StateSerializer(ModelSerializer):
     class Meta:
         model = models.State
         fields = '__all__'
 
 
-class CitySerializer(serializers.ModelSerializer):
+class CitySerializer(ModelSerializer):
     class Meta:
         model = models.City
         fields = '__all__'
 
 
-class DistrictSerializer(serializers.ModelSerializer):
+class DistrictSerializer(ModelSerializer):
     class Meta:
         model = models.District
         fields = '__all__'
 
 
-class BranchSerializer(serializers.ModelSerializer):
+class BranchSerializer(ModelSerializer):
     class Meta:
         model = models.Branch
-        fields = '__all__'
+        exclude = ['geo']
 
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(ModelSerializer):
     class Meta:
         model = models.Department
         fields = '__all__'
 
 
-class MaritalStatusSerializer(serializers.ModelSerializer):
+class MaritalStatusSerializer(ModelSerializer):
     class Meta:
         model = models.MaritalStatus
         fields = '__all__'
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(ModelSerializer):
     age = serializers.ReadOnlyField()
 
     class Meta:
         model = models.Employee
-        fields = '__all__'
+        exclude = ['search_vector', 'geo']
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(ModelSerializer):
     class Meta:
         model = models.Customer
-        fields = '__all__'
+        exclude = ['search_vector', 'geo']
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(ModelSerializer):
     class Meta:
         model = models.Sale
         fields = '__all__'
 
 
-class SaleItemSerializer(serializers.ModelSerializer):
+class SaleItemSerializer(ModelSerializer):
     class Meta:
         model = models.SaleItem
         fields = '__all__'
@@ -0,0 +1,241 @@
+"""
+Coalescência de requisições idênticas a relatórios caros (single-flight).
+
+Quando o dashboard abre, centenas de usuários pedem o mesmo relatório com os
+mesmos parâmetros ao mesmo tempo, e o Postgres roda o mesmo GROUP BY
+centenas de vezes. Com `coalesce_requests` numa action, só a primeira
+requisição (a "líder") executa a action; as idênticas que chegam enquanto
+ela roda esperam e devolvem o mesmo resultado.
+
+- No processo: líder e seguidoras se encontram num dict de chamadas em
+  andamento, por chave (viewset, action, URL e parâmetros).
+- Entre processos (SINGLE_FLIGHT_CROSS_PROCESS): a líder de cada processo
+  disputa um advisory lock da chave no Postgres. Quem consegue executa e
+  grava o resultado em coalesced_response; as líderes dos outros processos
+  esperam o lock e leem o que foi gravado depois que elas chegaram.
+
+Requisições presas ao primário (o cliente acabou de escrever) não entram
+na coalescência: o resultado em andamento pode ser anterior à escrita.
+As contagens ficam em `single_flight.stats()` (exposto em
+/api/core/health/single_flight/).
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.db_router import is_pinned
+from core.models import CoalescedResponse
+
+logger = logging.getLogger(__name__)
+
+ENABLED = getattr(settings, "SINGLE_FLIGHT_ENABLED", True)
+
+# Coalescência também entre processos, via advisory lock e coalesced_response
+CROSS_PROCESS = getattr(settings, "SINGLE_FLIGHT_CROSS_PROCESS", False)
+
+# Espera máxima (segundos) por uma líder; depois disso a requisição executa sozinha
+WAIT_TIMEOUT = getattr(settings, "SINGLE_FLIGHT_WAIT_TIMEOUT", 30.0)
+
+# Intervalo (segundos) entre tentativas de pegar o advisory lock
+LOCK_POLL_INTERVAL = 0.05
+
+# Resultados gravados há mais que isso são apagados (a cada CLEANUP_EVERY gravações)
+RESULT_RETENTION = "1 hour"
+CLEANUP_EVERY = 100
+
+# Namespace do advisory lock (primeiro inteiro de pg_try_advisory_lock(int, int))
+LOCK_NAMESPACE = 0x5F11
+
+
+class _Call:
+    """Uma execução em andamento e o resultado dela."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Response | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Chamadas em andamento por chave e as contagens de coalescência."""
+
+    def __init__(
+        self,
+        cross_process: bool = CROSS_PROCESS,
+        wait_timeout: float = WAIT_TIMEOUT,
+    ) -> None:
+        self.cross_process = cross_process
+        self.wait_timeout = wait_timeout
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stores = 0
+        # (action, evento) -> quantidade
+        self._counts: Counter[tuple[str, str]] = Counter()
+
+    def do(self, name: str, key: str, func) -> Response:
+        """Executa `func()` uma vez por chave entre as requisições simultâneas.
+
+        Args:
+            name: Nome da action, usado nas contagens.
+            key: Chave da requisição (iguais são coalescidas).
+            func: Executa a action e retorna a Response.
+
+        Returns:
+            Response: A da líder, ou uma nova com os mesmos dados e status.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                self._count(name, "coalesced")
+                if call.error is not None:
+                    raise call.error
+                return Response(data=call.response.data, status=call.response.status_code)
+            self._count(name, "timeout")
+            return func()
+
+        try:
+            if self.cross_process:
+                call.response = self._run_locked(name, key, func)
+            else:
+                self._count(name, "executed")
+                call.response = func()
+            return call.response
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict[str, Any]:
+        """Contagens por action: executed, coalesced, coalesced_remote, timeout."""
+        with self._lock:
+            counts = dict(self._counts)
+            in_flight = len(self._calls)
+        result: dict[str, dict[str, int]] = {}
+        for (name, event), count in sorted(counts.items()):
+            result.setdefault(name, {})[event] = count
+        return {"in_flight": in_flight, "actions": result}
+
+    def _count(self, name: str, event: str) -> None:
+        with self._lock:
+            self._counts[name, event] += 1
+
+    def _run_locked(self, name: str, key: str, func) -> Response:
+        lock_key = int.from_bytes(bytes.fromhex(key[:8]), "big", signed=True)
+        connection = connections[DEFAULT_DB_ALIAS]
+        deadline = time.monotonic() + self.wait_timeout
+        with connection.cursor() as cursor:
+            # Relógio do banco: o mesmo de quem grava coalesced_response
+            cursor.execute("SELECT clock_timestamp()")
+            arrived_at = cursor.fetchone()[0]
+            while True:
+                cursor.execute(
+                    "SELECT pg_try_advisory_lock(%s, %s)", [LOCK_NAMESPACE, lock_key]
+                )
+                if cursor.fetchone()[0]:
+                    break
+                if time.monotonic() >= deadline:
+                    self._count(name, "timeout")
+                    return func()
+                time.sleep(LOCK_POLL_INTERVAL)
+
+            try:
+                # Outro processo pode ter terminado enquanto esperávamos o lock
+                shared = (
+                    CoalescedResponse.objects.using(DEFAULT_DB_ALIAS)
+                    .filter(key=key, modified_at__gte=arrived_at)
+                    .values("status_code", "data")
+                    .first()
+                )
+                if shared is not None:
+                    self._count(name, "coalesced_remote")
+                    return Response(data=shared["data"], status=shared["status_code"])
+
+                self._count(name, "executed")
+                response = func()
+                if response.status_code == 200:
+                    try:
+                        self._store(key, response)
+                    except DatabaseError:
+                        # Sem o resultado gravado, os outros processos só executam de novo
+                        logger.warning("Falha ao gravar resultado coalescido.", exc_info=True)
+                return response
+            finally:
+                cursor.execute(
+                    "SELECT pg_advisory_unlock(%s, %s)", [LOCK_NAMESPACE, lock_key]
+                )
+
+    def _store(self, key: str, response: Response) -> None:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO coalesced_response
+                    (key, status_code, data, created_at, modified_at, active)
+                VALUES (%s, %s, %s::jsonb, clock_timestamp(), clock_timestamp(), true)
+                ON CONFLICT (key) DO UPDATE SET
+                    status_code = EXCLUDED.status_code,
+                    data = EXCLUDED.data,
+                    modified_at = EXCLUDED.modified_at
+                """,
+                [key, response.status_code, json.dumps(response.data, cls=JSONEncoder, ensure_ascii=False)],
+            )
+            with self._lock:
+                self._stores += 1
+                cleanup = self._stores % CLEANUP_EVERY == 0
+            if cleanup:
+                cursor.execute(
+                    "DELETE FROM coalesced_response WHERE modified_at < now() - %s::interval",
+                    [RESULT_RETENTION],
+                )
+
+
+single_flight = SingleFlight()
+
+
+def request_key(view, request, kwargs: dict[str, Any]) -> str:
+    """Chave da requisição: viewset, action, URL e parâmetros (em qualquer ordem)."""
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    raw = repr((type(view).__qualname__, view.action, request.path, sorted(kwargs.items()), params))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def coalesce_requests(func):
+    """Decorator de actions GET: requisições idênticas simultâneas executam uma vez.
+
+    Example:
+        @action(detail=False, methods=["get"])
+        @coalesce_requests
+        def region_rollup(self, request): ...
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        if not ENABLED or request.method != "GET" or is_pinned():
+            return func(self, request, *args, **kwargs)
+
+        name = f"{type(self).__name__}.{func.__name__}"
+        return single_flight.do(
+            name,
+            request_key(self, request, kwargs),
+            lambda: func(self, request, *args, **kwargs),
+        )
+
+    return wrapper
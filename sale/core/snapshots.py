@@ -0,0 +1,157 @@
+"""
+Snapshots versionados do cubo de vendas em arquivos mapeados em memória.
+
+Com o cubo (core.cube) montado por worker, a memória multiplica pelo número
+de workers do gunicorn e cada um paga a carga do banco ao subir. Com
+ANALYTICS_SNAPSHOT_DIR, só o comando refresh_analytics_snapshot lê o banco:
+ele grava cada coluna e os valores de cada dicionário num arquivo .npy, e
+os workers abrem os arquivos com np.load(mmap_mode="r"). As páginas ficam no
+page cache do sistema operacional, uma cópia física para todos os workers,
+e subir um worker é um mmap.
+
+Layout:
+
+    ANALYTICS_SNAPSHOT_DIR/
+        v1760850000123-9f2c4e1a/   uma versão (nunca alterada depois de pronta)
+            manifest.json          linhas, marca d'água, arrays e seus dtypes
+            column.revenue.npy
+            values.branch.npy
+            ...
+        current -> v1760850000123-9f2c4e1a
+
+O nome da versão é o instante da gravação em milissegundos mais um sufixo
+aleatório: duas gravações no mesmo milissegundo não disputam o mesmo nome.
+
+Troca atômica: a versão é escrita num diretório temporário, renomeada e só
+então o link `current` é trocado com os.replace. Os workers conferem o link
+a cada ANALYTICS_SNAPSHOT_CHECK_INTERVAL segundos e passam a mapear a versão
+nova; quem ainda consulta a antiga continua com ela. Versões antigas são
+apagadas depois de ANALYTICS_SNAPSHOT_KEEP versões: no Linux, apagar um
+arquivo mapeado não invalida o mapeamento.
+"""
+
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos snapshots; None desliga (cada worker carrega do banco)
+SNAPSHOT_DIR = getattr(settings, "ANALYTICS_SNAPSHOT_DIR", None)
+
+# Versões mantidas em disco, contando a atual
+KEEP_VERSIONS = getattr(settings, "ANALYTICS_SNAPSHOT_KEEP", 3)
+
+# Intervalo mínimo (segundos) entre duas conferências do link `current`
+CHECK_INTERVAL = getattr(settings, "ANALYTICS_SNAPSHOT_CHECK_INTERVAL", 1.0)
+
+CURRENT = "current"
+MANIFEST = "manifest.json"
+VERSION_PREFIX = "v"
+
+
+def current_version(directory: str | os.PathLike) -> str | None:
+    """Nome da versão apontada por `current`, ou None se ainda não há snapshot."""
+    try:
+        return os.readlink(Path(directory) / CURRENT)
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(
+    directory: str | os.PathLike,
+    arrays: dict[str, np.ndarray],
+    meta: dict[str, Any],
+    keep: int = KEEP_VERSIONS,
+) -> str:
+    """Grava uma versão nova e passa `current` a apontar para ela.
+
+    Args:
+        directory: Diretório dos snapshots (criado se não existir).
+        arrays: Arrays por nome (ex: 'column.revenue'); nenhum pode ter dtype object.
+        meta: Metadados que vão para o manifest (precisam ser serializáveis em JSON).
+        keep: Versões mantidas em disco, contando a nova.
+
+    Returns:
+        str: Nome da versão gravada.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = f"{VERSION_PREFIX}{time.time_ns() // 1_000_000}-{secrets.token_hex(4)}"
+    staging = directory / f".{version}.tmp"
+    staging.mkdir()
+
+    manifest = {"version": version, "meta": meta, "arrays": {}}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        path = staging / f"{name}.npy"
+        with open(path, "wb") as file:
+            np.save(file, array, allow_pickle=False)
+            file.flush()
+            os.fsync(file.fileno())
+        manifest["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+    with open(staging / MANIFEST, "w") as file:
+        json.dump(manifest, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.rename(staging, directory / version)
+    link = directory / f".{CURRENT}.{version}.tmp"
+    os.symlink(version, link)
+    os.replace(link, directory / CURRENT)
+
+    prune_snapshots(directory, keep)
+    return version
+
+
+def open_snapshot(
+    directory: str | os.PathLike,
+    version: str | None = None,
+) -> tuple[str, dict[str, np.ndarray], dict[str, Any]] | None:
+    """Mapeia (somente leitura) os arrays de uma versão.
+
+    Args:
+        directory: Diretório dos snapshots.
+        version: Versão a abrir; padrão, a apontada por `current`.
+
+    Returns:
+        tuple | None: (versão, arrays mapeados por nome, meta), ou None se
+            não houver snapshot.
+    """
+    version = version or current_version(directory)
+    if version is None:
+        return None
+    path = Path(directory) / version
+    with open(path / MANIFEST) as file:
+        manifest = json.load(file)
+    arrays = {
+        name: np.load(path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        for name in manifest["arrays"]
+    }
+    return version, arrays, manifest["meta"]
+
+
+def prune_snapshots(directory: str | os.PathLike, keep: int = KEEP_VERSIONS) -> None:
+    """Apaga as versões mais antigas, mantendo `keep` e sempre a atual."""
+    directory = Path(directory)
+    current = current_version(directory)
+    versions = sorted(
+        (path for path in directory.iterdir() if path.is_dir() and path.name.startswith(VERSION_PREFIX)),
+        key=lambda path: (_version_time(path.name), path.name),
+    )
+    for path in versions[:-keep] if keep > 0 else versions:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _version_time(version: str) -> int:
+    """Instante (ms) em que a versão foi gravada; nomes sem sufixo também valem."""
+    return int(version[len(VERSION_PREFIX):].partition("-")[0])
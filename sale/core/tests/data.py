@@ -0,0 +1,115 @@
+"""
+Dados mínimos de vendas para os testes: duas regiões, duas filiais, dois
+clientes, dois funcionários e três produtos em dois grupos.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from django.utils import timezone
+
+from core import models
+
+
+def moment(year: int, month: int, day: int, hour: int = 12) -> datetime:
+    """Instante no fuso do projeto."""
+    return timezone.make_aware(datetime(year, month, day, hour))
+
+
+class SalesData:
+    """Mixin de TestCase/TransactionTestCase com o cadastro básico em self."""
+
+    @classmethod
+    def create_registry(cls) -> None:
+        cls.zone = models.Zone.objects.create(name="Centro")
+        cls.states = [
+            models.State.objects.create(name="São Paulo", abbreviation="SP"),
+            models.State.objects.create(name="Rio de Janeiro", abbreviation="RJ"),
+        ]
+        cls.cities = [
+            models.City.objects.create(name="Campinas", state=cls.states[0]),
+            models.City.objects.create(name="Niterói", state=cls.states[1]),
+        ]
+        cls.districts = [
+            models.District.objects.create(name=f"Bairro {city.name}", city=city, zone=cls.zone)
+            for city in cls.cities
+        ]
+        cls.department = models.Department.objects.create(name="Vendas")
+        cls.marital_status = models.MaritalStatus.objects.create(name="Solteiro")
+        cls.supplier = models.Supplier.objects.create(name="Fornecedor", legal_document="1")
+        cls.groups = [
+            models.ProductGroup.objects.create(
+                name="Bebidas", commission_percentage=Decimal("10"), gain_percentage=Decimal("30"),
+            ),
+            models.ProductGroup.objects.create(
+                name="Limpeza", commission_percentage=Decimal("5"), gain_percentage=Decimal("20"),
+            ),
+        ]
+        cls.products = [
+            models.Product.objects.create(
+                name=name,
+                cost_price=Decimal(price) / 2,
+                sale_price=Decimal(price),
+                product_group=group,
+                supplier=cls.supplier,
+            )
+            for name, price, group in (
+                ("Suco", "4.00", cls.groups[0]),
+                ("Água", "2.50", cls.groups[0]),
+                ("Sabão", "10.00", cls.groups[1]),
+            )
+        ]
+        cls.branches = [
+            models.Branch.objects.create(name=f"Filial {district.name}", district=district)
+            for district in cls.districts
+        ]
+        cls.customers = [
+            models.Customer.objects.create(
+                name=f"Cliente {index}",
+                gender="F",
+                income=Decimal("1000"),
+                district=district,
+                marital_status=cls.marital_status,
+            )
+            for index, district in enumerate(cls.districts)
+        ]
+        cls.employees = [
+            models.Employee.objects.create(
+                name=f"Funcionário {index}",
+                salary=Decimal("2000"),
+                gender="M",
+                admission_date=moment(2020, 1, 1).date(),
+                birth_date=moment(1990, 1, 1).date(),
+                department=cls.department,
+                district=district,
+                marital_status=cls.marital_status,
+            )
+            for index, district in enumerate(cls.districts)
+        ]
+
+    @classmethod
+    def create_sale(
+        cls,
+        at: datetime,
+        items: list[tuple[int, str, str | None]],
+        branch: int = 0,
+        customer: int = 0,
+        employee: int = 0,
+    ) -> models.Sale:
+        """Venda com itens (índice do produto, quantidade, preço ou None)."""
+        sale = models.Sale.objects.create(
+            date=at,
+            branch=cls.branches[branch],
+            customer=cls.customers[customer],
+            employee=cls.employees[employee],
+        )
+        models.SaleItem.objects.bulk_create(
+            models.SaleItem(
+                sale=sale,
+                product=cls.products[product],
+                quantity=Decimal(quantity),
+                sale_price=Decimal(price) if price is not None else None,
+            )
+            for product, quantity, price in items
+        )
+        return sale
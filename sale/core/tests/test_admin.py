@@ -0,0 +1,128 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import admin_utils
+from core.models import Product, Sale
+from core.tests.data import SalesData, moment
+
+
+class AdminChangeListTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "senha")
+        cls.create_sale(moment(2024, 1, 10), [(0, "1", "4.00")])
+        cls.create_sale(moment(2024, 3, 5), [(1, "1", "2.50")])
+        cls.create_sale(moment(2024, 3, 20), [(2, "1", "10.00")], branch=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changelist(self, model, params):
+        response = self.client.get(f"/admin/core/{model}/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    def names(self, params):
+        cl = self.changelist("product", params)
+        return sorted(product.name for product in cl.result_list)
+
+    def test_range_with_both_bounds(self):
+        self.assertEqual(
+            self.names({"sale_price__gte": "3", "sale_price__lte": "5"}), ["Suco"]
+        )
+
+    def test_range_with_only_lower_bound(self):
+        self.assertEqual(
+            self.names({"sale_price__gte": "3", "sale_price__lte": ""}), ["Sabão", "Suco"]
+        )
+
+    def test_range_with_only_upper_bound(self):
+        self.assertEqual(
+            self.names({"sale_price__gte": "", "sale_price__lte": "5"}), ["Suco", "Água"]
+        )
+
+    def test_empty_range_does_not_filter(self):
+        self.assertEqual(len(self.names({"sale_price__gte": "", "sale_price__lte": ""})), 3)
+
+    def test_date_range_with_only_one_bound(self):
+        cl = self.changelist("sale", {"date__gte": "2024-03-01T00:00", "date__lte": ""})
+        self.assertEqual(len(cl.result_list), 2)
+        cl = self.changelist("sale", {"date__gte": "", "date__lte": "2024-03-01T00:00"})
+        self.assertEqual(len(cl.result_list), 1)
+
+    def test_invalid_bound_is_reported(self):
+        for model, params in (
+            ("product", {"sale_price__gte": "abc"}),
+            ("sale", {"date__gte": "2024-13-01T00:00"}),
+        ):
+            with self.subTest(model=model):
+                response = self.client.get(f"/admin/core/{model}/", params)
+                self.assertRedirects(response, f"/admin/core/{model}/?e=1")
+
+    def test_autocomplete_filter(self):
+        cl = self.changelist("sale", {"employee__id__exact": self.employees[0].pk})
+        self.assertEqual(len(cl.result_list), 3)
+        cl = self.changelist("sale", {"employee__id__exact": self.employees[1].pk})
+        self.assertEqual(len(cl.result_list), 0)
+
+    def test_date_hierarchy(self):
+        cl = self.changelist("sale", {"date__year": "2024"})
+        self.assertEqual(len(cl.result_list), 3)
+        cl = self.changelist("sale", {"date__year": "2024", "date__month": "3"})
+        self.assertEqual(len(cl.result_list), 2)
+
+
+class ProbedDatesTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        for day in ((2023, 12, 31), (2024, 1, 10), (2024, 3, 5), (2024, 3, 6)):
+            cls.create_sale(moment(*day, hour=23), [])
+
+    def probed(self):
+        queryset = Sale.objects.all()._chain()
+        queryset.__class__ = admin_utils.ProbedDatesQuerySet
+        return queryset
+
+    def test_matches_distinct_dates(self):
+        for kind in ("year", "month", "day"):
+            for order in ("ASC", "DESC"):
+                with self.subTest(kind=kind, order=order):
+                    self.assertEqual(
+                        list(self.probed().datetimes("date", kind, order)),
+                        list(Sale.objects.datetimes("date", kind, order)),
+                    )
+
+    def test_filtered_and_empty(self):
+        queryset = self.probed().filter(date__gte=moment(2024, 3, 1))
+        self.assertEqual(
+            [value.date() for value in queryset.datetimes("date", "day")],
+            [date(2024, 3, 5), date(2024, 3, 6)],
+        )
+        self.assertEqual(self.probed().none().datetimes("date", "month"), [])
+
+
+class EstimatedCountPaginatorTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def test_small_result_is_counted(self):
+        paginator = admin_utils.EstimatedCountPaginator(Product.objects.order_by("id"), 10)
+        self.assertEqual(paginator.count, 3)
+
+    def test_large_result_uses_planner_estimate(self):
+        queryset = Product.objects.filter(sale_price__gte=Decimal("0")).order_by("id")
+        with mock.patch.object(admin_utils, "ESTIMATED_COUNT_THRESHOLD", 0):
+            count = admin_utils.EstimatedCountPaginator(queryset, 10).count
+        # Estimativa do planejador, não a contagem
+        self.assertIsInstance(count, int)
+        self.assertGreater(count, 0)
+
+    def test_lists_are_counted(self):
+        self.assertEqual(admin_utils.EstimatedCountPaginator([1, 2], 10).count, 2)
@@ -0,0 +1,111 @@
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from core import associations
+from core.models import ProductAssociation
+from core.tests.data import SalesData, moment
+
+
+class TopAssociationsTests(SimpleTestCase):
+    def test_metrics_thresholds_and_rank(self):
+        # 10 cestas: 1 em 6, 2 em 5, 3 em 2; 1+2 em 4, 1+3 em 2
+        rules = associations.top_associations(
+            10, Counter({1: 6, 2: 5, 3: 2}), Counter({(1, 2): 4, (1, 3): 2}), top_k=1
+        )
+        self.assertEqual(
+            list(zip(rules["product"].tolist(), rules["related_product"].tolist())),
+            [(1, 3), (2, 1), (3, 1)],
+        )
+        self.assertEqual(rules["rank"].tolist(), [0, 0, 0])
+        # 3 -> 1: confiança 2/2, lift 1 / (6/10)
+        self.assertAlmostEqual(rules["confidence"][2], 1.0)
+        self.assertAlmostEqual(rules["lift"][2], 10 / 6)
+        self.assertAlmostEqual(rules["support"][2], 0.2)
+
+    def test_nothing_bought_together(self):
+        rules = associations.top_associations(3, Counter({1: 3}), Counter())
+        self.assertEqual(rules["product"].size, 0)
+
+
+class BuildProductAssociationsTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        # Suco repetido na mesma venda conta uma vez
+        cls.create_sale(moment(2024, 1, 1), [(0, "1", "4"), (0, "1", "4"), (1, "1", "2.5")])
+        cls.create_sale(moment(2024, 1, 2), [(0, "1", "4"), (1, "1", "2.5")])
+        cls.create_sale(moment(2024, 1, 3), [(0, "1", "4"), (2, "1", "10")])
+        cls.create_sale(moment(2024, 1, 4), [(2, "1", "10")])
+        inactive = cls.create_sale(moment(2024, 1, 5), [(2, "1", "10"), (1, "1", "2.5")])
+        inactive.active = False
+        inactive.save()
+
+    def rules(self):
+        return [
+            (row.product.name, row.related_product.name, row.rank, row.co_count)
+            for row in ProductAssociation.objects.order_by("product_id", "rank")
+        ]
+
+    def test_counts_in_chunks(self):
+        baskets, products, pairs = associations.count_co_purchases(chunk_size=2)
+        suco, agua, sabao = (product.pk for product in self.products)
+        self.assertEqual(baskets, 4)
+        self.assertEqual(products, Counter({suco: 3, agua: 2, sabao: 2}))
+        self.assertEqual(pairs, Counter({(suco, agua): 2, (suco, sabao): 1}))
+
+    def test_build_replaces_table(self):
+        self.assertEqual(associations.build_product_associations(chunk_size=2), 2)
+        # Suco -> Sabão e Sabão -> Suco têm lift < 1 e ficam de fora
+        self.assertEqual(self.rules(), [("Suco", "Água", 0, 2), ("Água", "Suco", 0, 2)])
+        rule = ProductAssociation.objects.get(product=self.products[0])
+        self.assertAlmostEqual(rule.confidence, 2 / 3)
+        self.assertAlmostEqual(rule.lift, (2 / 3) / (2 / 4))
+
+        associations.build_product_associations(min_lift=0)
+        self.assertEqual(ProductAssociation.objects.count(), 4)
+
+    def test_command(self):
+        output = StringIO()
+        call_command("build_product_associations", "--min-lift=0", stdout=output)
+        self.assertIn("4 associações gravadas", output.getvalue())
+
+
+class RelatedActionTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 1), [(0, "1", "4"), (1, "1", "2.5")])
+        cls.create_sale(moment(2024, 1, 2), [(2, "1", "10")])
+        associations.build_product_associations()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_related_products(self):
+        response = self.client.get(f"/api/core/product/{self.products[0].pk}/related/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["related_product"], row["name"]) for row in response.data],
+            [(self.products[1].pk, "Água")],
+        )
+
+    def test_product_without_associations(self):
+        response = self.client.get(f"/api/core/product/{self.products[2].pk}/related/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_unknown_product_is_not_found(self):
+        for pk in ("999999", "abc"):
+            with self.subTest(pk=pk):
+                response = self.client.get(f"/api/core/product/{pk}/related/")
+                self.assertEqual(response.status_code, 404)
+
+    def test_invalid_limit(self):
+        response = self.client.get(
+            f"/api/core/product/{self.products[0].pk}/related/", {"limit": 0}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core import autocomplete
+from core.autocomplete import ProductNameIndex
+from core.models import Product
+from core.tests.data import SalesData
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_accents_and_case(self):
+        self.assertEqual(autocomplete.normalize("Café PILÃO"), "cafe pilao")
+
+
+class ProductNameIndexTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        self.bus = mock.Mock(healthy=False)
+        self.index = ProductNameIndex(refresh_interval=0, bus=self.bus)
+
+    def names(self, prefix, limit=10):
+        return [row["name"] for row in self.index.lookup(prefix, limit=limit)]
+
+    def create_product(self, name):
+        return Product.objects.create(
+            name=name,
+            cost_price=Decimal("1"),
+            sale_price=Decimal("2"),
+            product_group=self.groups[0],
+            supplier=self.supplier,
+        )
+
+    def test_prefix_ignores_accents_and_case(self):
+        for prefix in ("agu", "ÁGU", "Água"):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(self.names(prefix), ["Água"])
+        self.assertEqual(self.names("sa"), ["Sabão"])
+        self.assertEqual(self.names("x"), [])
+
+    def test_alphabetical_with_limit(self):
+        self.assertEqual(self.names(""), ["Água", "Sabão", "Suco"])
+        self.assertEqual(self.names("", limit=2), ["Água", "Sabão"])
+
+    def test_built_once_and_subscribed(self):
+        self.names("su")
+        with self.assertNumQueries(1):
+            # Só a atualização incremental
+            self.names("su")
+        self.bus.subscribe.assert_called_once_with("product", self.index._on_change)
+
+    def test_incremental_update(self):
+        self.names("su")
+        self.create_product("Suco de Uva")
+        self.products[0].name = "Refrigerante"
+        self.products[0].save()
+        self.assertEqual(self.names("su"), ["Suco de Uva"])
+        self.assertEqual(self.names("refri"), ["Refrigerante"])
+
+    def test_deactivated_product_leaves_index(self):
+        self.names("su")
+        self.products[0].active = False
+        self.products[0].save()
+        self.assertEqual(self.names("su"), [])
+
+    def test_notified_ids_are_reread_without_modified_at(self):
+        self.names("su")
+        stale = timezone.now() - timedelta(days=1)
+        Product.objects.filter(pk=self.products[0].pk).update(name="Limão", modified_at=stale)
+        self.assertEqual(self.names("li"), [])
+
+        self.index._on_change({self.products[0].pk})
+        self.assertEqual(self.names("li"), ["Limão"])
+
+    def test_whole_table_change_rebuilds(self):
+        self.names("su")
+        Product.objects.filter(pk=self.products[0].pk).delete()
+        # Sem aviso, a exclusão não é vista até a reconstrução completa
+        self.assertEqual(self.names("su"), ["Suco"])
+
+        self.index._on_change(None)
+        self.assertEqual(self.names("su"), [])
+
+    def test_too_many_products_fall_back_to_search(self):
+        index = ProductNameIndex(max_entries=2, bus=self.bus)
+        with self.assertLogs("core.autocomplete", "WARNING"):
+            self.assertEqual(index.lookup("agua"), [{"id": self.products[1].pk, "name": "Água"}])
+        self.assertEqual(len(index), 0)
@@ -0,0 +1,137 @@
+from decimal import Decimal
+from unittest import mock
+
+import psycopg
+from django.db import OperationalError
+from django.test import TestCase
+
+from core import batch
+from core.models import BatchJob, Customer, Employee, Product
+from core.tests.data import SalesData, moment
+
+
+def lock_timeout() -> OperationalError:
+    """OperationalError como o psycopg levanta num lock_timeout estourado."""
+    error = OperationalError("canceling statement due to lock timeout")
+    error.__cause__ = psycopg.errors.LockNotAvailable()
+    return error
+
+
+class BatchUpdateTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        template = cls.employees[0]
+        Employee.objects.bulk_create(
+            Employee(
+                name=f"Funcionário extra {index}",
+                salary=Decimal("1000"),
+                gender="F",
+                admission_date=template.admission_date,
+                birth_date=template.birth_date,
+                department=cls.department,
+                district=cls.districts[0],
+                marital_status=cls.marital_status,
+            )
+            for index in range(10)
+        )
+
+    def salaries(self):
+        return dict(Employee.objects.values_list("id", "salary"))
+
+    def assert_increased_once(self, before, percentage="10"):
+        multiplier = 1 + Decimal(percentage) / 100
+        self.assertEqual(
+            self.salaries(),
+            {pk: (salary * multiplier).quantize(Decimal("0.01")) for pk, salary in before.items()},
+        )
+
+    def test_runs_in_chunks(self):
+        before = self.salaries()
+        chunks = []
+        job = batch.run(
+            batch.start("increase_all_salaries", percentage=Decimal("10")),
+            chunk_size=5,
+            sleep=0,
+            on_progress=lambda job: chunks.append(job.last_pk),
+        )
+        self.assertEqual(job.status, BatchJob.Status.DONE)
+        self.assertEqual(job.rows_updated, 12)
+        self.assertEqual(len(chunks), 3)
+        self.assert_increased_once(before)
+
+    def test_interrupted_job_resumes_without_reapplying(self):
+        before = self.salaries()
+
+        def interrupt(job):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            batch.run(
+                batch.start("increase_all_salaries", percentage="10"),
+                chunk_size=5,
+                sleep=0,
+                on_progress=interrupt,
+            )
+
+        # Mesmo nome e params (Decimal ou str): retoma o job interrompido
+        job = batch.start("increase_all_salaries", percentage=Decimal("10"))
+        self.assertEqual(BatchJob.objects.count(), 1)
+        self.assertEqual(job.rows_updated, 5)
+        job = batch.run(job, chunk_size=5, sleep=0)
+        self.assertEqual(job.rows_updated, 12)
+        self.assert_increased_once(before)
+
+    def test_lock_timeout_shrinks_chunk_and_retries(self):
+        before = self.salaries()
+        with mock.patch.object(batch, "_set_lock_timeout", side_effect=[lock_timeout(), *[None] * 20]):
+            job = batch.run(
+                batch.start("increase_all_salaries", percentage="10"),
+                chunk_size=400,
+                sleep=0,
+            )
+        self.assertEqual(job.status, BatchJob.Status.DONE)
+        self.assert_increased_once(before)
+
+    def test_persistent_lock_fails_and_resume_finishes(self):
+        before = self.salaries()
+        with (
+            mock.patch.object(batch, "_set_lock_timeout", side_effect=lock_timeout()),
+            self.assertLogs("core.batch", "ERROR"),
+        ):
+            job = batch.run(batch.start("increase_all_salaries", percentage="10"), sleep=0)
+        self.assertEqual(job.status, BatchJob.Status.FAILED)
+        self.assertEqual(self.salaries(), before)
+
+        job = batch.run(batch.resume(job.pk), sleep=0)
+        self.assertEqual(job.status, BatchJob.Status.DONE)
+        self.assert_increased_once(before)
+
+    def test_other_database_errors_fail_immediately(self):
+        with (
+            mock.patch.object(
+                batch, "_set_lock_timeout", side_effect=OperationalError("server closed the connection")
+            ) as set_lock_timeout,
+            self.assertLogs("core.batch", "ERROR"),
+        ):
+            job = batch.run(batch.start("increase_all_salaries", percentage="10"), sleep=0)
+        self.assertEqual(job.status, BatchJob.Status.FAILED)
+        self.assertEqual(set_lock_timeout.call_count, 1)
+
+    def test_jobs_touch_modified_at(self):
+        old = moment(2020, 1, 1)
+        discount = {"discount_percentage": "10", "group_id": self.groups[0].pk}
+        for name, params, model, touched in (
+            ("apply_discount_to_products", discount, Product, 2),
+            ("deactivate_all_products", {}, Product, 3),
+            ("deactivate_customers_by_gender", {"gender": "F"}, Customer, 2),
+        ):
+            with self.subTest(name=name):
+                model.objects.update(modified_at=old)
+                job = batch.run(batch.start(name, **params), sleep=0)
+                self.assertEqual(job.status, BatchJob.Status.DONE)
+                self.assertEqual(model.objects.filter(modified_at__gt=old).count(), touched)
+
+    def test_empty_job_is_done(self):
+        job = batch.start("deactivate_customers_by_gender", gender="O")
+        self.assertEqual(job.status, BatchJob.Status.DONE)
@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from core.change_log import claim_changes
+from core.models import BranchDaySketchChange, CommissionChange
+from core.tests.data import SalesData, moment
+
+
+class ClaimChangesTests(SalesData, TestCase):
+    """Linhas gravadas à mão: os triggers de venda ficam fora destes testes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        CommissionChange.objects.all().delete()
+        BranchDaySketchChange.objects.all().delete()
+
+    def test_nothing_pending(self):
+        with claim_changes(CommissionChange, "sale_hour") as rows:
+            self.assertEqual(rows, [])
+
+    def test_returns_distinct_values_and_deletes_rows(self):
+        for branch, hour in ((0, 10), (0, 10), (1, 10), (0, 11)):
+            BranchDaySketchChange.objects.create(
+                branch=self.branches[branch], sale_hour=moment(2024, 3, 1, hour)
+            )
+
+        with claim_changes(BranchDaySketchChange, "branch", "sale_hour") as rows:
+            self.assertEqual(
+                sorted(rows),
+                [
+                    (self.branches[0].pk, moment(2024, 3, 1, 10)),
+                    (self.branches[0].pk, moment(2024, 3, 1, 11)),
+                    (self.branches[1].pk, moment(2024, 3, 1, 10)),
+                ],
+            )
+        self.assertFalse(BranchDaySketchChange.objects.exists())
+
+    def test_changes_arriving_while_processing_are_kept(self):
+        CommissionChange.objects.create(id=2, sale_hour=moment(2024, 1, 10))
+
+        with claim_changes(CommissionChange, "sale_hour") as rows:
+            # Mudança confirmada no meio do processamento com id menor que os
+            # lidos (a sequence entrega ids antes do COMMIT)
+            CommissionChange.objects.create(id=1, sale_hour=moment(2024, 2, 1))
+        self.assertEqual(rows, [(moment(2024, 1, 10),)])
+        self.assertEqual(list(CommissionChange.objects.values_list("id", flat=True)), [1])
+
+        with claim_changes(CommissionChange, "sale_hour") as rows:
+            self.assertEqual(rows, [(moment(2024, 2, 1),)])
+
+    def test_failure_keeps_changes(self):
+        CommissionChange.objects.create(sale_hour=moment(2024, 1, 10))
+
+        with self.assertRaises(RuntimeError):
+            with claim_changes(CommissionChange, "sale_hour"):
+                raise RuntimeError
+        self.assertEqual(CommissionChange.objects.count(), 1)
@@ -0,0 +1,41 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core import commissions
+from core.models import CommissionChange, CommissionStatement
+from core.tests.data import SalesData, moment
+
+
+class RecomputePendingTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        # Os cadastros não passam pelos triggers de venda, mas por garantia
+        CommissionChange.objects.all().delete()
+
+    def test_triggers_mark_months(self):
+        self.create_sale(moment(2024, 1, 10), [(0, "2", "4.00")])
+        self.create_sale(moment(2024, 3, 5), [(2, "1", "10.00")])
+        self.assertTrue(CommissionChange.objects.exists())
+
+        self.assertEqual(commissions.recompute_pending(), [date(2024, 1, 1), date(2024, 3, 1)])
+        self.assertFalse(CommissionChange.objects.exists())
+
+        january = CommissionStatement.objects.get(period=date(2024, 1, 1))
+        self.assertEqual(january.total_sales, Decimal("8.00"))
+        self.assertEqual(january.commission, Decimal("0.80"))
+        march = CommissionStatement.objects.get(period=date(2024, 3, 1))
+        self.assertEqual(march.commission, Decimal("0.50"))
+
+    def test_update_and_delete_recompute_month(self):
+        sale = self.create_sale(moment(2024, 1, 10), [(0, "2", "4.00"), (2, "1", "10.00")])
+        commissions.recompute_pending()
+
+        sale.sale_items.filter(product=self.products[2]).delete()
+        self.assertEqual(commissions.recompute_pending(), [date(2024, 1, 1)])
+        statement = CommissionStatement.objects.get(period=date(2024, 1, 1))
+        self.assertEqual(statement.total_sales, Decimal("8.00"))
@@ -0,0 +1,75 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import cube
+from core.tests.data import SalesData, moment
+
+QUERIES = [
+    {"group_by": []},
+    {"group_by": ["branch"]},
+    {"group_by": ["product_group", "gender"]},
+    {"group_by": ["month"]},
+    {"group_by": ["employee", "month"], "start": date(2024, 1, 31), "end": date(2024, 2, 29)},
+    {"group_by": ["branch"], "filters": {"product_group": [0]}},
+    {"group_by": ["month"], "filters": {"gender": ["F"], "branch": [1]}},
+    {"group_by": [], "start": date(2024, 3, 1)},
+]
+
+
+@override_settings(TIME_ZONE="America/Sao_Paulo")
+class SalesCubeTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10), [(0, "2", "4.00"), (1, "1.5", "2.50")])
+        # 22h locais de 31/01 já são 01/02 em UTC
+        cls.create_sale(moment(2024, 1, 31, 22), [(2, "1", "10.00")], branch=1, employee=1)
+        cls.create_sale(moment(2024, 2, 15), [(0, "3", "4.10"), (2, "1", None)], customer=1)
+        inactive = cls.create_sale(moment(2024, 2, 20), [(1, "10", "2.50")], branch=1)
+        inactive.active = False
+        inactive.save()
+
+    def setUp(self):
+        self.cube = cube.SalesCube(snapshot_dir=None)
+        self.cube.rebuild()
+
+    def resolve(self, params):
+        """Troca os índices dos filtros pelos ids criados."""
+        registry = {"product_group": self.groups, "branch": self.branches}
+        filters = {
+            name: [registry[name][value].id for value in values] if name in registry else values
+            for name, values in params.get("filters", {}).items()
+        }
+        return {**params, "filters": filters}
+
+    def test_matches_database(self):
+        for params in QUERIES:
+            params = self.resolve(params)
+            with self.subTest(**params):
+                def key(row, group_by=params["group_by"]):
+                    return tuple(str(row[name]) for name in group_by)
+
+                self.assertEqual(
+                    sorted(self.cube.query(**params), key=key),
+                    sorted(cube.query_database(**params), key=key),
+                )
+
+    def test_totals(self):
+        [total] = self.cube.query([])
+        self.assertEqual(total["items"], 5)
+        # 8.00 + 3.75 + 10.00 + 12.30 + 10.00 (o item sem preço recebe o do
+        # produto no INSERT)
+        self.assertEqual(str(total["revenue"]), "44.05")
+
+    def test_local_day_boundaries(self):
+        january = self.cube.query([], end=date(2024, 1, 31))
+        self.assertEqual(january[0]["items"], 3)
+        self.assertEqual(cube.query_database([], end=date(2024, 1, 31))[0]["items"], 3)
+
+    def test_database_period_is_index_friendly(self):
+        with CaptureQueriesContext(connection) as queries:
+            cube.query_database(["branch"], date(2024, 1, 1), date(2024, 1, 31))
+        self.assertNotIn("AT TIME ZONE", queries[0]["sql"])
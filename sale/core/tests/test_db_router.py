@@ -0,0 +1,141 @@
+import itertools
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core import db_router
+from core.db_router import (
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaStickinessMiddleware,
+    choose_replica,
+    is_pinned,
+    pin_to_primary,
+    replica_selector,
+    use_primary,
+    use_replica,
+)
+from core.models import Product
+
+REPLICAS = ["replica_1", "replica_2"]
+
+
+class RouterTestCase(SimpleTestCase):
+    """Duas réplicas "configuradas"; o atraso de cada uma vem de self.lags.
+
+    As decisões do router são só aliases: nenhuma consulta vai ao banco.
+    """
+
+    def setUp(self):
+        self.lags = {alias: 0.0 for alias in REPLICAS}
+        patches = [
+            mock.patch.object(db_router, "REPLICA_ALIASES", REPLICAS),
+            mock.patch.object(db_router, "_round_robin", itertools.cycle(REPLICAS)),
+            mock.patch.object(db_router, "replica_lag", side_effect=self.lags.get),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.router = PrimaryReplicaRouter()
+
+
+class ReplicaRoutingTests(RouterTestCase):
+    def test_reads_go_to_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+    def test_use_replica_round_robin(self):
+        aliases = []
+        for _ in range(4):
+            with use_replica():
+                aliases.append(self.router.db_for_read(Product))
+        self.assertEqual(aliases, ["replica_1", "replica_2", "replica_1", "replica_2"])
+        self.assertEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+    def test_lagging_replica_is_skipped(self):
+        self.lags["replica_1"] = db_router.REPLICA_MAX_LAG + 1
+        for _ in range(3):
+            self.assertEqual(choose_replica(), "replica_2")
+
+    def test_unreachable_replicas_fall_back_to_primary(self):
+        self.lags.update(replica_1=None, replica_2=None)
+        with use_replica() as alias:
+            self.assertEqual(alias, DEFAULT_DB_ALIAS)
+
+    def test_use_primary_inside_use_replica(self):
+        with use_replica():
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+            self.assertNotEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+
+    def test_pin_to_primary(self):
+        with pin_to_primary():
+            self.assertTrue(is_pinned())
+            with use_replica() as alias:
+                self.assertEqual(alias, DEFAULT_DB_ALIAS)
+                self.assertEqual(self.router.db_for_read(Product), DEFAULT_DB_ALIAS)
+        self.assertFalse(is_pinned())
+
+    def test_replica_selector_binds_queryset(self):
+        @replica_selector
+        def active_products():
+            return Product.objects.filter(active=True)
+
+        # Avaliado fora do decorator, o QuerySet continua na réplica
+        self.assertEqual(active_products().db, "replica_1")
+        self.assertEqual(active_products().db, "replica_2")
+
+    def test_replica_selector_respects_pin(self):
+        @replica_selector
+        def active_products():
+            return Product.objects.filter(active=True)
+
+        with pin_to_primary():
+            self.assertEqual(active_products().db, DEFAULT_DB_ALIAS)
+
+
+class StickinessTests(RouterTestCase):
+    def request(self, method="get", cookies=None, view=None):
+        """Passa uma requisição pelo middleware; devolve (resposta, leituras da view)."""
+        reads = []
+
+        def get_response(request):
+            if view:
+                view()
+            with use_replica():
+                reads.append(self.router.db_for_read(Product))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        response = ReplicaStickinessMiddleware(get_response)(request)
+        return response, reads
+
+    def test_write_pins_rest_of_request(self):
+        def write():
+            self.assertEqual(self.router.db_for_write(Product), DEFAULT_DB_ALIAS)
+
+        _, reads = self.request("post", view=write)
+        self.assertEqual(reads, [DEFAULT_DB_ALIAS])
+        # O pin não vaza para o que roda depois da requisição
+        self.assertFalse(is_pinned())
+
+    def test_unsafe_method_sets_cookie(self):
+        response, _ = self.request("post")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response, _ = self.request("get")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_cookie_pins_reads(self):
+        _, reads = self.request(cookies={STICKY_COOKIE: "1"})
+        self.assertEqual(reads, [DEFAULT_DB_ALIAS])
+        _, reads = self.request()
+        self.assertIn(reads[0], REPLICAS)
+
+    def test_write_outside_request_does_not_pin(self):
+        # Comandos, jobs e threads do processo: sem middleware, sem pin
+        self.router.db_for_write(Product)
+        self.assertFalse(is_pinned())
+        with use_replica() as alias:
+            self.assertIn(alias, REPLICAS)
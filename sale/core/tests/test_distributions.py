@@ -0,0 +1,150 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core import distributions
+from core.models import Sale, SaleItem
+from core.tests.data import SalesData, moment
+
+
+class ExactDistributionTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 3, 1), [(0, "1", "4.00"), (1, "1", "2.50")])
+        cls.create_sale(moment(2024, 3, 2), [(2, "1", "10.00")])
+
+    def distribution(self, buckets=2, **filters):
+        return distributions.exact_distribution(
+            SaleItem.objects.filter(**filters), "sale_price", buckets
+        )
+
+    def test_width_bucket_clamps_maximum_into_last_bucket(self):
+        result = self.distribution()
+        self.assertEqual((result["count"], result["min"], result["max"]), (3, 2.5, 10))
+        # width_bucket põe o máximo na faixa 3; o LEAST o devolve para a 2
+        self.assertEqual(
+            [
+                (row["bucket"], row["lower"], row["upper"], row["total"])
+                for row in result["histogram"]
+            ],
+            [(1, 2.5, 6.25, 2), (2, 6.25, 10.0, 1)],
+        )
+        self.assertEqual(result["p50"], 4.0)
+        self.assertFalse(result["approximate"])
+
+    def test_single_value(self):
+        result = self.distribution(buckets=4, product=self.products[2])
+        self.assertEqual((result["count"], result["min"], result["max"]), (1, 10, 10))
+        self.assertEqual([result["p50"], result["p90"], result["p99"]], [10.0, 10.0, 10.0])
+        self.assertEqual([row["total"] for row in result["histogram"]], [1, 0, 0, 0])
+        self.assertEqual({row["lower"] for row in result["histogram"]}, {10.0})
+
+    def test_all_null(self):
+        SaleItem.objects.update(sale_price=None)
+        result = self.distribution()
+        self.assertEqual(result["count"], 0)
+        self.assertEqual(
+            [result[key] for key in ("min", "max", "avg", "p50", "p90", "p99")], [None] * 6
+        )
+        self.assertEqual(result["histogram"], [])
+
+    def test_nulls_are_ignored(self):
+        SaleItem.objects.filter(product=self.products[2]).update(sale_price=None)
+        result = self.distribution()
+        self.assertEqual((result["count"], result["max"]), (2, 4))
+        self.assertEqual(sum(row["total"] for row in result["histogram"]), 2)
+
+
+class BasketDistributionTests(SalesData, TestCase):
+    """Sketches diários contra o cálculo exato sobre as mesmas vendas."""
+
+    # 102 vendas, uma cancelada: os quantis das 101 restantes caem em posições
+    # inteiras (0.5, 0.9 e 0.99 * 100), sem a interpolação do percentile_cont
+    SALES = 102
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        chooser = random.Random(40)
+        sales = Sale.objects.bulk_create(
+            Sale(
+                date=moment(2024, 3, 1 + index % 7, 8 + index % 12),
+                branch=cls.branches[index % 2],
+                customer=cls.customers[0],
+                employee=cls.employees[0],
+            )
+            for index in range(cls.SALES)
+        )
+        items = []
+        for index, sale in enumerate(sales):
+            # Uma cesta de valor zero e as demais espalhadas em três ordens de grandeza
+            price = Decimal(0) if index == 2 else Decimal(f"{chooser.uniform(1, 1000):.2f}")
+            items.append(
+                SaleItem(sale=sale, product=cls.products[0], quantity=Decimal(1), sale_price=price)
+            )
+            if index % 3 == 0:
+                items.append(
+                    SaleItem(
+                        sale=sale, product=cls.products[1], quantity=Decimal("0.5"),
+                        sale_price=Decimal("2.50"),
+                    )
+                )
+        SaleItem.objects.bulk_create(items)
+        # Fora das duas: venda cancelada e item cancelado
+        Sale.objects.filter(pk=sales[1].pk).update(active=False)
+        SaleItem.objects.filter(sale=sales[3], product=cls.products[1]).update(active=False)
+        distributions.refresh_basket_sketches(date(2024, 3, 1), date(2024, 3, 7))
+
+    def assertClose(self, approximate, exact):
+        self.assertLessEqual(
+            abs(float(approximate) - float(exact)),
+            distributions.RELATIVE_ACCURACY * float(exact) + 1e-9,
+        )
+
+    def test_matches_exact_within_relative_accuracy(self):
+        exact = distributions.exact_basket_distribution()
+        approximate = distributions.approximate_basket_distribution()
+        self.assertTrue(approximate["approximate"])
+        self.assertEqual(approximate["count"], exact["count"])
+        self.assertEqual((approximate["min"], approximate["max"]), (exact["min"], exact["max"]))
+        self.assertAlmostEqual(float(approximate["avg"]), float(exact["avg"]), places=6)
+        for key in ("p50", "p90", "p99"):
+            with self.subTest(key=key):
+                self.assertClose(approximate[key], exact[key])
+        self.assertEqual(sum(row["total"] for row in approximate["histogram"]), exact["count"])
+        self.assertEqual(
+            [(row["lower"], row["upper"]) for row in approximate["histogram"]],
+            [(row["lower"], row["upper"]) for row in exact["histogram"]],
+        )
+
+    def test_period(self):
+        exact = distributions.exact_basket_distribution(date(2024, 3, 3), date(2024, 3, 5))
+        approximate = distributions.approximate_basket_distribution(
+            date(2024, 3, 3), date(2024, 3, 5)
+        )
+        self.assertGreater(exact["count"], 0)
+        self.assertLess(exact["count"], self.SALES - 1)
+        for key in ("count", "min", "max"):
+            with self.subTest(key=key):
+                self.assertEqual(approximate[key], exact[key])
+
+    def test_full_period_counts(self):
+        exact = distributions.exact_basket_distribution()
+        # A venda cancelada fica de fora; a cesta zerada entra
+        self.assertEqual(exact["count"], self.SALES - 1)
+        self.assertEqual(exact["min"], 0)
+        self.assertEqual(distributions.approximate_basket_distribution()["min"], 0)
+
+    def test_no_sales_in_period(self):
+        for function in (
+            distributions.exact_basket_distribution,
+            distributions.approximate_basket_distribution,
+        ):
+            with self.subTest(function=function.__name__):
+                result = function(date(2025, 1, 1), date(2025, 1, 31))
+                self.assertEqual(
+                    (result["count"], result["p50"], result["histogram"]), (0, None, [])
+                )
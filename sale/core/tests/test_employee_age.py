@@ -0,0 +1,115 @@
+from datetime import UTC, datetime, timedelta
+
+from django.db.models import IntegerField, Value
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core import selectors
+from core.functions import Age, age_band
+from core.models import Employee
+from core.tests.data import SalesData
+
+
+def years_ago(years, days=0):
+    """Data de nascimento `years` anos antes de hoje (CURRENT_DATE em UTC)."""
+    today = datetime.now(UTC).date()
+    return today.replace(year=today.year - years) + timedelta(days=days)
+
+
+class EmployeeAgeTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def employee(self, birth_date, gender="M"):
+        return Employee.objects.create(
+            name="Funcionário novo",
+            salary=1000,
+            gender=gender,
+            admission_date=self.employees[0].admission_date,
+            birth_date=birth_date,
+            department=self.department,
+            district=self.districts[0],
+            marital_status=self.marital_status,
+        )
+
+    def age(self, employee):
+        return (
+            Employee.objects.filter(pk=employee.pk)
+            .values_list(Age("birth_date"), flat=True)
+            .get()
+        )
+
+    def test_age_counts_only_completed_years(self):
+        for birth_date, age in (
+            (years_ago(30), 30),
+            (years_ago(30, days=1), 29),
+            (years_ago(30, days=-1), 30),
+        ):
+            with self.subTest(birth_date=birth_date):
+                employee = self.employee(birth_date)
+                self.assertEqual(self.age(employee), age)
+                # A property em Python concorda com o banco
+                self.assertEqual(Employee.objects.get(pk=employee.pk).age, age)
+
+    def test_property_uses_annotation(self):
+        employee = selectors.get_employees_with_age().get(pk=self.employees[0].pk)
+        self.assertEqual(employee.age, employee.age_years)
+
+    def test_age_band_boundaries(self):
+        for age, label in (
+            (0, "Menor de Idade"),
+            (17, "Menor de Idade"),
+            (18, "Jovem (18-24)"),
+            (24, "Jovem (18-24)"),
+            (25, "Adulto Jovem (25-34)"),
+            (34, "Adulto Jovem (25-34)"),
+            (35, "Adulto (35-49)"),
+            (49, "Adulto (35-49)"),
+            (50, "Adulto Maduro (50-59)"),
+            (59, "Adulto Maduro (50-59)"),
+            (60, "Sênior (60+)"),
+            (None, "Não Informado"),
+        ):
+            with self.subTest(age=age):
+                band = (
+                    Employee.objects.annotate(age_years=Value(age, IntegerField()))
+                    .values_list(age_band(), flat=True)
+                    .first()
+                )
+                self.assertEqual(band, label)
+
+    def test_histogram(self):
+        Employee.objects.update(birth_date=years_ago(40))
+        self.employee(years_ago(24), gender="F")
+        self.employee(years_ago(25), gender="F")
+
+        self.assertEqual(
+            list(selectors.get_employee_age_histogram("gender")),
+            [
+                {"group_name": "F", "age_band": "Adulto Jovem (25-34)", "total": 1},
+                {"group_name": "F", "age_band": "Jovem (18-24)", "total": 1},
+                {"group_name": "M", "age_band": "Adulto (35-49)", "total": 2},
+            ],
+        )
+        self.assertEqual(
+            list(selectors.get_employee_age_histogram("district")),
+            [
+                {"group_name": "Bairro Campinas", "age_band": "Adulto (35-49)", "total": 1},
+                {"group_name": "Bairro Campinas", "age_band": "Adulto Jovem (25-34)", "total": 1},
+                {"group_name": "Bairro Campinas", "age_band": "Jovem (18-24)", "total": 1},
+                {"group_name": "Bairro Niterói", "age_band": "Adulto (35-49)", "total": 1},
+            ],
+        )
+
+    def test_histogram_action(self):
+        client = APIClient()
+        response = client.get("/api/core/employee/age_histogram/", {"group_by": "department"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row["total"] for row in response.data), 2)
+        response = client.get("/api/core/employee/age_histogram/", {"group_by": "salary"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_exposes_age(self):
+        response = APIClient().get(f"/api/core/employee/{self.employees[0].pk}/")
+        self.assertEqual(response.data["age"], self.employees[0].age)
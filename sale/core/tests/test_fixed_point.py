@@ -0,0 +1,146 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.db.models import F, Sum
+from django.test import SimpleTestCase, TestCase
+
+from core.fixed_point import (
+    MONEY_SCALE,
+    QUANTITY_SCALE,
+    fetch_arrays,
+    multiply,
+    rescale,
+    scaled,
+    to_decimal,
+    to_decimals,
+)
+from core.models import SaleItem
+from core.tests.data import SalesData, moment
+
+# Positivos, negativos, metades exatas e quase metades, em milésimos
+VALUES = ["12.345", "-12.345", "12.344", "-12.346", "0.005", "-0.005", "0.004", "-0.004", "7", "0"]
+
+
+def units(text, scale):
+    """Decimal arredondado (ROUND_HALF_UP) em `scale` casas, como inteiro."""
+    return int(Decimal(text).quantize(Decimal(1).scaleb(-scale), ROUND_HALF_UP).scaleb(scale))
+
+
+class ArithmeticTests(SimpleTestCase):
+    def test_rescale_down_rounds_half_away_from_zero(self):
+        values = np.array([units(text, 3) for text in VALUES])
+        for to_scale in (2, 1, 0):
+            with self.subTest(to_scale=to_scale):
+                self.assertEqual(
+                    rescale(values, 3, to_scale).tolist(),
+                    [units(text, to_scale) for text in VALUES],
+                )
+
+    def test_rescale_up_is_exact(self):
+        values = np.array([units(text, 2) for text in VALUES])
+        self.assertEqual(
+            rescale(values, 2, 5).tolist(), [value * 1000 for value in values.tolist()]
+        )
+        self.assertEqual(rescale(values, 2, 2).tolist(), values.tolist())
+
+    def test_multiply(self):
+        quantities = ["1.5", "-1.5", "0.333", "2", "-0.01", "-0.001"]
+        prices = ["2.55", "2.55", "0.05", "-3.99", "0.50", "0.50"]
+        result = multiply(
+            np.array([units(text, QUANTITY_SCALE) for text in quantities]),
+            QUANTITY_SCALE,
+            np.array([units(text, MONEY_SCALE) for text in prices]),
+            MONEY_SCALE,
+            MONEY_SCALE,
+        )
+        # 3.825, -3.825, 0.01665, -7.98, -0.005 e -0.0005
+        self.assertEqual(
+            result.tolist(),
+            [
+                units(str(Decimal(quantity) * Decimal(price)), MONEY_SCALE)
+                for quantity, price in zip(quantities, prices)
+            ],
+        )
+        self.assertEqual(result.tolist(), [383, -383, 2, -798, -1, 0])
+
+    def test_to_decimal_keeps_scale(self):
+        for text in ("19.99", "-0.05", "0.00", "-12.35", "7.00"):
+            with self.subTest(text=text):
+                value = to_decimal(units(text, MONEY_SCALE), MONEY_SCALE)
+                expected = Decimal(text).quantize(Decimal("0.01"), ROUND_HALF_UP)
+                self.assertEqual(value, expected)
+                self.assertEqual(str(value), str(expected))
+        self.assertEqual(str(to_decimal(np.int64(12345), QUANTITY_SCALE)), "12.345")
+
+    def test_to_decimals(self):
+        values = rescale(np.array([units(text, 3) for text in VALUES]), 3, MONEY_SCALE)
+        decimals = to_decimals(values, MONEY_SCALE)
+        self.assertEqual(
+            decimals,
+            [Decimal(text).quantize(Decimal("0.01"), ROUND_HALF_UP) for text in VALUES],
+        )
+        # Sempre com as casas da escala, inclusive no zero
+        self.assertEqual({value.as_tuple().exponent for value in decimals}, {-MONEY_SCALE})
+        self.assertEqual(to_decimals(np.empty(0, dtype=np.int64), MONEY_SCALE), [])
+
+
+class FetchArraysTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10), [(0, "1.5", "4.05"), (1, "0.333", "2.50")])
+        cls.create_sale(moment(2024, 1, 11), [(2, "2", "10.00")])
+
+    def test_scaled_columns(self):
+        arrays = fetch_arrays(
+            SaleItem.objects.order_by("id"),
+            quantity=scaled(F("quantity"), QUANTITY_SCALE),
+            sale_price=scaled(F("sale_price"), MONEY_SCALE),
+        )
+        self.assertEqual(arrays["quantity"].dtype, np.int64)
+        self.assertEqual(arrays["quantity"].tolist(), [1500, 333, 2000])
+        self.assertEqual(arrays["sale_price"].tolist(), [405, 250, 1000])
+
+    def test_unscaled_values_round_half_away_from_zero(self):
+        arrays = fetch_arrays(
+            SaleItem.objects.order_by("id"),
+            revenue=F("quantity") * F("sale_price"),
+            negative=F("quantity") * -1,
+        )
+        # 6.075, 0.8325 e 20.000
+        self.assertEqual(arrays["revenue"].tolist(), [6, 1, 20])
+        # -1.5, -0.333 e -2
+        self.assertEqual(arrays["negative"].tolist(), [-2, 0, -2])
+
+    def test_aggregates(self):
+        arrays = fetch_arrays(
+            SaleItem.objects.values("sale").order_by("sale"),
+            revenue=scaled(Sum(F("quantity") * F("sale_price")), MONEY_SCALE),
+        )
+        # 6.075 + 0.8325 = 6.9075
+        self.assertEqual(arrays["revenue"].tolist(), [691, 2000])
+
+    def test_nulls_become_zero(self):
+        SaleItem.objects.filter(product=self.products[1]).update(sale_price=None)
+        arrays = fetch_arrays(
+            SaleItem.objects.order_by("id"),
+            sale_price=scaled(F("sale_price"), MONEY_SCALE),
+            raw=F("sale_price"),
+        )
+        self.assertEqual(arrays["sale_price"].tolist(), [405, 0, 1000])
+        self.assertEqual(arrays["raw"].tolist(), [4, 0, 10])
+
+    def test_empty_result_set_skips_database(self):
+        for name, queryset in (
+            ("none", SaleItem.objects.none()),
+            ("id__in=[]", SaleItem.objects.filter(id__in=[])),
+        ):
+            with self.subTest(queryset=name), self.assertNumQueries(0):
+                arrays = fetch_arrays(queryset, id=F("id"), price=F("sale_price"))
+                self.assertEqual(list(arrays), ["id", "price"])
+                for array in arrays.values():
+                    self.assertEqual((array.dtype, array.shape), (np.dtype(np.int64), (0,)))
+
+    def test_no_rows(self):
+        arrays = fetch_arrays(SaleItem.objects.filter(sale__date__year=2000), id=F("id"))
+        self.assertEqual(arrays["id"].tolist(), [])
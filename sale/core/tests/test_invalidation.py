@@ -0,0 +1,99 @@
+import queue
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.invalidation import CHANNEL, InvalidationBus
+from core.models import Product
+from core.tests.data import SalesData
+
+
+class MergeTests(SimpleTestCase):
+    def merge(self, *payloads):
+        pending = {}
+        for payload in payloads:
+            InvalidationBus._merge(pending, payload)
+        return pending
+
+    def test_ids_are_united_per_table(self):
+        self.assertEqual(
+            self.merge(
+                '{"table": "product", "ids": [1, 2]}',
+                '{"table": "product", "ids": [2, 3]}',
+                '{"table": "branch", "ids": [1]}',
+            ),
+            {"product": {1, 2, 3}, "branch": {1}},
+        )
+
+    def test_whole_table_wins(self):
+        for payloads in (
+            ('{"table": "product", "ids": [1]}', '{"table": "product"}'),
+            ('{"table": "product"}', '{"table": "product", "ids": [1]}'),
+        ):
+            with self.subTest(payloads=payloads):
+                self.assertEqual(self.merge(*payloads), {"product": None})
+
+    def test_invalid_payload_is_ignored(self):
+        with self.assertLogs("core.invalidation", "WARNING"):
+            self.assertEqual(self.merge("not json", '{"ids": [1]}'), {})
+
+    def test_failing_callback_does_not_stop_others(self):
+        bus = InvalidationBus(enabled=False)
+        received = []
+        bus.subscribe("product", mock.Mock(side_effect=RuntimeError))
+        bus.subscribe("product", received.append)
+        with self.assertLogs("core.invalidation", "ERROR"):
+            bus.publish({"product": {1}, "branch": None})
+        self.assertEqual(received, [{1}])
+
+
+class InvalidationBusTests(SalesData, TransactionTestCase):
+    """Ouvinte real no banco de testes: os NOTIFY só saem no COMMIT."""
+
+    def setUp(self):
+        self.create_registry()
+        self.bus = InvalidationBus(coalesce_window=0.2)
+        self.received = queue.Queue()
+        self.bus.subscribe("product", self.received.put)
+        self.addCleanup(self.bus.stop)
+        # Ao conectar, o ouvinte descarta tudo
+        self.assertIsNone(self.next())
+        self.assertTrue(self.bus.healthy)
+
+    def next(self):
+        return self.received.get(timeout=5)
+
+    def test_commits_in_window_are_delivered_together(self):
+        for product in self.products[:2]:
+            Product.objects.filter(pk=product.pk).update(sale_price=product.sale_price + 1)
+        self.assertEqual(self.next(), {self.products[0].pk, self.products[1].pk})
+
+    def test_rolled_back_change_is_not_delivered(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Product.objects.filter(pk=self.products[0].pk).update(name="Desfeito")
+            raise RuntimeError
+        Product.objects.filter(pk=self.products[1].pk).update(name="Confirmado")
+        self.assertEqual(self.next(), {self.products[1].pk})
+
+    def test_delete_discards_whole_table(self):
+        self.products[2].delete()
+        self.assertIsNone(self.next())
+
+    def test_reconnects_and_discards_everything(self):
+        with self.assertLogs("core.invalidation", "WARNING"):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+                    WHERE datname = current_database() AND query = %s
+                    """,
+                    [f"LISTEN {CHANNEL}"],
+                )
+            # Uma vez ao cair e outra ao reconectar
+            self.assertIsNone(self.next())
+            self.assertIsNone(self.next())
+        self.assertTrue(self.bus.healthy)
+
+        Product.objects.filter(pk=self.products[0].pk).update(name="Depois")
+        self.assertEqual(self.next(), {self.products[0].pk})
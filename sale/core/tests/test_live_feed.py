@@ -0,0 +1,178 @@
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+
+from core import live_feed
+from core.live_feed import SalesFeed, Subscription, _Batch
+from core.models import SaleItem
+from core.tests.data import SalesData, moment
+
+
+def decode(chunk):
+    _, data = chunk.removesuffix("\n\n").split("\n")
+    return json.loads(data.removeprefix("data: "))
+
+
+def make_batch():
+    return _Batch(
+        at=datetime(2024, 3, 1, 12, tzinfo=UTC),
+        branches=[
+            {"branch": 1, "sales": 1, "total": Decimal("8.00")},
+            {"branch": 2, "sales": 1, "total": Decimal("2.50")},
+        ],
+        sales=[{"id": 11, "branch": 2}, {"id": 10, "branch": 1}],
+        truncated=False,
+    )
+
+
+class EncodeTests(SimpleTestCase):
+    def test_all_branches(self):
+        chunk = make_batch().encode(None)
+        self.assertTrue(chunk.startswith("event: sales\ndata: {"))
+        data = decode(chunk)
+        self.assertEqual(data["at"], "2024-03-01T12:00:00Z")
+        self.assertEqual([row["branch"] for row in data["branches"]], [1, 2])
+        self.assertEqual([row["id"] for row in data["sales"]], [11, 10])
+        self.assertEqual(data["branches"][0]["total"], 8.0)
+
+    def test_branch_filter(self):
+        data = decode(make_batch().encode(frozenset({2})))
+        self.assertEqual(data["branches"], [{"branch": 2, "sales": 1, "total": 2.5}])
+        self.assertEqual(data["sales"], [{"id": 11, "branch": 2}])
+
+    def test_nothing_from_requested_branches(self):
+        self.assertIsNone(make_batch().encode(frozenset({3})))
+
+    def test_encoded_once_per_filter(self):
+        batch = make_batch()
+        with mock.patch.object(live_feed.json, "dumps", wraps=json.dumps) as dumps:
+            first = batch.encode(frozenset({1}))
+            self.assertIs(batch.encode(frozenset({1})), first)
+            batch.encode(None)
+        self.assertEqual(dumps.call_count, 2)
+
+
+class StreamTests(SimpleTestCase):
+    def setUp(self):
+        self.feed = SalesFeed(bus=mock.Mock(healthy=True))
+        # Sem o thread de lotes: os eventos são entregues à mão
+        self.enterContext(mock.patch.object(self.feed, "_start"))
+
+    async def test_delivers_events(self):
+        subscription = self.feed.connect()
+        subscription.deliver(make_batch())
+        stream = self.feed.stream(subscription)
+        self.assertEqual(await anext(stream), f"retry: {live_feed.RETRY_MS}\n\n")
+        self.assertEqual(decode(await anext(stream))["sales"][1]["id"], 10)
+        await stream.aclose()
+        self.assertEqual(self.feed.stats()["subscribers"], 0)
+
+    async def test_lagged_subscriber_is_disconnected(self):
+        with mock.patch.object(live_feed, "QUEUE_SIZE", 1):
+            subscription = self.feed.connect()
+        subscription.deliver(make_batch())
+        subscription.deliver(make_batch())
+        self.assertTrue(subscription.lagged)
+
+        chunks = [chunk async for chunk in self.feed.stream(subscription)]
+        self.assertEqual(chunks, [f"retry: {live_feed.RETRY_MS}\n\n"])
+        self.assertEqual(self.feed.stats()["subscribers"], 0)
+        self.assertEqual(self.feed.stats()["dropped"], 1)
+
+    def test_database_error_falls_back_to_modified_at(self):
+        self.feed._subscriptions.add(Subscription(mock.Mock(), None))
+        self.feed._on_sales({1})
+        with (
+            mock.patch.object(SalesFeed, "_load", side_effect=DatabaseError),
+            mock.patch.object(live_feed, "connections") as connections,
+            self.assertLogs("core.live_feed", "WARNING"),
+        ):
+            self.feed._flush()
+        connections["default"].close.assert_called_once()
+        self.assertTrue(self.feed._everything)
+        self.assertIsNone(self.feed._flushed_at)
+
+
+class FlushTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        self.bus = mock.Mock(healthy=True)
+        self.feed = SalesFeed(bus=self.bus)
+        self.loop = mock.Mock()
+        self.subscription = Subscription(self.loop, None)
+        self.feed._subscriptions.add(self.subscription)
+
+    def flush(self):
+        """Roda um lote e devolve o que foi entregue, ou None."""
+        self.loop.reset_mock()
+        self.feed._flush()
+        if not self.loop.call_soon_threadsafe.called:
+            return None
+        _, members, batch = self.loop.call_soon_threadsafe.call_args.args
+        self.assertEqual(members, [self.subscription])
+        return batch
+
+    def test_without_subscribers_reads_nothing(self):
+        self.feed._subscriptions.clear()
+        self.feed._on_sales({1})
+        with self.assertNumQueries(0):
+            self.feed._flush()
+        self.assertIsNotNone(self.feed._flushed_at)
+        self.assertEqual(self.feed._sale_ids, set())
+
+    def test_nothing_changed(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.flush())
+
+    def test_changed_ids(self):
+        first = self.create_sale(moment(2024, 3, 1), [(0, "2", "4.00")])
+        second = self.create_sale(moment(2024, 3, 1), [(1, "1", "2.50")], branch=1)
+        self.create_sale(moment(2024, 3, 1), [(2, "1", "10.00")])
+        self.feed._on_sales({first.pk})
+        self.feed._on_items({second.sale_items.get().pk})
+
+        batch = self.flush()
+        self.assertEqual([row["id"] for row in batch.sales], [second.pk, first.pk])
+        self.assertEqual(
+            [(row["branch"], row["sales"], row["total"]) for row in batch.branches],
+            [
+                (self.branches[0].pk, 1, Decimal("8.00")),
+                (self.branches[1].pk, 1, Decimal("2.50")),
+            ],
+        )
+        self.assertEqual(self.feed.stats()["batches"], 1)
+
+    def test_overlap_does_not_resend_sales(self):
+        self.bus.healthy = False
+        first = self.create_sale(moment(2024, 3, 1), [(0, "2", "4.00")])
+        self.assertEqual([row["id"] for row in self.flush().sales], [first.pk])
+
+        # A folga relê a venda, que não mudou
+        self.assertIsNone(self.flush())
+
+        second = self.create_sale(moment(2024, 3, 1), [(1, "1", "2.50")])
+        batch = self.flush()
+        self.assertEqual([row["id"] for row in batch.sales], [second.pk])
+        self.assertEqual(
+            [(row["sales"], row["total"]) for row in batch.branches], [(1, Decimal("2.50"))]
+        )
+
+        # Mudou dentro da folga: vai de novo
+        SaleItem.objects.create(sale=first, product=self.products[2], quantity=Decimal("1"))
+        [row] = self.flush().sales
+        self.assertEqual((row["id"], row["total"], row["items"]), (first.pk, Decimal("18.00"), 2))
+        self.assertEqual(self.feed.stats()["batches"], 3)
+
+    def test_closed_loop_disconnects(self):
+        self.create_sale(moment(2024, 3, 1), [(0, "2", "4.00")])
+        self.feed._on_sales(None)
+        self.loop.call_soon_threadsafe.side_effect = RuntimeError
+        self.feed._flush()
+        self.assertEqual(self.feed.stats()["subscribers"], 0)
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from core import selectors
+from core.models import Product, ProductPriceHistory
+from core.tests.data import SalesData, moment
+
+
+class PriceHistoryTriggerTests(SalesData, TransactionTestCase):
+    """Transacional: os triggers datam o histórico com now(), o início da
+    transação, então cada alteração precisa da sua."""
+
+    def setUp(self):
+        self.create_registry()
+        self.product = self.products[0]
+
+    def history(self, product=None):
+        product = product or self.product
+        return list(
+            ProductPriceHistory.objects.filter(product=product)
+            .order_by("valid_from")
+            .values_list("sale_price", "cost_price", "valid_from", "valid_to")
+        )
+
+    def test_insert_opens_current_price(self):
+        [(sale_price, cost_price, valid_from, valid_to)] = self.history()
+        self.assertEqual((sale_price, cost_price), (Decimal("4.00"), Decimal("2.00")))
+        self.assertIsNone(valid_to)
+
+    def test_price_change_closes_previous_row(self):
+        self.product.sale_price = Decimal("4.50")
+        self.product.save()
+
+        [old, new] = self.history()
+        self.assertEqual(old[0], Decimal("4.00"))
+        self.assertEqual(new[0], Decimal("4.50"))
+        # Intervalos contíguos: o antigo termina onde o novo começa
+        self.assertEqual(old[3], new[2])
+        self.assertIsNone(new[3])
+
+    def test_queryset_update_is_recorded(self):
+        Product.objects.filter(product_group=self.groups[0]).update(cost_price=Decimal("1.00"))
+        for product in self.products[:2]:
+            with self.subTest(product=product.name):
+                self.assertEqual(len(self.history(product)), 2)
+                self.assertEqual(self.history(product)[-1][1], Decimal("1.00"))
+        self.assertEqual(len(self.history(self.products[2])), 1)
+
+    def test_update_without_price_change_is_ignored(self):
+        Product.objects.filter(pk=self.product.pk).update(name="Suco de uva")
+        self.assertEqual(len(self.history()), 1)
+
+    def test_changes_in_same_transaction_correct_open_row(self):
+        self.product.sale_price = Decimal("4.50")
+        self.product.save()
+        with transaction.atomic():
+            Product.objects.filter(pk=self.product.pk).update(sale_price=Decimal("5.00"))
+            Product.objects.filter(pk=self.product.pk).update(sale_price=Decimal("5.50"))
+
+        prices = [row[0] for row in self.history()]
+        self.assertEqual(prices, [Decimal("4.00"), Decimal("4.50"), Decimal("5.50")])
+        open_rows = ProductPriceHistory.objects.filter(product=self.product, valid_to__isnull=True)
+        self.assertEqual(open_rows.count(), 1)
+
+    def test_price_as_of(self):
+        self.product.sale_price = Decimal("4.50")
+        self.product.save()
+        [(_, _, first, changed), _] = self.history()
+        before = first - timedelta(seconds=1)
+        middle = first + (changed - first) / 2
+
+        self.assertIsNone(selectors.get_product_price_as_of(self.product.pk, before))
+        for at, price in ((first, "4.00"), (middle, "4.00"), (changed, "4.50")):
+            with self.subTest(at=at):
+                row = selectors.get_product_price_as_of(self.product.pk, at)
+                self.assertEqual(row.sale_price, Decimal(price))
+
+        self.assertEqual(
+            selectors.get_prices_as_of(
+                [(self.product.pk, at) for at in (before, middle, changed)]
+            ),
+            {
+                (self.product.pk, middle): (Decimal("2.00"), Decimal("4.00")),
+                (self.product.pk, changed): (Decimal("2.00"), Decimal("4.50")),
+            },
+        )
+
+
+class HistoricalPricesTests(SalesData, TestCase):
+    """Histórico montado à mão com datas fixas, independente de now()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        product = cls.products[0]
+        ProductPriceHistory.objects.filter(product=product).update(
+            valid_from=moment(2024, 2, 1, 0), sale_price=Decimal("4.00"), cost_price=Decimal("2.00")
+        )
+        ProductPriceHistory.objects.create(
+            product=product,
+            sale_price=Decimal("3.00"),
+            cost_price=Decimal("1.50"),
+            valid_from=moment(2024, 1, 1, 0),
+            valid_to=moment(2024, 2, 1, 0),
+        )
+        # Os outros produtos só passam a ter preço depois das vendas
+        ProductPriceHistory.objects.exclude(product=product).update(
+            valid_from=moment(2025, 1, 1, 0)
+        )
+        cls.create_sale(moment(2024, 1, 31, 23), [(0, "2", "3.10")])
+        cls.create_sale(moment(2024, 2, 1, 0), [(0, "1", "4.00"), (2, "1", "9.00")])
+
+    def test_sale_items_get_price_in_effect(self):
+        rows = selectors.get_sale_items_with_historical_prices().order_by(
+            "sale__date", "product__name"
+        )
+        self.assertEqual(
+            [
+                (row.sale_price, row.historical_sale_price, row.historical_cost_price)
+                for row in rows
+            ],
+            [
+                (Decimal("3.10"), Decimal("3.00"), Decimal("1.50")),
+                (Decimal("9.00"), None, None),
+                (Decimal("4.00"), Decimal("4.00"), Decimal("2.00")),
+            ],
+        )
+
+    def test_sales_margin_as_of(self):
+        ProductPriceHistory.objects.filter(product=self.products[2]).update(
+            valid_from=moment(2024, 1, 1, 0)
+        )
+        self.assertEqual(
+            selectors.get_sales_margin_as_of(),
+            {
+                "revenue": Decimal("19.20"),
+                "cost": Decimal("10.00"),
+                "margin": Decimal("9.20"),
+            },
+        )
@@ -0,0 +1,85 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core import result_cache, selectors
+from core.models import Product
+from core.result_cache import ResultCache, TableVersions
+from core.tests.data import SalesData
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_entry_is_valid_only_for_its_versions(self):
+        cache = ResultCache()
+        cache.set("a", (1,), b"x")
+        self.assertEqual(cache.get("a", (1,)), b"x")
+        self.assertIsNone(cache.get("a", (2,)))
+        self.assertEqual(cache.stats(), {"entries": 1, "bytes": 1, "hits": 1, "misses": 1})
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResultCache(max_entries=2)
+        cache.set("a", (1,), b"a")
+        cache.set("b", (1,), b"b")
+        cache.get("a", (1,))
+        cache.set("c", (1,), b"c")
+        self.assertIsNone(cache.get("b", (1,)))
+        self.assertEqual(cache.get("a", (1,)), b"a")
+
+    def test_byte_limits(self):
+        cache = ResultCache(max_bytes=10, max_entry_bytes=6)
+        cache.set("big", (1,), b"x" * 7)
+        cache.set("a", (1,), b"x" * 6)
+        cache.set("b", (1,), b"x" * 6)
+        self.assertIsNone(cache.get("big", (1,)))
+        self.assertIsNone(cache.get("a", (1,)))
+        self.assertEqual(cache.stats()["bytes"], 6)
+
+
+class CachedSelectorTests(SalesData, TransactionTestCase):
+    """Transacional: dentro de transação o cache é desligado."""
+
+    def setUp(self):
+        self.create_registry()
+        self.bus = mock.Mock(healthy=False)
+        for name, value in (
+            ("table_versions", TableVersions(bus=self.bus)),
+            ("result_cache", ResultCache()),
+        ):
+            patch = mock.patch.object(result_cache, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_result_follows_table_version(self):
+        self.assertEqual(selectors.count_all_products(), 3)
+        # Acerto: só a leitura das versões
+        with self.assertNumQueries(1):
+            self.assertEqual(selectors.count_all_products(), 3)
+
+        Product.objects.filter(pk=self.products[0].pk).update(sale_price=Decimal("5"))
+        with self.assertNumQueries(2):
+            self.assertEqual(selectors.count_all_products(), 3)
+
+        self.products[0].delete()
+        self.assertEqual(selectors.count_all_products(), 2)
+
+    def test_healthy_bus_skips_version_reads_until_notified(self):
+        self.bus.healthy = True
+        selectors.count_all_products()
+        with self.assertNumQueries(0):
+            self.assertEqual(selectors.count_all_products(), 3)
+
+        Product.objects.filter(pk=self.products[0].pk).delete()
+        # Aviso do barramento, como o ouvinte faria após o COMMIT
+        [(table, callback), *_] = self.bus.subscribe.call_args_list[0]
+        self.assertEqual(table, "product")
+        callback({self.products[0].pk})
+        self.assertEqual(selectors.count_all_products(), 2)
+
+    def test_no_cache_inside_transaction(self):
+        selectors.count_all_products()
+        with transaction.atomic():
+            Product.objects.filter(pk=self.products[0].pk).delete()
+            self.assertEqual(selectors.count_all_products(), 2)
+        self.assertEqual(result_cache.result_cache.stats()["hits"], 0)
@@ -0,0 +1,28 @@
+from django.test import TestCase, override_settings
+
+from core import rfm
+from core.tests.data import SalesData, moment
+
+
+class LoadCustomerMetricsTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10, 9), [(0, "2", "4.00")])
+        cls.last = cls.create_sale(moment(2024, 2, 20, 23), [(2, "1", "10.00")])
+        cls.create_sale(moment(2024, 2, 1), [(1, "3", "2.50")], customer=1)
+
+    def assert_metrics(self):
+        metrics = rfm.load_customer_metrics()
+        row = list(metrics["customer"]).index(self.customers[0].id)
+        self.assertEqual(metrics["last_purchase"][row], self.last.date.timestamp())
+        self.assertEqual(metrics["frequency"][row], 2)
+        self.assertEqual(metrics["monetary"][row], 1800)
+
+    def test_metrics(self):
+        self.assert_metrics()
+
+    @override_settings(TIME_ZONE="America/Sao_Paulo")
+    def test_last_purchase_ignores_time_zone(self):
+        # O epoch é do instante: não pode andar com o offset do fuso
+        self.assert_metrics()
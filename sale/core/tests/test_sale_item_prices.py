@@ -0,0 +1,79 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import selectors
+from core.models import ProductPriceHistory, SaleItem
+from core.tests.data import SalesData, moment
+
+
+class PriceSnapshotTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def test_bulk_insert_without_price_gets_product_price(self):
+        sale = self.create_sale(moment(2024, 1, 10), [(0, "1", None), (1, "1", "2.00")])
+        self.assertEqual(
+            dict(sale.sale_items.values_list("product__name", "sale_price")),
+            {"Suco": Decimal("4.00"), "Água": Decimal("2.00")},
+        )
+
+    def test_save_without_price_carries_product_price(self):
+        sale = self.create_sale(moment(2024, 1, 10), [])
+        item = SaleItem.objects.create(sale=sale, product=self.products[2], quantity=Decimal("1"))
+        self.assertEqual(item.sale_price, Decimal("10.00"))
+
+
+class BackfillSaleItemPricesTests(SalesData, TestCase):
+    """Itens antigos sem preço, com histórico montado à mão."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        product = cls.products[0]
+        ProductPriceHistory.objects.filter(product=product).update(valid_from=moment(2024, 2, 1, 0))
+        ProductPriceHistory.objects.create(
+            product=product,
+            sale_price=Decimal("3.00"),
+            cost_price=Decimal("1.50"),
+            valid_from=moment(2024, 1, 1, 0),
+            valid_to=moment(2024, 2, 1, 0),
+        )
+        cls.create_sale(moment(2023, 12, 20), [(0, "1", None)])
+        cls.create_sale(moment(2024, 1, 20), [(0, "2", None)])
+        cls.create_sale(moment(2024, 2, 20), [(0, "1", None), (1, "1", "2.50")])
+        # O trigger preencheria o preço: volta ao estado anterior a ele
+        SaleItem.objects.filter(product=product).update(sale_price=None)
+
+    def prices(self):
+        return list(
+            SaleItem.objects.filter(product=self.products[0])
+            .order_by("sale__date")
+            .values_list("sale_price", flat=True)
+        )
+
+    def backfill(self, *args):
+        output = StringIO()
+        call_command("backfill_sale_item_prices", "--sleep=0", *args, stdout=output)
+        return output.getvalue()
+
+    def test_report(self):
+        self.assertEqual(
+            selectors.get_missing_sale_item_prices_report(),
+            {"missing": 3, "resolvable": 2, "unresolvable": 1, "revenue": Decimal("10.00")},
+        )
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn("resolvíveis=2", self.backfill("--dry-run"))
+        self.assertEqual(self.prices(), [None, None, None])
+
+    def test_fills_price_in_effect_at_sale_date(self):
+        self.backfill("--batch-size=1")
+        self.assertEqual(self.prices(), [None, Decimal("3.00"), Decimal("4.00")])
+
+    def test_earliest_fallback_covers_sales_before_history(self):
+        self.backfill("--fallback=earliest")
+        self.assertEqual(self.prices(), [Decimal("3.00"), Decimal("3.00"), Decimal("4.00")])
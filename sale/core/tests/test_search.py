@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.postgres.search import SearchQuery
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from core import search
+from core.models import SEARCH_CONFIG, Customer, Product
+from core.tests.data import SalesData
+
+
+def raw(text):
+    return SearchQuery(text, search_type="raw", config=SEARCH_CONFIG)
+
+
+class BuildSearchQueryTests(SimpleTestCase):
+    def test_every_term_is_a_prefix(self):
+        self.assertEqual(search.build_search_query("joão sil"), raw("joão:* & sil:*"))
+
+    def test_tsquery_operators_are_dropped(self):
+        self.assertEqual(
+            search.build_search_query("café & (leite | !pão):A"),
+            raw("café:* & leite:* & pão:* & A:*"),
+        )
+
+    def test_text_without_words(self):
+        for text in ("", "   ", "&|!:*"):
+            with self.subTest(text=text):
+                self.assertIsNone(search.build_search_query(text))
+
+
+class SearchTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.juice = Product.objects.create(
+            name="Suco de Maçã",
+            cost_price=1,
+            sale_price=2,
+            product_group=cls.groups[0],
+            supplier=cls.supplier,
+        )
+
+    def names(self, text, queryset=None):
+        return [row.name for row in search.search(queryset or Product.objects.all(), text)]
+
+    def test_accents_and_case_are_ignored(self):
+        for text in ("agua", "ÁGUA", "Águ"):
+            with self.subTest(text=text):
+                self.assertEqual(self.names(text), ["Água"])
+        self.assertEqual(self.names("maca"), ["Suco de Maçã"])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(sorted(self.names("suc")), ["Suco", "Suco de Maçã"])
+        self.assertEqual(self.names("su ma"), ["Suco de Maçã"])
+        self.assertEqual(self.names("su xyz"), [])
+
+    def test_most_relevant_first(self):
+        # Nome curto: o termo pesa mais no ts_rank normalizado
+        self.assertEqual(self.names("suco"), ["Suco", "Suco de Maçã"])
+
+    def test_keeps_queryset_filters(self):
+        queryset = Product.objects.exclude(pk=self.products[0].pk)
+        self.assertEqual(self.names("suco", queryset), ["Suco de Maçã"])
+        self.assertEqual(self.names("cliente", Customer.objects.all()), ["Cliente 0", "Cliente 1"])
+
+    def test_no_words_returns_nothing(self):
+        self.assertEqual(self.names("!!"), [])
+
+    def test_ranking_is_capped(self):
+        with mock.patch.object(search, "MAX_RANKED", 1):
+            self.assertEqual(len(self.names("su")), 1)
+        sql = str(search.search(Product.objects.all(), "s").query)
+        self.assertIn(f"LIMIT {search.MAX_RANKED}", sql)
+
+
+class SearchActionTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_search(self):
+        response = self.client.get("/api/core/product/search/", {"q": "sab", "limit": 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.data], ["Sabão"])
+
+    def test_limit(self):
+        response = self.client.get("/api/core/customer/search/", {"q": "cli", "limit": 1})
+        self.assertEqual(len(response.data), 1)
+
+    def test_invalid_request(self):
+        for params in ({}, {"q": ""}, {"q": "a", "limit": 0}):
+            with self.subTest(params=params):
+                response = self.client.get("/api/core/product/search/", params)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,109 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core import selectors
+from core.management.commands.benchmark_rankings import naive_top_products_by_month
+from core.request_serializers import BranchRankingSerializer
+from core.tests.data import SalesData, moment
+
+
+@override_settings(TIME_ZONE="America/Sao_Paulo")
+class TopProductsByBranchTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10), [(0, "2", "4.00"), (1, "1", "2.50")])
+        # 23h do último dia: fora do dia UTC, dentro do dia local
+        cls.create_sale(moment(2024, 1, 31, 23), [(2, "1", "10.00")])
+        cls.create_sale(moment(2024, 2, 1, 0), [(1, "100", "2.50")])
+        cls.create_sale(moment(2024, 1, 15), [(1, "1", "2.50")], branch=1)
+
+    def test_top_n_per_branch_in_period(self):
+        rows = list(selectors.get_top_products_by_branch(2, date(2024, 1, 1), date(2024, 1, 31)))
+        self.assertEqual(
+            [(row["sale__branch"], row["product"], row["revenue"], row["position"]) for row in rows],
+            [
+                (self.branches[0].id, self.products[2].id, Decimal("10.00"), 1),
+                (self.branches[0].id, self.products[0].id, Decimal("8.00"), 2),
+                (self.branches[1].id, self.products[1].id, Decimal("2.50"), 1),
+            ],
+        )
+
+    def test_period_is_index_friendly(self):
+        queryset = selectors.get_top_products_by_branch(2, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertNotIn("AT TIME ZONE", str(queryset.query))
+
+    def test_invalid_period(self):
+        serializer = BranchRankingSerializer(data={"start": "2024-02-01", "end": "2024-01-01"})
+        self.assertFalse(serializer.is_valid())
+
+
+@override_settings(TIME_ZONE="America/Sao_Paulo")
+class TopProductsByMonthTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10), [(0, "2", "4.00"), (1, "1", "2.50")])
+        # 22h locais de 31/01 já são fevereiro em UTC
+        cls.create_sale(moment(2024, 1, 31, 22), [(2, "1", "10.00")])
+        cls.create_sale(moment(2024, 12, 31, 23), [(1, "10", "2.50")])
+        cls.create_sale(moment(2025, 1, 1, 0), [(0, "100", "4.00")])
+
+    def test_matches_naive_loop(self):
+        rows = [
+            (row["month"], row["product"])
+            for row in selectors.get_top_products_by_month(2, 2024)
+        ]
+        self.assertEqual(rows, naive_top_products_by_month(2, 2024))
+        self.assertEqual(
+            [(month.month, product) for month, product in rows],
+            [(1, self.products[2].id), (1, self.products[0].id), (12, self.products[1].id)],
+        )
+
+    def test_benchmark_reports_every_ranking(self):
+        output = StringIO()
+        call_command("benchmark_rankings", "--repeat=1", "--year=2024", stdout=output)
+        lines = output.getvalue().splitlines()[1:]
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith("top produtos por mês de 2024"))
+        self.assertIn("mesmo resultado", lines[1])
+
+
+class RegionRollupTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        # Cliente de RJ comprando na filial de SP, e só em fevereiro
+        cls.create_sale(moment(2024, 1, 10), [(0, "2", "4.00")])
+        cls.create_sale(moment(2024, 2, 10), [(2, "1", "10.00")], customer=1)
+        cls.create_sale(moment(2024, 2, 11), [(1, "2", "2.50")], branch=1, customer=1)
+
+    def rollup(self, start=None, end=None):
+        rows = selectors.get_region_rollup("state", start, end)
+        return {row["region_name"]: (row["revenue"], row["sales"], row["customers"]) for row in rows}
+
+    def test_all_time(self):
+        self.assertEqual(
+            self.rollup(),
+            {
+                "São Paulo": (Decimal("18.00"), 2, 1),
+                "Rio de Janeiro": (Decimal("5.00"), 1, 1),
+            },
+        )
+
+    def test_customers_follow_period(self):
+        self.assertEqual(
+            self.rollup(date(2024, 1, 1), date(2024, 1, 31)),
+            {"São Paulo": (Decimal("8.00"), 1, 1)},
+        )
+        self.assertEqual(
+            self.rollup(date(2024, 2, 1), date(2024, 2, 29)),
+            {
+                "São Paulo": (Decimal("10.00"), 1, 0),
+                "Rio de Janeiro": (Decimal("5.00"), 1, 1),
+            },
+        )
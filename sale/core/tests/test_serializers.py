@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase
+from rest_framework.exceptions import ValidationError
+
+from core import serializers
+from core.dimensions import DimensionCache
+from core.models import Branch, District
+from core.tests.data import SalesData
+
+
+class CachedForeignKeyTests(SalesData, TransactionTestCase):
+    """Transacional: a linha é apagada e confirmada antes do save, como num
+    outro processo."""
+
+    def setUp(self):
+        self.create_registry()
+        # Cache próprio, sem barramento e sem conferência durante o teste
+        self.cache = DimensionCache(
+            check_interval=3600, bus_check_interval=3600, bus=mock.Mock(healthy=False)
+        )
+        patch = mock.patch.object(serializers, "dimension_cache", self.cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def branch(self, district):
+        return serializers.BranchSerializer(data={"name": "Nova", "district": district.id})
+
+    def test_valid_foreign_key(self):
+        serializer = self.branch(self.districts[0])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(0):
+            serializer.is_valid()
+        self.assertEqual(serializer.save().district_id, self.districts[0].id)
+
+    def test_row_deleted_after_caching_is_a_validation_error(self):
+        district = District.objects.create(name="Novo", city=self.cities[0], zone=self.zone)
+        serializer = self.branch(district)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # Apagado por outro processo: o cache ainda tem a linha
+        District.objects.filter(id=district.id).delete()
+
+        serializer = self.branch(district)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertIn("district", raised.exception.detail)
+        self.assertFalse(Branch.objects.filter(name="Nova").exists())
+
+    def test_foreign_key_error_inside_transaction(self):
+        district = District.objects.create(name="Novo", city=self.cities[0], zone=self.zone)
+        self.assertTrue(self.branch(district).is_valid())
+        District.objects.filter(id=district.id).delete()
+
+        with transaction.atomic():
+            serializer = self.branch(district)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            with self.assertRaises(ValidationError):
+                serializer.save()
+            # Só o savepoint do save foi desfeito: a transação segue utilizável
+            self.assertTrue(Branch.objects.exists())
+
+    def test_deleted_row_is_refused_after_cache_refresh(self):
+        district = District.objects.create(name="Novo", city=self.cities[0], zone=self.zone)
+        self.assertTrue(self.branch(district).is_valid())
+        District.objects.filter(id=district.id).delete()
+        self.cache.invalidate()
+
+        serializer = self.branch(district)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("district", serializer.errors)
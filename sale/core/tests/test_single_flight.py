@@ -0,0 +1,183 @@
+import hashlib
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from core import single_flight
+from core.models import CoalescedResponse
+from core.single_flight import LOCK_NAMESPACE, SingleFlight, coalesce_requests, request_key
+
+# Tempo para as threads seguidoras chegarem enquanto a líder roda
+ARRIVAL = 0.2
+
+
+class Report:
+    """Action lenta: segura a execução até `release` e conta as chamadas."""
+
+    def __init__(self, data=None, error=None):
+        self.data = data or {"total": 1}
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return Response(data=self.data)
+
+
+class InProcessTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight(cross_process=False)
+
+    def run_concurrently(self, report, count, key="a"):
+        """Uma líder e `count - 1` seguidoras; devolve os resultados ou exceções."""
+        results = [None] * count
+
+        def call(index):
+            try:
+                results[index] = self.flight.do("report", key, report)
+            except Exception as error:
+                results[index] = error
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+        threads[0].start()
+        self.assertTrue(report.started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(ARRIVAL)
+        report.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_identical_requests_execute_once(self):
+        report = Report()
+        results = self.run_concurrently(report, 5)
+
+        self.assertEqual(report.calls, 1)
+        self.assertEqual([result.data for result in results], [report.data] * 5)
+        self.assertEqual(
+            self.flight.stats(),
+            {"in_flight": 0, "actions": {"report": {"coalesced": 4, "executed": 1}}},
+        )
+
+    def test_leader_error_reaches_followers(self):
+        error = RuntimeError("falhou")
+        results = self.run_concurrently(Report(error=error), 3)
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+
+    def test_different_keys_run_separately(self):
+        report = Report()
+        report.release.set()
+        self.flight.do("report", "a", report)
+        self.flight.do("report", "b", report)
+        self.flight.do("report", "a", report)
+        self.assertEqual(report.calls, 3)
+
+    def test_follower_runs_alone_after_timeout(self):
+        self.flight.wait_timeout = 0.05
+        report = Report()
+        leader = threading.Thread(target=self.flight.do, args=("report", "a", report))
+        leader.start()
+        self.assertTrue(report.started.wait(5))
+
+        alone = Report()
+        alone.release.set()
+        self.assertEqual(self.flight.do("report", "a", alone).data, alone.data)
+        report.release.set()
+        leader.join(5)
+
+        self.assertEqual(alone.calls, 1)
+        self.assertEqual(self.flight.stats()["actions"]["report"]["timeout"], 1)
+
+
+class RequestKeyTests(SimpleTestCase):
+    def key(self, url, action="region_rollup", kwargs=None):
+        view = mock.Mock(action=action)
+        request = Request(APIRequestFactory().get(url))
+        return request_key(view, request, kwargs or {})
+
+    def test_parameter_order_does_not_matter(self):
+        self.assertEqual(
+            self.key("/api/core/sale/?level=state&start=2024-01-01&branch=2&branch=1"),
+            self.key("/api/core/sale/?branch=1&start=2024-01-01&level=state&branch=2"),
+        )
+
+    def test_different_requests_have_different_keys(self):
+        key = self.key("/api/core/sale/?level=state")
+        self.assertNotEqual(key, self.key("/api/core/sale/?level=city"))
+        self.assertNotEqual(key, self.key("/api/core/sale/?level=state", action="cube"))
+        self.assertNotEqual(key, self.key("/api/core/sale/?level=state", kwargs={"pk": 1}))
+
+    def test_pinned_requests_are_not_coalesced(self):
+        view = mock.Mock(action="report")
+        action = coalesce_requests(lambda view, request: Response(data={}))
+        request = Request(APIRequestFactory().get("/api/core/sale/"))
+        with (
+            mock.patch.object(single_flight, "is_pinned", return_value=True),
+            mock.patch.object(single_flight.single_flight, "do") as do,
+        ):
+            action(view, request)
+        do.assert_not_called()
+
+
+class CrossProcessTests(TransactionTestCase):
+    """Outro processo é simulado por outra conexão segurando o advisory lock."""
+
+    key = hashlib.sha256(b"relatorio").hexdigest()
+
+    def setUp(self):
+        self.flight = SingleFlight(cross_process=True)
+        self.lock_key = int.from_bytes(bytes.fromhex(self.key[:8]), "big", signed=True)
+
+    def do_in_thread(self, report, results):
+        def call():
+            try:
+                results.append(self.flight.do("report", self.key, report))
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        return thread
+
+    def test_executor_shares_result(self):
+        report = Report(data={"total": 7})
+        report.release.set()
+        self.assertEqual(self.flight.do("report", self.key, report).data, {"total": 7})
+        self.assertEqual(CoalescedResponse.objects.get(key=self.key).data, {"total": 7})
+
+    def test_waiter_reads_result_stored_while_it_waited(self):
+        report = Report()
+        report.release.set()
+        results = []
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s, %s)", [LOCK_NAMESPACE, self.lock_key])
+            thread = self.do_in_thread(report, results)
+            time.sleep(ARRIVAL)
+            self.flight._store(self.key, Response(data={"total": 9}))
+            cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [LOCK_NAMESPACE, self.lock_key])
+        thread.join(5)
+
+        self.assertEqual(report.calls, 0)
+        self.assertEqual(results[0].data, {"total": 9})
+        self.assertEqual(self.flight.stats()["actions"]["report"], {"coalesced_remote": 1})
+
+    def test_result_stored_before_arrival_is_not_reused(self):
+        self.flight._store(self.key, Response(data={"total": 9}))
+        report = Report(data={"total": 10})
+        report.release.set()
+        self.assertEqual(self.flight.do("report", self.key, report).data, {"total": 10})
+        self.assertEqual(report.calls, 1)
@@ -0,0 +1,134 @@
+import random
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core import sketches
+from core.models import BranchDaySketch, BranchDaySketchChange, Customer, Sale, SaleItem
+from core.tests.data import SalesData, moment
+
+
+class SketchEstimateTests(SalesData, TestCase):
+    """Estimativas dos sketches contra as contagens exatas das mesmas vendas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.customers += Customer.objects.bulk_create(
+            Customer(
+                name=f"Cliente extra {index}",
+                gender="M",
+                income=Decimal("1000"),
+                district=cls.districts[index % 2],
+                marital_status=cls.marital_status,
+            )
+            for index in range(400)
+        )
+        chooser = random.Random(42)
+        sales = Sale.objects.bulk_create(
+            Sale(
+                date=moment(2024, 3, 1 + index % 7, 8 + index % 12),
+                branch=cls.branches[index % 2],
+                customer=chooser.choice(cls.customers),
+                employee=cls.employees[0],
+            )
+            for index in range(1500)
+        )
+        # Quantidades bem separadas: Suco > Sabão > Água
+        SaleItem.objects.bulk_create(
+            SaleItem(
+                sale=sale,
+                product=cls.products[product],
+                quantity=Decimal(quantity),
+                sale_price=Decimal("1"),
+            )
+            for sale in sales
+            for product, quantity in ((0, 3), (2, 2), (1, 1))
+        )
+        sketches.refresh_branch_sketches(date(2024, 3, 1), date(2024, 3, 7))
+
+    def test_one_sketch_per_branch_and_day(self):
+        self.assertEqual(BranchDaySketch.objects.count(), 14)
+        self.assertEqual(sum(BranchDaySketch.objects.values_list("sales", flat=True)), 1500)
+
+    def test_distinct_customers(self):
+        for start, end, branches in (
+            (None, None, None),
+            (date(2024, 3, 1), date(2024, 3, 3), None),
+            (None, None, [self.branches[1].id]),
+        ):
+            with self.subTest(start=start, end=end, branches=branches):
+                sales = Sale.objects.all()
+                if start:
+                    sales = sales.filter(date__gte=moment(start.year, start.month, start.day, 0))
+                    sales = sales.filter(
+                        date__lt=moment(end.year, end.month, end.day, 0) + timedelta(days=1)
+                    )
+                if branches:
+                    sales = sales.filter(branch__in=branches)
+                exact = sales.values("customer").distinct().count()
+
+                estimate = sketches.estimate_distinct_customers(start, end, branches)
+                self.assertEqual(estimate["sales"], sales.count())
+                # Três erros padrão
+                self.assertAlmostEqual(
+                    estimate["customers"], exact, delta=3 * sketches.HLL_ERROR * exact
+                )
+
+    def test_top_products(self):
+        result = sketches.estimate_top_products(limit=3)
+        self.assertEqual(
+            [row["product"] for row in result["products"]],
+            [self.products[0].id, self.products[2].id, self.products[1].id],
+        )
+        for row, quantity in zip(result["products"], (4500, 3000, 1500)):
+            # Count-min nunca subestima e passa do real no máximo max_overestimate
+            self.assertGreaterEqual(row["quantity"], quantity)
+            self.assertLessEqual(row["quantity"], quantity + result["max_overestimate"])
+        self.assertEqual(result["total_quantity"], 9000)
+
+
+class RefreshPendingTests(SalesData, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+
+    def setUp(self):
+        BranchDaySketchChange.objects.all().delete()
+
+    def sketch(self, branch, day):
+        return BranchDaySketch.objects.get(branch=self.branches[branch], day=day)
+
+    def test_triggers_mark_branch_days(self):
+        self.create_sale(moment(2024, 3, 1), [(0, "1", "4.00")])
+        self.create_sale(moment(2024, 3, 2), [(0, "1", "4.00")], branch=1)
+        self.assertEqual(sketches.refresh_pending(), 2)
+        self.assertFalse(BranchDaySketchChange.objects.exists())
+        self.assertEqual(self.sketch(0, date(2024, 3, 1)).sales, 1)
+
+        sale = self.create_sale(moment(2024, 3, 1, 15), [(1, "2", "2.50")], customer=1)
+        sketches.refresh_pending()
+        self.assertEqual(self.sketch(0, date(2024, 3, 1)).sales, 2)
+
+        sale.active = False
+        sale.save()
+        sketches.refresh_pending()
+        self.assertEqual(self.sketch(0, date(2024, 3, 1)).sales, 1)
+
+    @override_settings(TIME_ZONE="Asia/Kolkata")
+    def test_hour_split_across_local_days(self):
+        # 18:00 UTC é 23:30 em Kolkata: a hora da mudança vai até 00:29 do dia seguinte
+        BranchDaySketchChange.objects.create(
+            branch=self.branches[0], sale_hour=datetime(2024, 3, 1, 18, tzinfo=UTC)
+        )
+        with mock.patch.object(sketches, "_write_sketches") as write:
+            self.assertEqual(sketches.refresh_pending(), 2)
+        self.assertEqual(
+            write.call_args_list,
+            [
+                mock.call(date(2024, 3, 1), date(2024, 3, 1), {self.branches[0].pk}),
+                mock.call(date(2024, 3, 2), date(2024, 3, 2), {self.branches[0].pk}),
+            ],
+        )
@@ -0,0 +1,146 @@
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from core import cube, snapshots
+from core.tests.data import SalesData, moment
+
+
+class SnapshotDirMixin:
+    def setUp(self):
+        super().setUp()
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def versions(self):
+        return sorted(name for name in os.listdir(self.directory) if not name.startswith("."))
+
+
+class WriteSnapshotTests(SnapshotDirMixin, SimpleTestCase):
+    def test_round_trip(self):
+        arrays = {
+            "column.revenue": np.arange(5, dtype=np.int64),
+            "values.gender": np.array(["F", "M"]),
+        }
+        version = snapshots.write_snapshot(self.directory, arrays, {"rows": 5})
+
+        self.assertEqual(snapshots.current_version(self.directory), version)
+        opened_version, opened, meta = snapshots.open_snapshot(self.directory)
+        self.assertEqual(opened_version, version)
+        self.assertEqual(meta, {"rows": 5})
+        self.assertEqual(opened.keys(), arrays.keys())
+        for name, array in arrays.items():
+            with self.subTest(name=name):
+                np.testing.assert_array_equal(opened[name], array)
+                self.assertIsInstance(opened[name], np.memmap)
+                self.assertFalse(opened[name].flags.writeable)
+        # Nada de temporários sobrando
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([snapshots.CURRENT, version]))
+
+    def test_no_snapshot(self):
+        self.assertIsNone(snapshots.current_version(self.directory))
+        self.assertIsNone(snapshots.open_snapshot(self.directory))
+
+    def test_opens_older_version(self):
+        first = snapshots.write_snapshot(self.directory, {"a": np.array([1])}, {"n": 1})
+        snapshots.write_snapshot(self.directory, {"a": np.array([2])}, {"n": 2})
+        version, arrays, meta = snapshots.open_snapshot(self.directory, first)
+        self.assertEqual((version, arrays["a"].tolist(), meta), (first, [1], {"n": 1}))
+
+    def test_same_millisecond_gets_distinct_versions(self):
+        with mock.patch.object(snapshots.time, "time_ns", return_value=1_760_850_000_123_000_000):
+            first = snapshots.write_snapshot(self.directory, {"a": np.array([1])}, {}, keep=5)
+            second = snapshots.write_snapshot(self.directory, {"a": np.array([2])}, {}, keep=5)
+        self.assertNotEqual(first, second)
+        self.assertEqual(snapshots.current_version(self.directory), second)
+        self.assertEqual(snapshots.open_snapshot(self.directory)[1]["a"].tolist(), [2])
+
+
+class PruneSnapshotsTests(SnapshotDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # Uma versão antiga sem sufixo e duas no mesmo milissegundo
+        for name in ("v100", "v200-b", "v200-a", "v300-0"):
+            os.mkdir(os.path.join(self.directory, name))
+
+    def point_current(self, version):
+        os.symlink(version, os.path.join(self.directory, snapshots.CURRENT))
+
+    def test_keeps_newest(self):
+        self.point_current("v300-0")
+        snapshots.prune_snapshots(self.directory, keep=2)
+        self.assertEqual(self.versions(), ["current", "v200-b", "v300-0"])
+
+    def test_current_is_always_kept(self):
+        self.point_current("v100")
+        snapshots.prune_snapshots(self.directory, keep=1)
+        self.assertEqual(self.versions(), ["current", "v100", "v300-0"])
+
+        snapshots.prune_snapshots(self.directory, keep=0)
+        self.assertEqual(self.versions(), ["current", "v100"])
+
+    def test_write_prunes(self):
+        version = snapshots.write_snapshot(self.directory, {"a": np.array([1])}, {}, keep=2)
+        self.assertCountEqual(self.versions(), ["current", "v300-0", version])
+
+
+class FollowSnapshotTests(SnapshotDirMixin, SalesData, TestCase):
+    """Cubo montado do banco, gravado e mapeado por outro cubo sem banco."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_registry()
+        cls.create_sale(moment(2024, 1, 10), [(0, "2", "4.00"), (1, "1", "2.50")])
+        cls.create_sale(moment(2024, 2, 15), [(2, "1", "10.00")], branch=1)
+
+    def setUp(self):
+        super().setUp()
+        self.source = cube.SalesCube(snapshot_dir=None)
+        self.source.rebuild()
+        self.follower = cube.SalesCube(snapshot_dir=self.directory)
+        self.enterContext(mock.patch.object(snapshots, "CHECK_INTERVAL", 0))
+
+    def publish(self):
+        return snapshots.write_snapshot(self.directory, *self.source.export())
+
+    def test_maps_current_version_without_database(self):
+        version = self.publish()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.follower._follow_snapshot())
+            self.assertEqual(self.follower.query(["branch"]), self.source.query(["branch"]))
+        self.assertEqual(self.follower.stats()["snapshot"], version)
+        self.assertFalse(self.follower._snapshot[1]["revenue"].flags.writeable)
+
+    def test_no_snapshot(self):
+        self.assertFalse(self.follower._follow_snapshot())
+
+    def test_follows_new_version(self):
+        self.publish()
+        self.follower._follow_snapshot()
+        self.create_sale(moment(2024, 3, 1), [(2, "2", "10.00")])
+        self.source.rebuild()
+        version = self.publish()
+
+        self.assertTrue(self.follower._follow_snapshot())
+        self.assertEqual(self.follower.stats()["snapshot"], version)
+        self.assertEqual(len(self.follower), len(self.source))
+
+    def test_checks_link_at_most_every_interval(self):
+        first = self.publish()
+        self.follower._follow_snapshot()
+        self.publish()
+        with mock.patch.object(snapshots, "CHECK_INTERVAL", 3600):
+            self.assertTrue(self.follower._follow_snapshot())
+        self.assertEqual(self.follower.stats()["snapshot"], first)
+
+    def test_version_removed_before_opening_keeps_mapped_one(self):
+        first = self.publish()
+        self.follower._follow_snapshot()
+        self.publish()
+        with mock.patch.object(snapshots, "open_snapshot", side_effect=FileNotFoundError):
+            self.assertTrue(self.follower._follow_snapshot())
+        self.assertEqual(self.follower.stats()["snapshot"], first)
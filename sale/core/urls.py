@@ -1,6 +1,7 @@
+from django.urls import path
 from rest_framework import routers
 
-from core import viewsets
+from core import views, viewsets
 
 router = routers.DefaultRouter()
 router.register(r'product_group', viewsets.ProductGroupViewSet)
@@ -17,4 +18,9 @@ router.register(r'customer', viewsets.CustomerViewSet)
 router.register(r'sale', viewsets.SaleViewSet)
 router.register(r'sale_item', viewsets.SaleItemViewSet)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('health/database/', views.database_health, name='database-health'),
+    path('health/single_flight/', views.single_flight_stats, name='single-flight-stats'),
+    path('health/live_feed/', views.live_feed_stats, name='live-feed-stats'),
+    path('live/sales/', views.live_sales, name='live-sales'),
+]
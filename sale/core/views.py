@@ -1,3 +1,113 @@
-from django.shortcuts import render
+import time
 
-# Create your views here.
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from core import live_feed, request_serializers
+from core.live_feed import sales_feed
+from core.single_flight import single_flight
+
+
+@api_view(["GET"])
+def database_health(request):
+    """Verifica a conexão com o banco e expõe as métricas do pool.
+
+    Returns:
+        Response: {'alias': ..., 'healthy': ..., 'latency_ms': ..., 'pool': {...}}
+            'pool' traz as estatísticas do psycopg_pool (pool_size,
+            pool_available, requests_waiting, ...) ou None sem pool.
+    """
+    data = []
+    healthy = True
+    for connection in connections.all(initialized_only=False):
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            alias_healthy = True
+        except DatabaseError:
+            alias_healthy = False
+        pool = getattr(connection, "pool", None)
+        data.append(
+            {
+                "alias": connection.alias,
+                "healthy": alias_healthy,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                "pool": pool.get_stats() if pool is not None else None,
+            }
+        )
+        healthy = healthy and alias_healthy
+
+    return Response(
+        data=data,
+        status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@api_view(["GET"])
+def single_flight_stats(request):
+    """Expõe as contagens da coalescência de requisições (core.single_flight).
+
+    Returns:
+        Response: {'in_flight': ..., 'actions': {'SaleViewSet.region_rollup':
+            {'executed': ..., 'coalesced': ..., 'coalesced_remote': ..., 'timeout': ...}}}
+            Contagens do worker que respondeu, desde que ele subiu.
+    """
+    return Response(data=single_flight.stats())
+
+
+@api_view(["GET"])
+def live_feed_stats(request):
+    """Expõe as contagens do feed de vendas ao vivo (core.live_feed).
+
+    Returns:
+        Response: {'subscribers': ..., 'batches': ..., 'dropped': ..., 'bus_healthy': ...}
+            Do worker que respondeu, desde que ele subiu.
+    """
+    return Response(data=sales_feed.stats())
+
+
+async def live_sales(request):
+    """Feed de vendas ao vivo por Server-Sent Events (EventSource).
+
+    Query params:
+        branches: Filiais acompanhadas (pode repetir; padrão, todas).
+
+    Returns:
+        StreamingHttpResponse: text/event-stream com um evento 'sales' por
+            lote: {'at': ..., 'branches': [{'branch': 1, 'sales': 3,
+            'total': ...}], 'sales': [{'id': ..., 'branch': 1, 'date': ...,
+            'active': True, 'total': ..., 'items': 2}], 'truncated': False}
+
+    Note:
+        View assíncrona fora do DRF: cada conexão é só uma fila no event
+        loop. Sob WSGI responde 501, porque prenderia um thread por cliente.
+    """
+    if not live_feed.ENABLED:
+        return JsonResponse(
+            {"detail": "Feed de vendas ao vivo desligado."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "O feed de vendas ao vivo exige servidor ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    request_serializer = request_serializers.LiveSalesSerializer(data=request.GET)
+    if not request_serializer.is_valid():
+        return JsonResponse(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    branches = request_serializer.validated_data.get("branches")
+
+    subscription = sales_feed.connect(frozenset(branches) if branches else None)
+    response = StreamingHttpResponse(
+        sales_feed.stream(subscription), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx não deve segurar os eventos no buffer
+    response["X-Accel-Buffering"] = "no"
+    return response
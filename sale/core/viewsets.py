@@ -3,12 +3,115 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from core import models, selectors, serializers, request_serializers
+from core import (
+    autocomplete,
+    db_router,
+    filters,
+    models,
+    request_serializers,
+    search,
+    selectors,
+    serializers,
+)
+from core.single_flight import coalesce_requests
+
+
+class SearchMixin:
+    """Adiciona a action `search` (busca textual com ranking) ao viewset."""
+
+    @action(detail=False, methods=["get"])
+    def search(self, request, *args, **kwargs):
+        request_serializer = request_serializers.SearchSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        queryset = search.search(
+            self.get_queryset(),
+            request_serializer.validated_data["q"],
+        )[:request_serializer.validated_data["limit"]]
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(data=serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SearchMixin, viewsets.ModelViewSet):
     queryset = models.Product.objects.all()
     serializer_class = serializers.ProductSerializer
+    filterset_class = filters.ProductFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "sale_price", "cost_price"]
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        request_serializer = request_serializers.SearchSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = autocomplete.product_name_index.lookup(
+            request_serializer.validated_data["q"],
+            limit=request_serializer.validated_data["limit"],
+        )
+        return Response(data=data)
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
+        request_serializer = request_serializers.RelatedProductsSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+        # 404 para id inexistente ou não numérico, em vez de [] ou 500
+        product = self.get_object()
+
+        data = list(
+            selectors.get_related_products(
+                product.pk,
+                limit=request_serializer.validated_data["limit"],
+            )
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    @coalesce_requests
+    def top_by_branch(self, request):
+        request_serializer = request_serializers.BranchRankingSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_top_products_by_branch(**request_serializer.validated_data)
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    @coalesce_requests
+    def top_by_month(self, request):
+        request_serializer = request_serializers.MonthRankingSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_top_products_by_month(**request_serializer.validated_data)
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    @coalesce_requests
+    def margin_rank(self, request):
+        request_serializer = request_serializers.RankingSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_products_margin_rank_by_group(
+                request_serializer.validated_data["limit"]
+            )
+        )
+        return Response(data=data)
 
     @action(detail=False, methods=["get"])
     def test_queryset(self, request):
@@ -41,78 +144,240 @@ class ProductViewSet(viewsets.ModelViewSet):
 class ProductGroupViewSet(viewsets.ModelViewSet):
     queryset = models.ProductGroup.objects.all()
     serializer_class = serializers.ProductGroupSerializer
+    filterset_fields = ["active"]
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(SearchMixin, viewsets.ModelViewSet):
     queryset = models.Supplier.objects.all()
     serializer_class = serializers.SupplierSerializer
+    filterset_fields = ["active"]
+    search_fields = ["^name"]
+    ordering_fields = ["id"]
 
 
 class ZoneViewSet(viewsets.ModelViewSet):
     queryset = models.Zone.objects.all()
     serializer_class = serializers.ZoneSerializer
+    filterset_fields = ["active"]
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
 class StateViewSet(viewsets.ModelViewSet):
     queryset = models.State.objects.all()
     serializer_class = serializers.StateSerializer
+    filterset_class = filters.StateFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name", "abbreviation"]
 
 
 class CityViewSet(viewsets.ModelViewSet):
     queryset = models.City.objects.all()
     serializer_class = serializers.CitySerializer
+    filterset_class = filters.CityFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
 class DistrictViewSet(viewsets.ModelViewSet):
     queryset = models.District.objects.all()
     serializer_class = serializers.DistrictSerializer
+    filterset_class = filters.DistrictFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
 class BranchViewSet(viewsets.ModelViewSet):
     queryset = models.Branch.objects.all()
     serializer_class = serializers.BranchSerializer
+    filterset_class = filters.BranchFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
 class DepartmentViewSet(viewsets.ModelViewSet):
     queryset = models.Department.objects.all()
     serializer_class = serializers.DepartmentSerializer
+    filterset_fields = ["active"]
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
     @action(detail=False, methods=["get"])
+    @coalesce_requests
     def departments_report(self, request, *args, **kwargs):
         request_serializer = request_serializers.DepartmentPaginatorSerializer(
             data=request.query_params
         )
         request_serializer.is_valid(raise_exception=True)
 
-        queryset = models.Department.objects.values(
-            "name"
-        ).annotate(
-            qtd_employees=Count("employees")
-        )[:request_serializer.data["qtd_departments"]]
+        with db_router.use_replica():
+            queryset = models.Department.objects.values(
+                "name"
+            ).annotate(
+                qtd_employees=Count("employees")
+            )[:request_serializer.data["qtd_departments"]]
+            data = list(queryset)
 
-        return Response(queryset)
+        return Response(data)
 
 
 class MaritalStatusViewSet(viewsets.ModelViewSet):
     queryset = models.MaritalStatus.objects.all()
     serializer_class = serializers.MaritalStatusSerializer
+    filterset_fields = ["active"]
+    search_fields = ["^name"]
+    ordering_fields = ["id", "name"]
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
-    queryset = models.Employee.objects.all()
+class EmployeeViewSet(SearchMixin, viewsets.ModelViewSet):
+    queryset = selectors.get_employees_with_age()
     serializer_class = serializers.EmployeeSerializer
+    filterset_class = filters.EmployeeFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "salary", "admission_date", "birth_date"]
 
+    @action(detail=False, methods=["get"])
+    def age_histogram(self, request, *args, **kwargs):
+        request_serializer = request_serializers.AgeHistogramSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_employee_age_histogram(
+                request_serializer.validated_data["group_by"]
+            )
+        )
+        return Response(data=data)
 
-class CustomerViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"])
+    def salary_distribution(self, request, *args, **kwargs):
+        request_serializer = request_serializers.DistributionSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_salary_distribution(
+            request_serializer.validated_data["buckets"]
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    def top_by_department(self, request, *args, **kwargs):
+        request_serializer = request_serializers.RankingSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_top_employees_by_department(
+                request_serializer.validated_data["limit"]
+            )
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    def commissions(self, request, *args, **kwargs):
+        request_serializer = request_serializers.CommissionPeriodSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = list(
+            selectors.get_commission_statements(
+                request_serializer.validated_data["period"]
+            )
+        )
+        return Response(data=data)
+
+
+class CustomerViewSet(SearchMixin, viewsets.ModelViewSet):
     queryset = models.Customer.objects.all()
     serializer_class = serializers.CustomerSerializer
+    filterset_class = filters.CustomerFilter
+    search_fields = ["^name"]
+    ordering_fields = ["id", "income"]
+
+    @action(detail=False, methods=["get"])
+    def income_distribution(self, request, *args, **kwargs):
+        request_serializer = request_serializers.DistributionSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_income_distribution(
+            request_serializer.validated_data["buckets"]
+        )
+        return Response(data=data)
 
 
 class SaleViewSet(viewsets.ModelViewSet):
     queryset = models.Sale.objects.all()
     serializer_class = serializers.SaleSerializer
+    filterset_class = filters.SaleFilter
+    ordering_fields = ["id", "date"]
+
+    @action(detail=False, methods=["get"])
+    @coalesce_requests
+    def region_rollup(self, request, *args, **kwargs):
+        request_serializer = request_serializers.RegionRollupSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_region_rollup(**request_serializer.validated_data)
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    def cube(self, request, *args, **kwargs):
+        request_serializer = request_serializers.SalesCubeSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_sales_cube(**request_serializer.validated_data)
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    @coalesce_requests
+    def basket_distribution(self, request, *args, **kwargs):
+        request_serializer = request_serializers.BasketDistributionSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_basket_value_distribution(
+            **request_serializer.validated_data
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    def distinct_customers(self, request, *args, **kwargs):
+        request_serializer = request_serializers.BranchSketchSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_distinct_customers_estimate(
+            **request_serializer.validated_data
+        )
+        return Response(data=data)
+
+    @action(detail=False, methods=["get"])
+    def top_products(self, request, *args, **kwargs):
+        request_serializer = request_serializers.TopProductsSketchSerializer(
+            data=request.query_params
+        )
+        request_serializer.is_valid(raise_exception=True)
+
+        data = selectors.get_top_products_estimate(**request_serializer.validated_data)
+        return Response(data=data)
 
 
 class SaleItemViewSet(viewsets.ModelViewSet):
     queryset = models.SaleItem.objects.all()
     serializer_class = serializers.SaleItemSerializer
+    filterset_class = filters.SaleItemFilter
+    ordering_fields = ["id"]
@@ -3,6 +3,11 @@ ASGI config for sale project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live sales feed (/api/core/live/sales/, core.live_feed) is served only
+through this entry point, e.g. ``gunicorn sale.asgi -k uvicorn.workers.UvicornWorker``:
+each Server-Sent Events connection is a queue on the worker's event loop,
+fed by a single database listener per process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
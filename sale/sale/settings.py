@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,7 +36,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
+    'django_filters',
     'core',
 ]
 
@@ -47,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'sale.urls'
@@ -71,17 +75,62 @@ WSGI_APPLICATION = 'sale.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Pool de conexões (psycopg 3): DB_POOL=0 volta para conexões persistentes
+# simples controladas por DB_CONN_MAX_AGE.
+DB_POOL = os.environ.get("DB_POOL", "1") == "1"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": "sale",
-        "USER": "postgres",
-        "PASSWORD": "123456",
-        "HOST": "127.0.0.1",
-        "PORT": "5432",
+        "NAME": os.environ.get("DB_NAME", "sale"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "123456"),
+        "HOST": os.environ.get("DB_HOST", "127.0.0.1"),
+        "PORT": os.environ.get("DB_PORT", "5432"),
+        # O pool não aceita CONN_MAX_AGE > 0: quem reaproveita a conexão é ele
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        # A busca sem acentos (unaccent) precisa de UTF8 no banco de testes,
+        # mesmo num servidor criado com outra codificação
+        "TEST": {"CHARSET": "UTF8", "TEMPLATE": "template0"},
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+                "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+                "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+                "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600")),
+            },
+        } if DB_POOL else {},
     }
 }
 
+# Réplicas de leitura: DB_REPLICAS="host1:5432,host2:5432/sale" cria os
+# aliases replica_1, replica_2, ... com as mesmas credenciais do primário
+# (o nome do banco após "/" é opcional). Nos testes, cada réplica espelha
+# o "default" (TEST.MIRROR).
+REPLICA_DATABASES = []
+for index, address in enumerate(os.environ.get("DB_REPLICAS", "").split(","), 1):
+    if not address.strip():
+        continue
+    address, _, name = address.strip().partition("/")
+    host, _, port = address.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "NAME": name or DATABASES["default"]["NAME"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+
+# Réplica atrasada mais que isso (segundos) é ignorada
+REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "5"))
+# Após uma escrita, o cliente lê do primário por este tempo (segundos)
+REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", "10"))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -118,5 +167,10 @@ STATIC_URL = 'static/'
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': "rest_framework.pagination.PageNumberPagination",
-    "PAGE_SIZE": 20
+    "PAGE_SIZE": 20,
+    "DEFAULT_FILTER_BACKENDS": [
+        "django_filters.rest_framework.DjangoFilterBackend",
+        "rest_framework.filters.SearchFilter",
+        "rest_framework.filters.OrderingFilter",
+    ],
 }